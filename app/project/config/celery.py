@@ -20,4 +20,8 @@ celery.conf.beat_schedule = {
         "task": "config.tasks.reset_outstanding_jwt_tokens.reset_outstanding_jwt_tokens",
         "schedule": crontab(minute=0, hour=0),
     },
+    "collect_user_data_garbage": {
+        "task": "users.tasks.collect_user_data_garbage",
+        "schedule": crontab(minute=30, hour=3),
+    },
 }
@@ -2,124 +2,293 @@
 Google Cloud Storage client for handling file operations
 """
 import logging
-from typing import Optional, List, BinaryIO
-from google.cloud import storage
-from google.cloud.exceptions import NotFound
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
 from decouple import config
+from django.conf import settings
+
+from config.instances.storage_backend import (
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageObject,
+)
 
 logger = logging.getLogger(__name__)
 
 
-class GoogleCloudStorageClient:
-    """Client for Google Cloud Storage operations"""
-    
+class GoogleCloudStorageClient(StorageBackend):
+    """
+    Client for Google Cloud Storage operations. google-cloud-storage is
+    only imported when the client is first used, so it is needed only
+    where STORAGE_BACKEND is "gcs".
+    """
+
+    # Objects composed by one compose request
+    MAX_COMPOSE_SOURCES = 32
+
     def __init__(self):
         """Initialize the GCS client"""
         self.project_id = config('PROJECT_ID', default='')
         self.media_bucket_name = config('GCS_MEDIA_BUCKET', default='')
         self.static_bucket_name = config('GCS_STATIC_BUCKET', default='')
-        
-        # Initialize the client
-        self.client = storage.Client(project=self.project_id)
+        # Services address user files by this bucket name
+        self.bucket_names = {"user-data": settings.STORAGE_GCS_BUCKET}
+
+        self._client = None
         self.media_bucket = None
         self.static_bucket = None
-        
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._initialize_client()
+        return self._client
+
+    def _initialize_client(self):
+        from google.cloud import storage
+        from requests.adapters import HTTPAdapter
+
+        self._client = storage.Client(project=self.project_id)
+        # Size the connection pool like the MinIO one, so parallel part
+        # uploads don't open and drop connections
+        adapter = HTTPAdapter(
+            pool_connections=settings.STORAGE_POOL_SIZE,
+            pool_maxsize=settings.STORAGE_POOL_SIZE,
+            pool_block=settings.STORAGE_POOL_BLOCK,
+        )
+        self._client._http.mount("https://", adapter)
+
         # Get bucket instances
         if self.media_bucket_name:
             try:
-                self.media_bucket = self.client.bucket(self.media_bucket_name)
+                self.media_bucket = self._client.bucket(self.media_bucket_name)
             except Exception as e:
                 logger.error(f"Failed to initialize media bucket: {e}")
-        
+
         if self.static_bucket_name:
             try:
-                self.static_bucket = self.client.bucket(
+                self.static_bucket = self._client.bucket(
                     self.static_bucket_name
                 )
             except Exception as e:
                 logger.error(f"Failed to initialize static bucket: {e}")
 
-    def get_user_folder_path(self, user_id: int,
-                             folder_type: str = "data_uploads") -> str:
-        """
-        Get the folder path for a user's files
+    @property
+    def _timeout(self) -> Tuple[float, float]:
+        return (
+            settings.STORAGE_CONNECT_TIMEOUT_SECONDS,
+            settings.STORAGE_READ_TIMEOUT_SECONDS,
+        )
 
-        Args:
-            user_id: User ID
-            folder_type: Type of folder (data_uploads, profile_images, etc.)
-
-        Returns:
-            Folder path string
-        """
-        return f"user_{user_id}/{folder_type}"
+    def _get_bucket(self, bucket_name: str):
+        """Get the appropriate bucket"""
+        client = self.client
+        if bucket_name == self.media_bucket_name and self.media_bucket:
+            return self.media_bucket
+        if bucket_name == self.static_bucket_name and self.static_bucket:
+            return self.static_bucket
+        return client.bucket(self.bucket_names.get(bucket_name) or bucket_name)
 
     def upload_file(self, bucket_name: str, object_name: str,
-                    file_data: BinaryIO, file_size: int,
-                    content_type: str = None) -> bool:
+                    file_data: IO[bytes], file_size: int,
+                    content_type: str = None,
+                    metadata: Optional[Dict[str, str]] = None):
         """
         Upload file to Google Cloud Storage
-        
+
         Args:
             bucket_name: Name of the bucket
             object_name: Object name in the bucket
             file_data: File data to upload
             file_size: Size of the file
             content_type: MIME type of the file
-            
-        Returns:
-            True if successful, False otherwise
+            metadata: Custom metadata of the object
         """
+        blob = self._get_bucket(bucket_name).blob(object_name)
+        if metadata:
+            blob.metadata = metadata
+
+        blob.upload_from_file(
+            file_data, size=file_size, content_type=content_type,
+            timeout=self._timeout,
+        )
+        logger.info(f"File uploaded to GCS: {bucket_name}/{object_name}")
+
+    @contextmanager
+    def open_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        offset: int = 0,
+        length: int = 0,
+        etag: Optional[str] = None,
+    ) -> Iterator[IO[bytes]]:
+        """Open an object for streaming reads"""
+        from google.cloud.exceptions import NotFound, PreconditionFailed
+
+        blob = self._get_bucket(bucket_name).blob(object_name)
+        if etag:
+            # Pin the read to the generation the ETag was stat'ed from
+            stat = self.stat_object(bucket_name, object_name)
+            if stat.etag != etag:
+                raise ObjectNotFoundError(
+                    f"{bucket_name}/{object_name} with ETag {etag}"
+                )
+            blob = self._get_bucket(bucket_name).blob(
+                object_name, generation=int(stat.metadata["generation"])
+            )
+
         try:
-            # Get the appropriate bucket
-            if bucket_name == self.media_bucket_name and self.media_bucket:
-                bucket = self.media_bucket
-            elif bucket_name == self.static_bucket_name and self.static_bucket:
-                bucket = self.static_bucket
-            else:
-                bucket = self.client.bucket(bucket_name)
-            
-            # Create blob and upload
-            blob = bucket.blob(object_name)
-            
-            if content_type:
-                blob.content_type = content_type
-            
-            # Upload the file
-            blob.upload_from_file(file_data)
-            
-            logger.info(f"File uploaded to GCS: {bucket_name}/{object_name}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to upload file to GCS: {e}")
-            return False
-    
+            reader = blob.open(
+                "rb",
+                start=offset or None,
+                end=offset + length - 1 if length else None,
+                timeout=self._timeout,
+            )
+        except (NotFound, PreconditionFailed):
+            raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+        with reader:
+            yield reader
+
+    def stat_object(self, bucket_name: str, object_name: str) -> StorageObject:
+        """Get size, ETag and metadata of an object"""
+        blob = self._get_bucket(bucket_name).get_blob(
+            object_name, timeout=self._timeout
+        )
+        if blob is None:
+            raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+        return self._to_storage_object(blob)
+
+    @staticmethod
+    def _to_storage_object(blob) -> StorageObject:
+        return StorageObject(
+            object_name=blob.name,
+            size=blob.size or 0,
+            etag=blob.etag,
+            last_modified=blob.updated,
+            content_type=blob.content_type,
+            metadata={
+                **(blob.metadata or {}),
+                "generation": str(blob.generation),
+            },
+        )
+
+    def list_objects(
+        self, bucket_name: str, prefix: str = "", recursive: bool = False
+    ) -> Iterator[StorageObject]:
+        """List objects under a prefix"""
+        blobs = self.client.list_blobs(
+            self._get_bucket(bucket_name),
+            prefix=prefix,
+            delimiter=None if recursive else "/",
+            timeout=self._timeout,
+        )
+        for page in blobs.pages:
+            for blob in page:
+                yield self._to_storage_object(blob)
+            for folder in page.prefixes:
+                yield StorageObject(object_name=folder, is_dir=True)
+
+    @staticmethod
+    def _get_parts_folder(object_name: str, upload_id: str) -> str:
+        # Next to the object, so the storage GC also collects the parts
+        # of abandoned uploads
+        return f"{object_name}.parts-{upload_id}"
+
+    def create_multipart_upload(
+        self, bucket_name: str, object_name: str, content_type: str = None
+    ) -> str:
+        """
+        Start a multipart upload. Parts are uploaded as separate objects
+        and composed into the object on completion.
+        """
+        return uuid4().hex
+
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+    ) -> str:
+        """Upload one part of a multipart upload, return its ETag"""
+        blob = self._get_bucket(bucket_name).blob(
+            f"{self._get_parts_folder(object_name, upload_id)}/"
+            f"{part_number:05d}"
+        )
+        blob.upload_from_string(data, timeout=self._timeout)
+        return blob.etag
+
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ):
+        """Compose uploaded (part_number, etag) parts into the object"""
+        bucket = self._get_bucket(bucket_name)
+        parts_folder = self._get_parts_folder(object_name, upload_id)
+        sources = [
+            bucket.blob(f"{parts_folder}/{number:05d}")
+            for number, _ in sorted(parts)
+        ]
+
+        # A compose request takes at most 32 sources, larger uploads are
+        # composed into intermediate objects first
+        compose_count = 0
+        while len(sources) > self.MAX_COMPOSE_SOURCES:
+            composed = []
+            for start in range(0, len(sources), self.MAX_COMPOSE_SOURCES):
+                blob = bucket.blob(f"{parts_folder}/compose-{compose_count}")
+                blob.compose(
+                    sources[start:start + self.MAX_COMPOSE_SOURCES],
+                    timeout=self._timeout,
+                )
+                composed.append(blob)
+                compose_count += 1
+            sources = composed
+
+        bucket.blob(object_name).compose(sources, timeout=self._timeout)
+        self.abort_multipart_upload(bucket_name, object_name, upload_id)
+
+    def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        """Drop the uploaded parts of a multipart upload"""
+        failed = self.delete_files(bucket_name, (
+            obj.object_name for obj in self.list_objects(
+                bucket_name,
+                f"{self._get_parts_folder(object_name, upload_id)}/",
+                recursive=True,
+            )
+        ))
+        return not failed
+
     def delete_file(self, bucket_name: str, object_name: str) -> bool:
         """
         Delete a file from Google Cloud Storage
-        
+
         Args:
             bucket_name: Name of the bucket
             object_name: Object name in the bucket
-            
+
         Returns:
             True if successful, False otherwise
         """
+        from google.cloud.exceptions import NotFound
+
         try:
-            # Get the appropriate bucket
-            if bucket_name == self.media_bucket_name and self.media_bucket:
-                bucket = self.media_bucket
-            elif bucket_name == self.static_bucket_name and self.static_bucket:
-                bucket = self.static_bucket
-            else:
-                bucket = self.client.bucket(bucket_name)
-            
-            blob = bucket.blob(object_name)
-            blob.delete()
-            
+            blob = self._get_bucket(bucket_name).blob(object_name)
+            blob.delete(timeout=self._timeout)
+
             logger.info(f"File deleted from GCS: {bucket_name}/{object_name}")
             return True
-            
+
         except NotFound:
             logger.warning(
                 f"File not found in GCS: {bucket_name}/{object_name}"
@@ -129,15 +298,38 @@ class GoogleCloudStorageClient:
             logger.error(f"Failed to delete file from GCS: {e}")
             return False
 
+    def delete_files(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> List[str]:
+        """
+        Delete objects with batch requests (up to 100 objects per batch)
+        Returns: names of the objects that could not be deleted
+        """
+        bucket = self._get_bucket(bucket_name)
+        object_names = list(object_names)
+
+        failed = []
+        for start in range(0, len(object_names), 100):
+            names = object_names[start:start + 100]
+            try:
+                # Missing objects are skipped, like in S3
+                bucket.delete_blobs(
+                    names, on_error=lambda blob: None, timeout=self._timeout
+                )
+            except Exception as e:
+                logger.error(f"Failed to delete files from GCS: {e}")
+                failed.extend(names)
+        return failed
+
     def delete_user_files_by_template(self, user_id: int,
                                       template_type: str) -> bool:
         """
         Delete existing user files of a specific template type
-        
+
         Args:
             user_id: User ID
             template_type: Template type to delete
-            
+
         Returns:
             True if any files were deleted, False otherwise
         """
@@ -145,15 +337,15 @@ class GoogleCloudStorageClient:
             if not self.media_bucket:
                 logger.error("Media bucket not initialized")
                 return False
-            
+
             # Get user folder path
             user_folder = self.get_user_folder_path(user_id, "data_uploads")
             prefix = f"{user_folder}/{template_type}_"
-            
+
             # List and delete files with the template prefix
             deleted_count = 0
             blobs = self.media_bucket.list_blobs(prefix=prefix)
-            
+
             for blob in blobs:
                 try:
                     blob.delete()
@@ -161,101 +353,72 @@ class GoogleCloudStorageClient:
                     logger.info(f"Deleted file: {blob.name}")
                 except Exception as e:
                     logger.error(f"Failed to delete blob {blob.name}: {e}")
-            
+
             if deleted_count > 0:
                 logger.info(f"Deleted {deleted_count} files for user {user_id}, template {template_type}")
                 return True
-            
+
             return False
-            
+
         except Exception as e:
             logger.error(f"Failed to delete user files: {e}")
             return False
-    
-    def list_user_files(self, user_id: int, folder_type: str = "data_uploads") -> List[str]:
-        """
-        List files for a specific user
-        
-        Args:
-            user_id: User ID
-            folder_type: Type of folder to list
-            
-        Returns:
-            List of file names
-        """
-        try:
-            if not self.media_bucket:
-                logger.error("Media bucket not initialized")
-                return []
-            
-            user_folder = self.get_user_folder_path(user_id, folder_type)
-            blobs = self.media_bucket.list_blobs(prefix=f"{user_folder}/")
-            
-            return [blob.name for blob in blobs]
-            
-        except Exception as e:
-            logger.error(f"Failed to list user files: {e}")
-            return []
-    
-    def get_file_url(self, bucket_name: str, object_name: str, 
-                    expiration: int = 3600) -> Optional[str]:
+
+    def get_file_url(self, bucket_name: str, object_name: str,
+                     expires_in_seconds: int = 3600) -> Optional[str]:
         """
         Get a signed URL for a file
-        
+
         Args:
             bucket_name: Name of the bucket
             object_name: Object name in the bucket
-            expiration: URL expiration time in seconds
-            
+            expires_in_seconds: URL expiration time in seconds
+
         Returns:
             Signed URL or None if failed
         """
         try:
-            # Get the appropriate bucket
-            if bucket_name == self.media_bucket_name and self.media_bucket:
-                bucket = self.media_bucket
-            elif bucket_name == self.static_bucket_name and self.static_bucket:
-                bucket = self.static_bucket
-            else:
-                bucket = self.client.bucket(bucket_name)
-            
-            blob = bucket.blob(object_name)
-            
+            blob = self._get_bucket(bucket_name).blob(object_name)
+
             # Generate signed URL
-            url = blob.generate_signed_url(expiration=expiration)
+            url = blob.generate_signed_url(
+                expiration=timedelta(seconds=expires_in_seconds)
+            )
             return url
-            
+
         except Exception as e:
             logger.error(f"Failed to generate signed URL: {e}")
             return None
-    
+
+    def get_upload_url(self, bucket_name: str, object_name: str,
+                       expires_in_seconds: int = 3600) -> str:
+        """Get a signed URL for uploading an object with a PUT request"""
+        blob = self._get_bucket(bucket_name).blob(object_name)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=expires_in_seconds),
+            method="PUT",
+        )
+
     def file_exists(self, bucket_name: str, object_name: str) -> bool:
         """
         Check if a file exists in Google Cloud Storage
-        
+
         Args:
             bucket_name: Name of the bucket
             object_name: Object name in the bucket
-            
+
         Returns:
             True if file exists, False otherwise
         """
         try:
-            # Get the appropriate bucket
-            if bucket_name == self.media_bucket_name and self.media_bucket:
-                bucket = self.media_bucket
-            elif bucket_name == self.static_bucket_name and self.static_bucket:
-                bucket = self.static_bucket
-            else:
-                bucket = self.client.bucket(bucket_name)
-            
-            blob = bucket.blob(object_name)
+            blob = self._get_bucket(bucket_name).blob(object_name)
             return blob.exists()
-            
+
         except Exception as e:
             logger.error(f"Failed to check if file exists: {e}")
             return False
 
 
-# Global instance
-GCS_CLIENT = GoogleCloudStorageClient()
\ No newline at end of file
+# Global instance, connects on first use
+GCS_CLIENT = GoogleCloudStorageClient()
@@ -0,0 +1,278 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.instances.storage_backend import (
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageObject,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFileSystemStorage(StorageBackend):
+    """
+    Storage backend keeping objects as files under a root directory,
+    <root>/<bucket>/<object name>, so the upload and analysis pipeline
+    runs without object storage. Content type and metadata are kept in
+    a sidecar file under <root>/.meta; the ETag is derived from the
+    modification time and size of the file.
+    """
+
+    is_remote = False
+
+    META_FOLDER = ".meta"
+    MULTIPART_FOLDER = ".multipart"
+    # Bytes copied at a time between files
+    COPY_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _get_path(self, bucket_name: str, object_name: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, bucket_name, object_name))
+        if not path.startswith(os.path.join(self.root, bucket_name) + os.sep):
+            raise ValueError(f"Invalid object name: {object_name}")
+        return path
+
+    def _get_meta_path(self, bucket_name: str, object_name: str) -> str:
+        return os.path.join(
+            self.root, self.META_FOLDER, bucket_name, f"{object_name}.json"
+        )
+
+    def upload_file(
+        self,
+        bucket_name: str,
+        object_name: str,
+        file_data: IO[bytes],
+        file_size: int,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ):
+        """Write an object atomically from a binary file object"""
+        path = self._get_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_file = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix=".upload-", delete=False
+        )
+        try:
+            with temp_file:
+                shutil.copyfileobj(file_data, temp_file, self.COPY_BUFFER_SIZE)
+            os.replace(temp_file.name, path)
+        except Exception:
+            os.unlink(temp_file.name)
+            raise
+
+        self._write_meta(bucket_name, object_name, content_type, metadata)
+
+    def _write_meta(
+        self,
+        bucket_name: str,
+        object_name: str,
+        content_type: Optional[str],
+        metadata: Optional[Dict[str, str]],
+    ):
+        meta_path = self._get_meta_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(meta_path, "w") as meta_file:
+            json.dump(
+                {"content_type": content_type, "metadata": metadata or {}},
+                meta_file,
+            )
+
+    def _read_meta(self, bucket_name: str, object_name: str) -> Dict:
+        try:
+            with open(self._get_meta_path(bucket_name, object_name)) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return {}
+
+    @contextmanager
+    def open_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        offset: int = 0,
+        length: int = 0,
+        etag: Optional[str] = None,
+    ) -> Iterator[IO[bytes]]:
+        """Open an object for streaming reads"""
+        if etag and self.stat_object(bucket_name, object_name).etag != etag:
+            raise ObjectNotFoundError(
+                f"{bucket_name}/{object_name} with ETag {etag}"
+            )
+        try:
+            file = open(self._get_path(bucket_name, object_name), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+
+        with file:
+            if offset:
+                file.seek(offset)
+            if length:
+                yield _LimitedReader(file, length)
+            else:
+                yield file
+
+    def stat_object(self, bucket_name: str, object_name: str) -> StorageObject:
+        try:
+            stat = os.stat(self._get_path(bucket_name, object_name))
+        except FileNotFoundError:
+            raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+
+        meta = self._read_meta(bucket_name, object_name)
+        return StorageObject(
+            object_name=object_name,
+            size=stat.st_size,
+            etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+            last_modified=datetime.datetime.fromtimestamp(
+                stat.st_mtime, tz=datetime.timezone.utc
+            ),
+            content_type=meta.get("content_type"),
+            metadata=meta.get("metadata", {}),
+        )
+
+    def list_objects(
+        self, bucket_name: str, prefix: str = "", recursive: bool = False
+    ) -> Iterator[StorageObject]:
+        """List objects under a prefix, in name order like S3"""
+        bucket_path = os.path.join(self.root, bucket_name)
+        folder, _, name_prefix = prefix.rpartition("/")
+        folder_path = os.path.join(bucket_path, folder)
+        if not os.path.isdir(folder_path):
+            return
+
+        for entry in sorted(os.scandir(folder_path), key=lambda e: e.name):
+            if (not entry.name.startswith(name_prefix)
+                    or entry.name.startswith(".")):
+                continue
+            object_name = f"{folder}/{entry.name}" if folder else entry.name
+
+            if entry.is_dir():
+                if recursive:
+                    yield from self.list_objects(
+                        bucket_name, f"{object_name}/", recursive=True
+                    )
+                else:
+                    yield StorageObject(
+                        object_name=f"{object_name}/", is_dir=True
+                    )
+            else:
+                yield self.stat_object(bucket_name, object_name)
+
+    def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        try:
+            os.unlink(self._get_path(bucket_name, object_name))
+        except FileNotFoundError:
+            return False
+        try:
+            os.unlink(self._get_meta_path(bucket_name, object_name))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def delete_files(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> List[str]:
+        # Deleting a missing object is not an error, like in S3
+        for object_name in object_names:
+            self.delete_file(bucket_name, object_name)
+        return []
+
+    def _get_multipart_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, self.MULTIPART_FOLDER, upload_id)
+
+    def create_multipart_upload(
+        self, bucket_name: str, object_name: str, content_type: str = None
+    ) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._get_multipart_path(upload_id))
+        self._write_meta(bucket_name, object_name, content_type, None)
+        return upload_id
+
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+    ) -> str:
+        part_path = os.path.join(
+            self._get_multipart_path(upload_id), str(part_number)
+        )
+        with open(part_path, "wb") as part_file:
+            part_file.write(data)
+        return f"{part_number}-{len(data):x}"
+
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ):
+        """Concatenate the parts into the object"""
+        multipart_path = self._get_multipart_path(upload_id)
+        path = self._get_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        assembled_path = os.path.join(multipart_path, "assembled")
+        with open(assembled_path, "wb") as assembled:
+            for part_number, _ in sorted(parts):
+                with open(
+                    os.path.join(multipart_path, str(part_number)), "rb"
+                ) as part_file:
+                    shutil.copyfileobj(
+                        part_file, assembled, self.COPY_BUFFER_SIZE
+                    )
+        os.replace(assembled_path, path)
+        shutil.rmtree(multipart_path)
+
+    def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        shutil.rmtree(self._get_multipart_path(upload_id), ignore_errors=True)
+        return True
+
+    def get_file_url(
+        self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
+    ) -> str:
+        return f"file://{self._get_path(bucket_name, object_name)}"
+
+    def get_upload_url(
+        self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
+    ) -> str:
+        raise NotImplementedError(
+            "Local storage does not support presigned uploads"
+        )
+
+
+class _LimitedReader:
+    """Reads at most `length` bytes of a file, for ranged reads"""
+
+    def __init__(self, file: IO[bytes], length: int):
+        self._file = file
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def stream(self, amt: int = 64 * 1024) -> Iterator[bytes]:
+        while True:
+            data = self.read(amt)
+            if not data:
+                return
+            yield data
@@ -1,16 +1,35 @@
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import certifi
+import urllib3
 from django.conf import settings
 from minio import Minio
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 
+from config.instances.storage_backend import (
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageObject,
+)
 
-class MinIOClient:
+
+class MinIOClient(StorageBackend):
     """Singleton MinIO client"""
 
+    # S3 error codes of missing objects and buckets
+    NOT_FOUND_CODES = ("NoSuchKey", "NoSuchBucket", "ResourceNotFound")
+    USER_METADATA_PREFIX = "x-amz-meta-"
+
     _instance: Optional["MinIOClient"] = None
     _client: Optional[Minio] = None
     _initialized: bool = False
+    # The client and its connection pool are shared by upload threads
+    _lock = threading.Lock()
 
     def __new__(cls) -> "MinIOClient":
         if cls._instance is None:
@@ -23,9 +42,11 @@ class MinIOClient:
 
     def _initialize_client(self):
         """Initialize MinIO client and create buckets"""
-        if self._initialized:
-            return
+        with self._lock:
+            if not self._initialized:
+                self._initialize_client_locked()
 
+    def _initialize_client_locked(self):
         try:
             print(f"🔧 Initializing MinIO with:")
             print(f"   endpoint: {settings.MINIO_ENDPOINT}")
@@ -37,6 +58,7 @@ class MinIOClient:
                 access_key=settings.MINIO_ACCESS_KEY,
                 secret_key=settings.MINIO_SECRET_KEY,
                 secure=settings.MINIO_USE_HTTPS,
+                http_client=self._build_http_client(),
             )
             self._ensure_buckets_exist()
             self._initialized = True
@@ -48,6 +70,25 @@ class MinIOClient:
             print(f"   MINIO_USE_HTTPS: {getattr(settings, 'MINIO_USE_HTTPS', 'NOT SET')}")
             raise
 
+    @staticmethod
+    def _build_http_client() -> urllib3.PoolManager:
+        """Connection pool shared by every thread, sized by settings"""
+        return urllib3.PoolManager(
+            maxsize=settings.STORAGE_POOL_SIZE,
+            block=settings.STORAGE_POOL_BLOCK,
+            timeout=urllib3.Timeout(
+                connect=settings.STORAGE_CONNECT_TIMEOUT_SECONDS,
+                read=settings.STORAGE_READ_TIMEOUT_SECONDS,
+            ),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=certifi.where(),
+            retries=urllib3.Retry(
+                total=5,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504],
+            ),
+        )
+
     @property
     def client(self) -> Minio:
         if not self._initialized:
@@ -66,13 +107,6 @@ class MinIOClient:
             except S3Error as e:
                 print(f"Error creating bucket {bucket_name}: {e}")
 
-    def get_user_folder_path(self, user_id: int, file_type: str = "") -> str:
-        """Get user's private folder path"""
-        base_path = f"user_{user_id}"
-        if file_type:
-            return f"{base_path}/{file_type}"
-        return base_path
-
     def upload_file(
         self,
         bucket_name: str,
@@ -80,8 +114,9 @@ class MinIOClient:
         file_data,
         file_size: int,
         content_type: str = None,
+        metadata: Optional[Dict[str, str]] = None,
     ):
-        """Upload file to MinIO"""
+        """Upload file to MinIO, metadata is stored as x-amz-meta-* headers"""
         if not self._initialized:
             self._initialize_client()
 
@@ -92,12 +127,162 @@ class MinIOClient:
                 data=file_data,
                 length=file_size,
                 content_type=content_type,
+                metadata=metadata,
             )
             return result
         except S3Error as e:
             print(f"Error uploading file: {e}")
             raise
 
+    @contextmanager
+    def open_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        offset: int = 0,
+        length: int = 0,
+        etag: Optional[str] = None,
+    ) -> Iterator[IO[bytes]]:
+        """Open an object for streaming reads"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            response = self._client.get_object(
+                bucket_name,
+                object_name,
+                offset=offset,
+                length=length,
+                request_headers={"If-Match": etag} if etag else None,
+            )
+        except S3Error as e:
+            if e.code in self.NOT_FOUND_CODES:
+                raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+            raise
+        try:
+            yield response
+        finally:
+            response.close()
+            response.release_conn()
+
+    def stat_object(self, bucket_name: str, object_name: str) -> StorageObject:
+        """Get size, ETag and metadata of an object"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            obj = self._client.stat_object(bucket_name, object_name)
+        except S3Error as e:
+            if e.code in self.NOT_FOUND_CODES:
+                raise ObjectNotFoundError(f"{bucket_name}/{object_name}")
+            raise
+
+        return StorageObject(
+            object_name=obj.object_name,
+            size=obj.size or 0,
+            etag=obj.etag,
+            last_modified=obj.last_modified,
+            content_type=obj.content_type,
+            metadata={
+                key[len(self.USER_METADATA_PREFIX):]: value
+                for key, value in (obj.metadata or {}).items()
+                if key.lower().startswith(self.USER_METADATA_PREFIX)
+            },
+        )
+
+    def list_objects(
+        self, bucket_name: str, prefix: str = "", recursive: bool = False
+    ) -> Iterator[StorageObject]:
+        """List objects under a prefix"""
+        if not self._initialized:
+            self._initialize_client()
+
+        for obj in self._client.list_objects(
+            bucket_name, prefix=prefix, recursive=recursive
+        ):
+            yield StorageObject(
+                object_name=obj.object_name,
+                size=obj.size or 0,
+                etag=obj.etag,
+                last_modified=obj.last_modified,
+                is_dir=obj.is_dir,
+            )
+
+    def create_multipart_upload(
+        self, bucket_name: str, object_name: str, content_type: str = None
+    ) -> str:
+        """Start a multipart upload, return its upload id"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            return self._client._create_multipart_upload(
+                bucket_name,
+                object_name,
+                {"Content-Type": content_type or "application/octet-stream"},
+            )
+        except S3Error as e:
+            print(f"Error creating multipart upload: {e}")
+            raise
+
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+    ) -> str:
+        """Upload one part of a multipart upload, return its ETag"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            return self._client._upload_part(
+                bucket_name, object_name, data, None, upload_id, part_number
+            )
+        except S3Error as e:
+            print(f"Error uploading part {part_number}: {e}")
+            raise
+
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ):
+        """Assemble uploaded (part_number, etag) parts into the object"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            return self._client._complete_multipart_upload(
+                bucket_name,
+                object_name,
+                upload_id,
+                [Part(part_number, etag) for part_number, etag in parts],
+            )
+        except S3Error as e:
+            print(f"Error completing multipart upload: {e}")
+            raise
+
+    def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        """Abort a multipart upload and drop its uploaded parts"""
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            self._client._abort_multipart_upload(
+                bucket_name, object_name, upload_id
+            )
+            return True
+        except S3Error as e:
+            print(f"Error aborting multipart upload: {e}")
+            return False
+
     def delete_file(self, bucket_name: str, object_name: str):
         """Delete file from MinIO"""
         if not self._initialized:
@@ -110,6 +295,32 @@ class MinIOClient:
             print(f"Error deleting file: {e}")
             return False
 
+    def delete_files(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> List[str]:
+        """
+        Delete objects with multi-object delete requests
+        (up to 1000 objects per request)
+        Returns: names of the objects that could not be deleted
+        """
+        if not self._initialized:
+            self._initialize_client()
+
+        try:
+            errors = self._client.remove_objects(
+                bucket_name,
+                (DeleteObject(object_name) for object_name in object_names),
+            )
+            # Deletion is lazy, the requests are sent while iterating
+            failed = []
+            for error in errors:
+                print(f"Error deleting file {error.name}: {error.message}")
+                failed.append(error.name)
+            return failed
+        except S3Error as e:
+            print(f"Error deleting files: {e}")
+            raise
+
     def get_file_url(
         self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
     ) -> str:
@@ -119,31 +330,41 @@ class MinIOClient:
 
         try:
             return self._client.presigned_get_object(
-                bucket_name, object_name, expires=expires_in_seconds
+                bucket_name,
+                object_name,
+                expires=timedelta(seconds=expires_in_seconds),
             )
         except S3Error as e:
             print(f"Error getting file URL: {e}")
             raise
 
-    def list_user_files(self, user_id: int, file_type: str = "") -> list:
-        """List files in user's folder"""
+    def get_upload_url(
+        self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
+    ) -> str:
+        """Get presigned URL for uploading an object with a PUT request"""
         if not self._initialized:
             self._initialize_client()
 
         try:
-            user_folder = self.get_user_folder_path(user_id, file_type)
-            prefix = f"{user_folder}/" if file_type else f"{user_folder}/"
-
-            objects = self._client.list_objects(
-                bucket_name="user-data", prefix=prefix, recursive=True
+            return self._client.presigned_put_object(
+                bucket_name,
+                object_name,
+                expires=timedelta(seconds=expires_in_seconds),
             )
-            return list(objects)
         except S3Error as e:
-            print(f"Error listing user files: {e}")
-            return []
+            print(f"Error getting upload URL: {e}")
+            raise
 
-    def delete_user_files_by_template(self, user_id: int, template_type: str) -> bool:
-        """Delete existing files of specific template type for user"""
+    def delete_user_files_by_template(
+        self,
+        user_id: int,
+        template_type: str,
+        keep_object_names: Iterable[str] = (),
+    ) -> bool:
+        """
+        Delete existing files of specific template type for user,
+        except the objects listed in keep_object_names
+        """
         if not self._initialized:
             self._initialize_client()
 
@@ -156,12 +377,15 @@ class MinIOClient:
                 bucket_name="user-data", prefix=prefix, recursive=True
             )
 
-            # Delete each object
-            deleted_count = 0
-            for obj in objects:
-                self._client.remove_object("user-data", obj.object_name)
-                deleted_count += 1
-                print(f"Deleted: {obj.object_name}")
+            # Delete all objects with multi-object delete requests
+            keep_object_names = set(keep_object_names)
+            object_names = [
+                obj.object_name for obj in objects
+                if obj.object_name not in keep_object_names
+            ]
+            failed = self.delete_files("user-data", object_names)
+            deleted_count = len(object_names) - len(failed)
+            print(f"Deleted {deleted_count} files with prefix {prefix}")
 
             return deleted_count > 0
         except S3Error as e:
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator
+
+from django.conf import settings
+
+from config.instances.storage import STORAGE
+
+logger = logging.getLogger(__name__)
+
+
+class LocalObjectCache:
+    """
+    Node-local read-through cache of storage objects on disk (or tmpfs).
+
+    Entries are keyed by bucket, object name and ETag. Every read
+    revalidates with a stat_object request, so a replaced object is
+    fetched again while unchanged ones are served from disk. Files are
+    shared by every process of the node; entries are written atomically
+    and evicted least recently used first once the directory exceeds
+    MINIO_OBJECT_CACHE_MAX_BYTES. Objects of a local storage backend are
+    read in place.
+    """
+
+    TEMP_PREFIX = ".download-"
+    # Bytes copied at a time while an object is downloaded
+    COPY_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.storage = STORAGE
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.storage.is_remote
+
+    @contextmanager
+    def open(self, bucket_name: str, object_name: str) -> Iterator[IO[bytes]]:
+        """
+        Open an object for reading through the cache
+        Args:
+            bucket_name: Bucket of the object
+            object_name: Object name
+        Yields:
+            Binary file object, seekable when served from disk
+        """
+        if not self.enabled:
+            with self.storage.open_object(bucket_name, object_name) as stream:
+                yield stream
+            return
+
+        stat = self.storage.stat_object(bucket_name, object_name)
+        if stat.size > self.max_bytes:
+            with self.storage.open_object(
+                bucket_name, object_name, etag=stat.etag
+            ) as stream:
+                yield stream
+            return
+
+        path = self._get_path(bucket_name, object_name, stat.etag)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            self.misses += 1
+            self._download(bucket_name, object_name, stat.etag, path)
+            file = open(path, "rb")
+        else:
+            self.hits += 1
+            self._touch(path)
+
+        # An open file stays readable if another process evicts it
+        with file:
+            yield file
+
+    def _get_path(self, bucket_name: str, object_name: str, etag: str) -> str:
+        object_key = self._get_object_key(bucket_name, object_name)
+        # GCS ETags are base64 and may contain "/"
+        etag = etag.strip('"').replace("/", "_")
+        return os.path.join(self.cache_dir, f"{object_key}-{etag}")
+
+    @staticmethod
+    def _get_object_key(bucket_name: str, object_name: str) -> str:
+        return hashlib.sha256(
+            f"{bucket_name}/{object_name}".encode("utf-8")
+        ).hexdigest()
+
+    def _download(
+        self, bucket_name: str, object_name: str, etag: str, path: str
+    ):
+        """Download an object version into the cache directory"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = tempfile.NamedTemporaryFile(
+            dir=self.cache_dir, prefix=self.TEMP_PREFIX, delete=False
+        )
+        try:
+            with temp_file, self.storage.open_object(
+                bucket_name, object_name, etag=etag
+            ) as stream:
+                shutil.copyfileobj(stream, temp_file, self.COPY_BUFFER_SIZE)
+            # Readers never see a partially written entry
+            os.replace(temp_file.name, path)
+        except Exception:
+            os.unlink(temp_file.name)
+            raise
+
+        self._remove_stale_versions(bucket_name, object_name, path)
+        self._evict()
+
+    def _remove_stale_versions(
+        self, bucket_name: str, object_name: str, path: str
+    ):
+        """Drop entries of earlier ETags of the same object"""
+        prefix = f"{self._get_object_key(bucket_name, object_name)}-"
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(prefix) and entry.path != path:
+                self._remove(entry.path)
+
+    def _evict(self):
+        """Remove least recently used entries above the size limit"""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.startswith(self.TEMP_PREFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_bytes -= size
+                logger.info(f"Evicted {path} from object cache")
+
+    @staticmethod
+    def _touch(path: str):
+        """Mark an entry as used, eviction is least recently used first"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Removed by another process
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters of this process"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Node-local object cache shared by all services of a process
+OBJECT_CACHE = LocalObjectCache(
+    settings.MINIO_OBJECT_CACHE_DIR, settings.MINIO_OBJECT_CACHE_MAX_BYTES
+)
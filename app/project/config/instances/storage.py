@@ -0,0 +1,24 @@
+"""
+Storage backend of user files, selected by settings.STORAGE_BACKEND.
+"""
+from django.conf import settings
+
+from config.instances.storage_backend import StorageBackend
+
+
+def get_storage_backend(name: str) -> StorageBackend:
+    """Get the storage backend by its STORAGE_BACKEND name"""
+    if name == "minio":
+        from config.instances.minio_client import MINIO_CLIENT
+        return MINIO_CLIENT
+    if name == "gcs":
+        from config.instances.gcs_client import GCS_CLIENT
+        return GCS_CLIENT
+    if name == "local":
+        from config.instances.local_storage import LocalFileSystemStorage
+        return LocalFileSystemStorage(settings.STORAGE_LOCAL_ROOT)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+# Global storage instance used by the services
+STORAGE = get_storage_backend(settings.STORAGE_BACKEND)
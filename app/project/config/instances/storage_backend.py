@@ -0,0 +1,167 @@
+"""
+Storage interface shared by the MinIO, Google Cloud Storage and local
+filesystem backends.
+"""
+import datetime
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ObjectNotFoundError(Exception):
+    """Raised when a requested object does not exist"""
+
+
+@dataclass
+class StorageObject:
+    """Object or folder returned by stat_object and list_objects"""
+
+    object_name: str
+    size: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[datetime.datetime] = None
+    content_type: Optional[str] = None
+    metadata: Dict[str, str] = field(default_factory=dict)
+    # Folder entries of non-recursive listings end with "/"
+    is_dir: bool = False
+
+
+class StorageBackend(ABC):
+    """
+    Object storage used by the services. Objects are addressed by bucket
+    and object name; user files live under user_<id>/<folder>/.
+    """
+
+    # Whether reads are worth keeping in the node-local object cache
+    is_remote = True
+
+    def get_user_folder_path(self, user_id: int, file_type: str = "") -> str:
+        """Get user's private folder path"""
+        base_path = f"user_{user_id}"
+        if file_type:
+            return f"{base_path}/{file_type}"
+        return base_path
+
+    @abstractmethod
+    def upload_file(
+        self,
+        bucket_name: str,
+        object_name: str,
+        file_data: IO[bytes],
+        file_size: int,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ):
+        """Write an object from a binary file object"""
+
+    @abstractmethod
+    @contextmanager
+    def open_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        offset: int = 0,
+        length: int = 0,
+        etag: Optional[str] = None,
+    ) -> Iterator[IO[bytes]]:
+        """
+        Open an object for streaming reads
+        Args:
+            bucket_name: Bucket of the object
+            object_name: Object name
+            offset: First byte to read
+            length: Bytes to read, 0 reads to the end
+            etag: Only read this version of the object
+        Yields:
+            Binary file object
+        Raises:
+            ObjectNotFoundError: If the object does not exist
+        """
+
+    @abstractmethod
+    def stat_object(self, bucket_name: str, object_name: str) -> StorageObject:
+        """
+        Get size, ETag and metadata of an object
+        Raises:
+            ObjectNotFoundError: If the object does not exist
+        """
+
+    def object_exists(self, bucket_name: str, object_name: str) -> bool:
+        try:
+            self.stat_object(bucket_name, object_name)
+            return True
+        except ObjectNotFoundError:
+            return False
+
+    @abstractmethod
+    def list_objects(
+        self, bucket_name: str, prefix: str = "", recursive: bool = False
+    ) -> Iterator[StorageObject]:
+        """List objects under a prefix; without recursive, direct children
+        only, subfolders as is_dir entries"""
+
+    def list_user_files(self, user_id: int, file_type: str = "") -> list:
+        """List files in user's folder"""
+        user_folder = self.get_user_folder_path(user_id, file_type)
+        return list(
+            self.list_objects("user-data", f"{user_folder}/", recursive=True)
+        )
+
+    @abstractmethod
+    def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        """Delete one object, return whether it was deleted"""
+
+    @abstractmethod
+    def delete_files(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> List[str]:
+        """
+        Delete objects in bulk
+        Returns: names of the objects that could not be deleted
+        """
+
+    @abstractmethod
+    def create_multipart_upload(
+        self, bucket_name: str, object_name: str, content_type: str = None
+    ) -> str:
+        """Start a multipart upload, return its upload id"""
+
+    @abstractmethod
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+    ) -> str:
+        """Upload one part of a multipart upload, return its ETag"""
+
+    @abstractmethod
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ):
+        """Assemble uploaded (part_number, etag) parts into the object"""
+
+    @abstractmethod
+    def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        """Abort a multipart upload and drop its uploaded parts"""
+
+    @abstractmethod
+    def get_file_url(
+        self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
+    ) -> str:
+        """Get presigned URL for reading an object"""
+
+    @abstractmethod
+    def get_upload_url(
+        self, bucket_name: str, object_name: str, expires_in_seconds: int = 3600
+    ) -> str:
+        """Get presigned URL for uploading an object with a PUT request"""
@@ -14,6 +14,7 @@ _base_settings: list[str] = [
     "components/valiables.py",
     "components/countries.py",
     "components/currencies.py",
+    "components/user_data.py",
 ]
 
 # Include settings:
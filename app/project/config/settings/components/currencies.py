@@ -108,6 +108,12 @@ CURRENCY_SYMBOLS = {
 }
 
 
+# Digits after the decimal point of amounts, where not 2
+CURRENCY_DECIMAL_PLACES = {
+    'JPY': 0,
+}
+
+
 def get_currency_symbol(currency_code: str) -> str:
     """
     Get currency symbol for the given currency code
@@ -1,4 +1,5 @@
-from os import environ
+import tempfile
+from os import environ, path
 from typing import Any
 
 from decouple import config
@@ -22,6 +23,29 @@ CHANNEL_LAYERS: dict[str, Any] = {
     },
 }
 
+# Object storage backend of user files: "minio", "gcs" or "local"
+STORAGE_BACKEND: str = config("STORAGE_BACKEND", default="minio")
+# Connections kept open to the storage; keep it at least
+# USER_DATA_UPLOAD_WORKERS so parallel part uploads don't queue. With
+# STORAGE_POOL_BLOCK requests wait for a free connection instead of
+# opening (and dropping) extra ones
+STORAGE_POOL_SIZE: int = config("STORAGE_POOL_SIZE", cast=int, default=10)
+STORAGE_POOL_BLOCK: bool = config("STORAGE_POOL_BLOCK", cast=bool, default=False)
+STORAGE_CONNECT_TIMEOUT_SECONDS: float = config(
+    "STORAGE_CONNECT_TIMEOUT_SECONDS", cast=float, default=300
+)
+STORAGE_READ_TIMEOUT_SECONDS: float = config(
+    "STORAGE_READ_TIMEOUT_SECONDS", cast=float, default=300
+)
+# Root directory of the "local" backend, one folder per bucket
+STORAGE_LOCAL_ROOT: str = config(
+    "STORAGE_LOCAL_ROOT",
+    default=path.join(tempfile.gettempdir(), "mariami-storage"),
+)
+# Bucket of user files with the "gcs" backend, the "user-data" name
+# used by the services is mapped to it
+STORAGE_GCS_BUCKET: str = config("STORAGE_GCS_BUCKET", default="")
+
 # MinIO settings for media files only
 MINIO_ENDPOINT = config("MINIO_ENDPOINT", default="mariami-minio-dev:9000")
 MINIO_DOMAIN_URL = config("MINIO_DOMAIN_URL", default=None)
@@ -30,6 +54,17 @@ MINIO_SECRET_KEY = config("MINIO_SECRET_KEY", default="minioadmin")
 MINIO_USE_HTTPS = config("MINIO_USE_HTTPS", default=False, cast=bool)
 MINIO_PRIVATE_BUCKETS = ["user-data"]
 
+# Node-local read-through cache of MinIO objects, shared by the processes
+# of a node; point it at a tmpfs mount to keep it in memory. A size of 0
+# disables it
+MINIO_OBJECT_CACHE_DIR: str = config(
+    "MINIO_OBJECT_CACHE_DIR",
+    default=path.join(tempfile.gettempdir(), "minio-object-cache"),
+)
+MINIO_OBJECT_CACHE_MAX_BYTES: int = config(
+    "MINIO_OBJECT_CACHE_MAX_BYTES", cast=int, default=1024 * 1024 * 1024
+)
+
 # Storage settings for Django - use local filesystem for static files
 # DEFAULT_FILE_STORAGE = "config.storages.MinIOPrivateStorage"
 
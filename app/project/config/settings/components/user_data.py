@@ -0,0 +1,65 @@
+from decouple import config
+
+# Backend used by analysis services to aggregate uploaded user data:
+# "dataframe" - load the stored file and aggregate it with pandas
+# "sql" - run GROUP BY queries over the ingested ledger tables; uploads
+#         are only ingested with it, run backfill_ledger before enabling
+USER_DATA_ANALYSIS_BACKEND: str = config(
+    "USER_DATA_ANALYSIS_BACKEND", cast=str, default="dataframe"
+)
+
+# Memory budget (bytes) of the per-process cache of parsed user datasets
+USER_DATA_FRAME_CACHE_MAX_BYTES: int = config(
+    "USER_DATA_FRAME_CACHE_MAX_BYTES", cast=int, default=64 * 1024 * 1024
+)
+
+# Part size (bytes) of multipart uploads of streamed data files; MinIO
+# requires at least 5 MiB for every part but the last one
+USER_DATA_UPLOAD_PART_SIZE: int = max(
+    config("USER_DATA_UPLOAD_PART_SIZE", cast=int, default=8 * 1024 * 1024),
+    5 * 1024 * 1024,
+)
+
+# Size limit (bytes) of a single file on the streaming upload endpoint
+USER_DATA_STREAMING_UPLOAD_MAX_BYTES: int = config(
+    "USER_DATA_STREAMING_UPLOAD_MAX_BYTES", cast=int, default=1024 * 1024 * 1024
+)
+
+# Threads uploading and converting the files of one upload request
+USER_DATA_UPLOAD_WORKERS: int = config(
+    "USER_DATA_UPLOAD_WORKERS", cast=int, default=3
+)
+
+# Objects deleted per multi-object delete request by the storage GC
+USER_DATA_GC_BATCH_SIZE: int = config(
+    "USER_DATA_GC_BATCH_SIZE", cast=int, default=1000
+)
+
+# Age (seconds) below which unreferenced objects are kept, so uploads
+# still in progress are not collected
+USER_DATA_GC_GRACE_SECONDS: int = config(
+    "USER_DATA_GC_GRACE_SECONDS", cast=int, default=6 * 60 * 60
+)
+
+# Age (seconds) after which superseded dataset versions are deleted by
+# the storage GC, together with their ledger rows and objects
+USER_DATA_VERSION_RETENTION_SECONDS: int = config(
+    "USER_DATA_VERSION_RETENTION_SECONDS", cast=int, default=30 * 24 * 60 * 60
+)
+
+# Codec of stored original data files: "zstd" compresses CSV uploads,
+# "identity" stores them as uploaded
+USER_DATA_STORAGE_CODEC: str = config(
+    "USER_DATA_STORAGE_CODEC", cast=str, default="zstd"
+)
+
+# zstd compression level of stored data files (1-22)
+USER_DATA_ZSTD_LEVEL: int = config(
+    "USER_DATA_ZSTD_LEVEL", cast=int, default=3
+)
+
+# Lifetime (seconds) of presigned direct-to-storage upload URLs; must stay
+# below USER_DATA_GC_GRACE_SECONDS so pending uploads are not collected
+USER_DATA_PRESIGNED_UPLOAD_EXPIRY_SECONDS: int = config(
+    "USER_DATA_PRESIGNED_UPLOAD_EXPIRY_SECONDS", cast=int, default=60 * 60
+)
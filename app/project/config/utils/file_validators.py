@@ -1,7 +1,10 @@
+import codecs
+import csv
 import io
 import pandas as pd
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from django.core.files.uploadedfile import UploadedFile
+from openpyxl import load_workbook
 
 
 class FileFormatValidator:
@@ -22,11 +25,41 @@ class FileFormatValidator:
             'Status', 'Client', 'Date_Paid'
         ]
     }
+
+    # Value types checked row by row; empty cells are always allowed
+    TEMPLATE_COLUMN_TYPES = {
+        'pnl_template': {
+            'Month': 'date', 'Revenue': 'number', 'COGS': 'number',
+            'Payroll': 'number', 'Rent': 'number', 'Marketing': 'number',
+            'Other_Expenses': 'number', 'Net_Profit': 'number'
+        },
+        'transactions_template': {
+            'Date': 'date', 'Amount': 'number'
+        },
+        'invoices_template': {
+            'Date_Issued': 'date', 'Date_Due': 'date', 'Amount': 'number',
+            'Date_Paid': 'date'
+        }
+    }
+
+    # Bytes read from the start of a CSV file to find its header row
+    HEADER_SNIFF_BYTES = 64 * 1024
+    # Rows validated at a time, so memory does not grow with the file
+    ROW_CHUNK_SIZE = 5000
+    # Row errors kept in the report, the rest are only counted
+    MAX_ROW_ERRORS = 100
+    # Row errors listed in the summary message
+    SUMMARY_ROW_ERRORS = 5
+
+    INVALID_ROWS_ERROR_CODE = 'invalid_file_rows'
     
     @classmethod
-    def validate_file_format(cls, file: UploadedFile) -> Tuple[bool, str, Union[str, None]]:
+    def validate_file_format(
+        cls, file: UploadedFile, check_rows: bool = True
+    ) -> Tuple[bool, str, Union[str, None]]:
         """
         Validate file format and detect template type
+        check_rows=False validates the header only
         Returns: (is_valid, error_message, template_type)
         """
         try:
@@ -34,20 +67,28 @@ class FileFormatValidator:
             if not cls._is_valid_extension(file.name):
                 return False, "Неподдерживаемый формат файла. Разрешены только CSV и Excel файлы.", None
             
-            # Read file content
-            df = cls._read_file_content(file)
-            if df is None:
+            # Read only the header row
+            columns = cls._read_header(file)
+            if columns is None:
                 return False, "Не удалось прочитать файл. Проверьте формат файла.", None
             
             # Detect template type
-            template_type = cls._detect_template_type(df.columns.tolist())
+            template_type = cls._detect_template_type(columns)
             if not template_type:
                 return False, "Неизвестный формат файла. Файл не соответствует ни одному из ожидаемых шаблонов.", None
             
             # Validate columns
-            is_valid, error = cls._validate_columns(df.columns.tolist(), template_type)
+            is_valid, error = cls._validate_columns(columns, template_type)
             if not is_valid:
                 return False, error, None
+
+            # Validate row values chunk by chunk
+            if check_rows:
+                report = cls.validate_rows(
+                    file, cls.TEMPLATE_COLUMN_TYPES[template_type]
+                )
+                if report["error_count"]:
+                    return False, cls._build_row_errors_response(report), None
             
             return True, "Файл валиден", template_type
             
@@ -55,17 +96,27 @@ class FileFormatValidator:
             return False, f"Ошибка при валидации файла: {str(e)}", None
     
     @classmethod
-    def validate_multiple_files(cls, files: List[UploadedFile]) -> Tuple[bool, str, Dict[str, str]]:
+    def validate_multiple_files(
+        cls, files: List[UploadedFile], check_rows: bool = True
+    ) -> Tuple[bool, str, Dict[str, str]]:
         """
         Validate multiple files
         Returns: (all_valid, error_message, file_template_mapping)
+        error_message is a dict with per-file row errors if any file
+        has invalid rows
         """
         file_template_mapping = {}
         errors = []
+        row_errors = {}
         
         for file in files:
-            is_valid, error, template_type = cls.validate_file_format(file)
+            is_valid, error, template_type = cls.validate_file_format(
+                file, check_rows
+            )
             if not is_valid:
+                if isinstance(error, dict):
+                    row_errors[file.name] = error["row_errors"]
+                    error = error["message"]
                 errors.append(f"{file.name}: {error}")
             else:
                 # Check for duplicate template types
@@ -74,6 +125,13 @@ class FileFormatValidator:
                 else:
                     file_template_mapping[file.name] = template_type
         
+        if row_errors:
+            return False, {
+                "code": cls.INVALID_ROWS_ERROR_CODE,
+                "message": "; ".join(errors),
+                "row_errors": row_errors,
+            }, {}
+
         if errors:
             return False, "; ".join(errors), {}
         
@@ -81,11 +139,12 @@ class FileFormatValidator:
     
     @classmethod
     def validate_pnl_with_metadata(
-        cls, file: UploadedFile, metadata: dict
-    ) -> Tuple[bool, str]:
+        cls, file: UploadedFile, metadata: dict, check_rows: bool = True
+    ) -> Tuple[bool, Union[str, Dict]]:
         """
         Validate PnL file with custom metadata columns
         Returns: (is_valid, error_message)
+        error_message is a dict with row errors if the file has invalid rows
         """
         try:
             # Check file extension
@@ -96,73 +155,97 @@ class FileFormatValidator:
                     "Разрешены только CSV и Excel файлы."
                 )
             
-            # Read file content
-            df = cls._read_file_content(file)
-            if df is None:
+            # Read only the header row
+            columns = cls._read_header(file)
+            if columns is None:
                 return (
                     False,
                     "Не удалось прочитать файл. Проверьте формат файла."
                 )
             
-            # Get actual columns from file
-            actual_columns = set(df.columns.str.strip())  # Remove whitespace
-            
-            # Extract required columns from metadata
-            required_columns = set()
-            missing_columns = []
-            
-            # Check date column
-            date_column = metadata.get('date_column')
-            if date_column:
-                required_columns.add(date_column.strip())
-                if date_column.strip() not in actual_columns:
-                    missing_columns.append(f"Колонка даты: '{date_column}'")
-            
-            # Check expense columns
-            expense_columns = metadata.get('expense_columns', [])
-            if expense_columns:
-                for col in expense_columns:
-                    col_stripped = col.strip()
-                    required_columns.add(col_stripped)
-                    if col_stripped not in actual_columns:
-                        missing_columns.append(f"Колонка расходов: '{col}'")
-            
-            # Check revenue columns
-            revenue_columns = metadata.get('revenue_columns', [])
-            if revenue_columns:
-                for col in revenue_columns:
-                    col_stripped = col.strip()
-                    required_columns.add(col_stripped)
-                    if col_stripped not in actual_columns:
-                        missing_columns.append(f"Колонка доходов: '{col}'")
-            
-            # Check if any required columns are missing
-            if missing_columns:
-                error_msg = (
-                    f"Отсутствуют указанные колонки в файле: "
-                    f"{', '.join(missing_columns)}"
-                )
-                return False, error_msg
+            error, column_types = cls.check_pnl_metadata_columns(
+                columns, metadata
+            )
+            if error:
+                return False, error
             
+            if not check_rows:
+                return True, "PnL файл с метаданными валиден"
+
+            report = cls.validate_rows(file, column_types)
+
             # Check if file has at least some data
-            if df.empty:
+            if not report["rows_checked"]:
                 return False, "Файл не содержит данных"
-            
-            # Validate date column contains valid dates (if specified)
-            if date_column and date_column.strip() in actual_columns:
-                try:
-                    pd.to_datetime(df[date_column.strip()], errors='coerce')
-                except Exception:
-                    return (
-                        False,
-                        f"Колонка '{date_column}' содержит недопустимые даты"
-                    )
+
+            if report["error_count"]:
+                return False, cls._build_row_errors_response(report)
             
             return True, "PnL файл с метаданными валиден"
             
         except Exception as e:
             return False, f"Ошибка при валидации PnL файла: {str(e)}"
     
+    @classmethod
+    def check_pnl_metadata_columns(
+        cls, columns: List[str], metadata: dict
+    ) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        Check that the header has the columns configured in PnL metadata
+        Returns: (error_message, column_types)
+        column_types maps header names to 'date' or 'number' for row checks
+        """
+        # Get actual columns from file
+        actual_columns = set(col.strip() for col in columns)  # Remove whitespace
+        
+        # Extract required columns from metadata
+        required_columns = set()
+        missing_columns = []
+        
+        # Check date column
+        date_column = metadata.get('date_column')
+        if date_column:
+            required_columns.add(date_column.strip())
+            if date_column.strip() not in actual_columns:
+                missing_columns.append(f"Колонка даты: '{date_column}'")
+        
+        # Check expense columns
+        expense_columns = metadata.get('expense_columns', [])
+        if expense_columns:
+            for col in expense_columns:
+                col_stripped = col.strip()
+                required_columns.add(col_stripped)
+                if col_stripped not in actual_columns:
+                    missing_columns.append(f"Колонка расходов: '{col}'")
+        
+        # Check revenue columns
+        revenue_columns = metadata.get('revenue_columns', [])
+        if revenue_columns:
+            for col in revenue_columns:
+                col_stripped = col.strip()
+                required_columns.add(col_stripped)
+                if col_stripped not in actual_columns:
+                    missing_columns.append(f"Колонка доходов: '{col}'")
+        
+        # Check if any required columns are missing
+        if missing_columns:
+            error_msg = (
+                f"Отсутствуют указанные колонки в файле: "
+                f"{', '.join(missing_columns)}"
+            )
+            return error_msg, {}
+
+        # Date and amount values of the configured columns are checked
+        # (header names in the file may carry surrounding whitespace)
+        column_types = {}
+        for col in columns:
+            if col.strip() == (date_column or '').strip():
+                column_types[col] = 'date'
+            elif col.strip() in required_columns:
+                column_types[col] = 'number'
+
+        return None, column_types
+
     @classmethod
     def _is_valid_extension(cls, filename: str) -> bool:
         """Check if file has valid extension"""
@@ -170,23 +253,170 @@ class FileFormatValidator:
         return any(filename.lower().endswith(ext) for ext in valid_extensions)
     
     @classmethod
-    def _read_file_content(
-        cls, file: UploadedFile
-    ) -> Union[pd.DataFrame, None]:
-        """Read file content into DataFrame"""
+    def validate_rows(
+        cls, file: UploadedFile, column_types: Dict[str, str]
+    ) -> Dict:
+        """
+        Check row values in fixed-size chunks
+        Args:
+            file: Uploaded CSV/Excel file
+            column_types: Column name to 'date' or 'number'
+        Returns:
+            Report with rows_checked, error_count and row errors
+            ({row, column, value, message}, rows numbered as in the file)
+        """
+        report = {"rows_checked": 0, "error_count": 0, "errors": []}
+
+        try:
+            for chunk in cls._iter_row_chunks(file):
+                report["rows_checked"] += len(chunk)
+                cls._validate_chunk(chunk, column_types, report)
+        finally:
+            file.seek(0)
+
+        return report
+
+    @classmethod
+    def _validate_chunk(
+        cls, chunk: pd.DataFrame, column_types: Dict[str, str], report: Dict
+    ):
+        """Add the invalid values of a chunk to the report"""
+        for column, column_type in column_types.items():
+            if column not in chunk.columns:
+                continue
+
+            values = chunk[column]
+            is_filled = values.notna() & (values.astype(str).str.strip() != '')
+
+            if column_type == 'number':
+                parsed = pd.to_numeric(values, errors='coerce')
+                message = "Некорректное число"
+            else:
+                parsed = pd.to_datetime(values, errors='coerce')
+                message = "Некорректная дата"
+
+            for row_index, value in values[is_filled & parsed.isna()].items():
+                # Vectorized date parsing can reject values in a format
+                # different from the rest of the chunk
+                if (column_type == 'date'
+                        and not pd.isna(pd.to_datetime(value, errors='coerce'))):
+                    continue
+
+                report["error_count"] += 1
+                if len(report["errors"]) < cls.MAX_ROW_ERRORS:
+                    report["errors"].append({
+                        # Account for the header row and 1-based numbering
+                        "row": int(row_index) + 2,
+                        "column": column,
+                        "value": str(value),
+                        "message": message,
+                    })
+
+    @classmethod
+    def _build_row_errors_response(cls, report: Dict) -> Dict:
+        """Build the structured error returned for invalid rows"""
+        details = "; ".join(
+            f"строка {error['row']}, колонка '{error['column']}': "
+            f"{error['message']} '{error['value']}'"
+            for error in report["errors"][:cls.SUMMARY_ROW_ERRORS]
+        )
+        return {
+            "code": cls.INVALID_ROWS_ERROR_CODE,
+            "message": (
+                f"Найдено некорректных значений: {report['error_count']} "
+                f"({details})"
+            ),
+            "row_errors": report["errors"],
+        }
+
+    @classmethod
+    def _read_header(cls, file: UploadedFile) -> Optional[List[str]]:
+        """Read column names without loading the file rows"""
         try:
             file.seek(0)  # Reset file pointer
-            content = file.read()
-            
+
             if file.name.lower().endswith('.csv'):
-                return pd.read_csv(io.StringIO(content.decode('utf-8')))
+                head = file.read(cls.HEADER_SNIFF_BYTES)
+                header_line = head.split(b'\n', 1)[0].decode('utf-8-sig')
+                if not header_line.strip():
+                    return None
+                return next(csv.reader([header_line.rstrip('\r')]))
             elif file.name.lower().endswith(('.xlsx', '.xls')):
-                return pd.read_excel(io.BytesIO(content))
-            
+                return pd.read_excel(file, nrows=0).columns.tolist()
+
         except Exception as e:
             print(f"Error reading file {file.name}: {e}")
             return None
-    
+        finally:
+            file.seek(0)
+
+    @classmethod
+    def _iter_row_chunks(cls, file: UploadedFile) -> Iterator[pd.DataFrame]:
+        """Yield file rows as raw values in chunks of ROW_CHUNK_SIZE"""
+        file.seek(0)
+        file_name = file.name.lower()
+
+        if file_name.endswith('.csv'):
+            yield from pd.read_csv(
+                file, chunksize=cls.ROW_CHUNK_SIZE, dtype=str,
+                encoding='utf-8'
+            )
+        elif file_name.endswith('.xlsx'):
+            yield from cls._iter_xlsx_chunks(file)
+        else:
+            # Legacy .xls has no streaming reader, it is at most 65536 rows
+            df = pd.read_excel(file, dtype=object)
+            for start in range(0, len(df), cls.ROW_CHUNK_SIZE):
+                yield df.iloc[start:start + cls.ROW_CHUNK_SIZE]
+
+    @classmethod
+    def _iter_xlsx_chunks(cls, file: UploadedFile) -> Iterator[pd.DataFrame]:
+        """Stream the first worksheet of a workbook in read-only mode"""
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+
+            columns = [
+                str(col) if col is not None else f"Unnamed: {index}"
+                for index, col in enumerate(header)
+            ]
+            chunk = []
+            # Positions of the chunk rows, so errors point at sheet rows
+            positions = []
+
+            for position, row in enumerate(rows):
+                # Skip fully empty rows, like pandas does
+                if all(value is None for value in row):
+                    continue
+                chunk.append(row[:len(columns)])
+                positions.append(position)
+                if len(chunk) == cls.ROW_CHUNK_SIZE:
+                    yield pd.DataFrame(chunk, columns=columns, index=positions)
+                    chunk = []
+                    positions = []
+
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns, index=positions)
+        finally:
+            workbook.close()
+
+    @classmethod
+    def read_header(
+        cls, file: UploadedFile
+    ) -> Tuple[Optional[List[str]], Union[str, None]]:
+        """
+        Read the header of a file and detect its template
+        Returns: (columns, template_type)
+        columns is None if the header can't be read
+        """
+        columns = cls._read_header(file)
+        if columns is None:
+            return None, None
+        return columns, cls._detect_template_type(columns)
+
     @classmethod
     def _detect_template_type(cls, columns: List[str]) -> Union[str, None]:
         """Detect template type based on columns"""
@@ -216,3 +446,98 @@ class FileFormatValidator:
             return False, "; ".join(errors)
         
         return True, "Колонки валидны"
+
+
+class StreamingCSVValidator:
+    """
+    Incremental validator of a CSV file received chunk by chunk.
+
+    The header row is checked as soon as it arrives and complete records
+    are validated in batches of ROW_CHUNK_SIZE, so memory does not depend
+    on the file size. Rows are numbered like in FileFormatValidator.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.columns: Optional[List[str]] = None
+        self.template_type: Optional[str] = None
+        self.column_types: Dict[str, str] = {}
+        self.report = {"rows_checked": 0, "error_count": 0, "errors": []}
+
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        # Text after the last complete record
+        self._pending = ''
+        # Parsed records waiting for a full batch
+        self._rows: List[List[str]] = []
+
+    def feed(self, data: bytes):
+        """Validate the complete records of the next chunk of the file"""
+        text = self._pending + self._decoder.decode(data)
+        cut = self._find_record_boundary(text)
+        self._pending = text[cut:]
+        if cut:
+            self._add_records(text[:cut])
+
+    def close(self) -> Dict:
+        """
+        Validate the rest of the file
+        Returns:
+            Row report in the format of FileFormatValidator.validate_rows
+        """
+        text = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if text:
+            self._add_records(text)
+        self._flush_rows()
+        return self.report
+
+    @staticmethod
+    def _find_record_boundary(text: str) -> int:
+        """
+        Position after the last newline that ends a record, i.e. is not
+        inside a quoted value (preceded by an even number of quotes)
+        """
+        end = text.rfind('\n')
+        quotes = text.count('"', 0, end)
+        while end != -1 and quotes % 2:
+            previous = text.rfind('\n', 0, end)
+            quotes -= text.count('"', previous + 1, end)
+            end = previous
+        return end + 1
+
+    def _add_records(self, text: str):
+        for record in csv.reader(io.StringIO(text)):
+            # Skip blank lines, like pandas does
+            if not record:
+                continue
+            if self.columns is None:
+                self._set_header(record)
+                continue
+
+            self._rows.append(record)
+            if len(self._rows) == FileFormatValidator.ROW_CHUNK_SIZE:
+                self._flush_rows()
+
+    def _set_header(self, columns: List[str]):
+        self.columns = columns
+        self.template_type = FileFormatValidator._detect_template_type(columns)
+        if self.template_type:
+            self.column_types = (
+                FileFormatValidator.TEMPLATE_COLUMN_TYPES[self.template_type]
+            )
+
+    def _flush_rows(self):
+        if not self._rows:
+            return
+
+        width = len(self.columns)
+        offset = self.report["rows_checked"]
+        chunk = pd.DataFrame(
+            # Short rows are padded, extra values are ignored
+            [row[:width] + [None] * (width - len(row)) for row in self._rows],
+            columns=self.columns,
+            index=range(offset, offset + len(self._rows)),
+        )
+        self.report["rows_checked"] += len(self._rows)
+        self._rows = []
+        FileFormatValidator._validate_chunk(chunk, self.column_types, self.report)
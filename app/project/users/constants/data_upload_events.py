@@ -0,0 +1,5 @@
+"""WebSocket message types of background data upload jobs"""
+
+DATA_UPLOAD_PROGRESS = "data_upload_progress"
+DATA_UPLOAD_COMPLETED = "data_upload_completed"
+DATA_UPLOAD_FAILED = "data_upload_failed"
@@ -0,0 +1,8 @@
+"""How an uploaded data file is combined with the user's current data"""
+
+# The file replaces the active file of its template type
+UPLOAD_MODE_REPLACE = "replace"
+# The file rows are merged into the active file of its template type
+UPLOAD_MODE_APPEND = "append"
+
+UPLOAD_MODES = [UPLOAD_MODE_REPLACE, UPLOAD_MODE_APPEND]
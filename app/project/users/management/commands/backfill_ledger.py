@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.ledger_ingestion_service import UserLedgerIngestionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the rows of active data files that are not in the ledger "
+        "tables, e.g. uploaded while the SQL analysis backend was "
+        "disabled; run before enabling it"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the files that would be loaded",
+        )
+
+    def handle(self, *args, **options):
+        user_files = UserDataFile.objects.filter(
+            is_active=True,
+            template_type__in=list(UserLedgerIngestionService.LEDGER_MODELS),
+        ).select_related("user").order_by("id")
+
+        ingested = skipped = failed = 0
+        ledger_rows = 0
+        for user_file in user_files.iterator():
+            ingestion_service = UserLedgerIngestionService(user_file.user)
+            if ingestion_service.is_ingested(user_file):
+                skipped += 1
+                continue
+            if options["dry_run"]:
+                ingested += 1
+                continue
+
+            try:
+                df = UserDatasetLoader(user_file.user).read_original(user_file)
+                if df is None:
+                    raise ValueError("file could not be read")
+                ledger_rows += ingestion_service.ingest(user_file, df)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(
+                    f"Failed to load {user_file.file_path}: {str(e)}"
+                )
+                continue
+
+            ingested += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {ingested} files ({ledger_rows} ledger rows), "
+                f"skipped {skipped}, failed {failed}"
+            )
+        )
@@ -0,0 +1,110 @@
+import datetime
+import io
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+from django.core.management.base import BaseCommand
+from openpyxl import Workbook
+
+from config.utils.file_validators import FileFormatValidator
+from users.services.columnar_snapshot_service import (
+    UserDataColumnarSnapshotService
+)
+from users.services.excel_ingest_service import ExcelIngestService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read times of a generated transactions workbook: "
+        "pd.read_excel, the upload ingest reader and the columnar "
+        "snapshot read by analysis requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=100_000,
+            help="Number of rows in the generated workbook",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per reader, the fastest one is reported",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        self.stdout.write(f"Generating a {rows}-row workbook...")
+        workbook = self._build_workbook(rows)
+        snapshot = self._build_snapshot(
+            ExcelIngestService.read(io.BytesIO(workbook), "benchmark.xlsx")
+        )
+        self.stdout.write(
+            f"Workbook {len(workbook)} bytes, snapshot {len(snapshot)} bytes"
+        )
+
+        readers = [
+            (
+                "pd.read_excel",
+                lambda: pd.read_excel(io.BytesIO(workbook)),
+            ),
+            (
+                "ExcelIngestService (upload)",
+                lambda: ExcelIngestService.read(
+                    io.BytesIO(workbook), "benchmark.xlsx"
+                ),
+            ),
+            (
+                "Parquet snapshot (request)",
+                lambda: pq.read_table(io.BytesIO(snapshot)).to_pandas(),
+            ),
+        ]
+        for name, read in readers:
+            seconds = min(self._time(read) for _ in range(repeat))
+            self.stdout.write(f"{name:<30} {seconds * 1000:>10.1f} ms")
+
+    @staticmethod
+    def _build_workbook(rows: int) -> bytes:
+        """Write a transactions template workbook in streaming mode"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(
+            FileFormatValidator.TEMPLATE_SCHEMAS["transactions_template"]
+        )
+
+        start = datetime.datetime(2024, 1, 1)
+        for index in range(rows):
+            sheet.append([
+                start + datetime.timedelta(days=index % 730),
+                "Income" if index % 3 else "Expense",
+                f"Category {index % 12}",
+                round((index % 1000) * 12.35, 2),
+                f"Client {index % 250}",
+                f"Memo {index}",
+            ])
+
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _build_snapshot(df: pd.DataFrame) -> bytes:
+        buffer = io.BytesIO()
+        df.to_parquet(
+            buffer,
+            engine="pyarrow",
+            compression=UserDataColumnarSnapshotService.SNAPSHOT_COMPRESSION,
+            index=False,
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def _time(read) -> float:
+        started = time.perf_counter()
+        read()
+        return time.perf_counter() - started
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from users.services.storage_gc_service import UserDataStorageGCService
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired dataset versions and user data objects "
+        "no longer referenced by any file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        stats = UserDataStorageGCService().collect(dry_run=options["dry_run"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Expired {stats['expired_versions']} dataset versions, "
+                f"scanned {stats['scanned']} objects, "
+                f"deleted {stats['deleted']}, failed {stats['failed']}, "
+                f"reclaimed {stats['reclaimed_bytes']} bytes"
+            )
+        )
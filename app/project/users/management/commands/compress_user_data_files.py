@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+
+from users.models.user_data_file import UserDataFile
+from users.services.data_object_codec import UserDataObjectCodec
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite uncompressed stored data files with the configured "
+        "storage codec; the uncompressed objects are removed by the "
+        "storage GC"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the files that would be compressed",
+        )
+
+    def handle(self, *args, **options):
+        codec = UserDataObjectCodec()
+        user_files = UserDataFile.objects.filter(
+            storage_codec=UserDataFile.StorageCodec.IDENTITY
+        ).order_by("id")
+
+        compressed = skipped = failed = 0
+        original_bytes = stored_bytes = 0
+        seen_paths = set()
+        for user_file in user_files.iterator():
+            # Versions can share an object, it is compressed once
+            if user_file.file_path in seen_paths:
+                continue
+            seen_paths.add(user_file.file_path)
+
+            if (UserDataObjectCodec.get_codec(user_file.file_path)
+                    == UserDataFile.StorageCodec.IDENTITY):
+                skipped += 1
+                continue
+            if options["dry_run"]:
+                compressed += 1
+                original_bytes += user_file.file_size
+                continue
+
+            try:
+                stored_size = codec.compress_stored_file(user_file)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(
+                    f"Failed to compress {user_file.file_path}: {str(e)}"
+                )
+                continue
+            if stored_size is None:
+                skipped += 1
+                continue
+
+            compressed += 1
+            original_bytes += user_file.file_size
+            stored_bytes += stored_size
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compressed {compressed} files "
+                f"({original_bytes} -> {stored_bytes} bytes), "
+                f"skipped {skipped}, failed {failed}"
+            )
+        )
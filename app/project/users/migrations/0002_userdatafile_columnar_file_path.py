@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatafile",
+            name="columnar_file_path",
+            field=models.CharField(
+                blank=True,
+                help_text="Path to the typed Parquet copy of the uploaded file",
+                max_length=500,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 4.2.5 on 2026-10-17 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("users", "0002_userdatafile_columnar_file_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PnLLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("row_number", models.PositiveIntegerField()),
+                ("column_name", models.CharField(max_length=255)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "dataset_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pnl_ledger_entries",
+                        to="users.userdatafile",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pnl_ledger_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "user_pnl_ledger_entries",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "dataset_version", "date"],
+                        name="pnl_ledger_user_ver_date_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="TransactionLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("row_number", models.PositiveIntegerField()),
+                (
+                    "transaction_type",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "dataset_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transaction_ledger_entries",
+                        to="users.userdatafile",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transaction_ledger_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "user_transaction_ledger_entries",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "dataset_version", "date"],
+                        name="txn_ledger_user_ver_date_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="InvoiceLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("row_number", models.PositiveIntegerField()),
+                ("status", models.CharField(blank=True, max_length=255, null=True)),
+                ("due_date", models.DateField(blank=True, null=True)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=20, null=True
+                    ),
+                ),
+                (
+                    "dataset_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="invoice_ledger_entries",
+                        to="users.userdatafile",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="invoice_ledger_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "user_invoice_ledger_entries",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "dataset_version", "date"],
+                        name="inv_ledger_user_ver_date_idx",
+                    )
+                ],
+            },
+        ),
+    ]
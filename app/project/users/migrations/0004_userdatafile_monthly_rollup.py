@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_pnlledgerentry_transactionledgerentry_invoiceledgerentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatafile",
+            name="monthly_rollup",
+            field=models.JSONField(
+                blank=True,
+                help_text="Per-month column totals of a P&L file, built at upload",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.5 on 2026-10-17 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("users", "0004_userdatafile_monthly_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDataUploadJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "progress",
+                    models.PositiveSmallIntegerField(
+                        default=0, help_text="Processing progress in percent"
+                    ),
+                ),
+                (
+                    "files",
+                    models.JSONField(
+                        default=list,
+                        help_text="Staged files: name, staged path, template type, size",
+                    ),
+                ),
+                (
+                    "meta_data",
+                    models.JSONField(
+                        blank=True,
+                        help_text="PnL column configuration sent with the upload",
+                        null=True,
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True, help_text="Stored files information", null=True
+                    ),
+                ),
+                (
+                    "errors",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Validation or processing errors",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="data_upload_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "user_data_upload_jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "created_at"],
+                        name="user_data_u_user_id_2a949c_idx",
+                    )
+                ],
+            },
+        ),
+    ]
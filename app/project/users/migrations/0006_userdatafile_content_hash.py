@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_userdatauploadjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatafile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="SHA-256 of the uploaded file content",
+                max_length=64,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_userdatafile_content_hash"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="userdatafile",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="userdatafile",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("user", "template_type"),
+                name="user_data_file_one_active_version",
+            ),
+        ),
+    ]
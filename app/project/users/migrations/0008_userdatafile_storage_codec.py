@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_userdatafile_dataset_versions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatafile",
+            name="storage_codec",
+            field=models.CharField(
+                choices=[("identity", "Identity"), ("zstd", "Zstd")],
+                default="identity",
+                help_text="Compression of the stored original file",
+                max_length=16,
+            ),
+        ),
+    ]
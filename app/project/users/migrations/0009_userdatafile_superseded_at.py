@@ -0,0 +1,39 @@
+# Generated by Django 4.2.5 on 2026-10-17 20:10
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_superseded_at(apps, schema_editor):
+    # When existing versions were replaced is unknown, their retention
+    # period starts with the migration
+    UserDataFile = apps.get_model("users", "UserDataFile")
+    UserDataFile.objects.filter(is_active=False).update(
+        superseded_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_userdatafile_storage_codec"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatafile",
+            name="superseded_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When a newer version of the template replaced this one",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userdatafile",
+            index=models.Index(
+                fields=["superseded_at"], name="user_data_f_superse_24a5d2_idx"
+            ),
+        ),
+        migrations.RunPython(set_superseded_at, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,10 @@
 from users.models.user_model import UserModel as UserModel
-from users.models.user_data_file import UserDataFile as UserDataFile
\ No newline at end of file
+from users.models.user_data_file import UserDataFile as UserDataFile
+from users.models.ledger_entries import (
+    PnLLedgerEntry as PnLLedgerEntry,
+    TransactionLedgerEntry as TransactionLedgerEntry,
+    InvoiceLedgerEntry as InvoiceLedgerEntry,
+)
+from users.models.user_data_upload_job import (
+    UserDataUploadJob as UserDataUploadJob
+)
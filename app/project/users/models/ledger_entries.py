@@ -0,0 +1,90 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+from users.models.user_data_file import UserDataFile
+
+User = get_user_model()
+
+
+class PnLLedgerEntry(models.Model):
+    """Single P&L cell stored in long (date, column, amount) format"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="pnl_ledger_entries"
+    )
+    dataset_version = models.ForeignKey(
+        UserDataFile, on_delete=models.CASCADE, related_name="pnl_ledger_entries"
+    )
+    date = models.DateField(null=True, blank=True)
+    row_number = models.PositiveIntegerField()
+    column_name = models.CharField(max_length=255)
+    amount = models.DecimalField(
+        max_digits=20, decimal_places=4, null=True, blank=True
+    )
+
+    class Meta:
+        db_table = "user_pnl_ledger_entries"
+        indexes = [
+            models.Index(
+                fields=["user", "dataset_version", "date"],
+                name="pnl_ledger_user_ver_date_idx",
+            ),
+        ]
+
+
+class TransactionLedgerEntry(models.Model):
+    """Single row of an uploaded transactions file"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="transaction_ledger_entries"
+    )
+    dataset_version = models.ForeignKey(
+        UserDataFile,
+        on_delete=models.CASCADE,
+        related_name="transaction_ledger_entries",
+    )
+    date = models.DateField(null=True, blank=True)
+    row_number = models.PositiveIntegerField()
+    # Lowercased value of the Type (or Category) column
+    transaction_type = models.CharField(max_length=255, null=True, blank=True)
+    amount = models.DecimalField(
+        max_digits=20, decimal_places=4, null=True, blank=True
+    )
+
+    class Meta:
+        db_table = "user_transaction_ledger_entries"
+        indexes = [
+            models.Index(
+                fields=["user", "dataset_version", "date"],
+                name="txn_ledger_user_ver_date_idx",
+            ),
+        ]
+
+
+class InvoiceLedgerEntry(models.Model):
+    """Single row of an uploaded invoices file"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="invoice_ledger_entries"
+    )
+    dataset_version = models.ForeignKey(
+        UserDataFile, on_delete=models.CASCADE, related_name="invoice_ledger_entries"
+    )
+    date = models.DateField(null=True, blank=True)
+    row_number = models.PositiveIntegerField()
+    # Lowercased status; empty for blank cells, NULL when the file has no
+    # Status column at all
+    status = models.CharField(max_length=255, null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    amount = models.DecimalField(
+        max_digits=20, decimal_places=4, null=True, blank=True
+    )
+
+    class Meta:
+        db_table = "user_invoice_ledger_entries"
+        indexes = [
+            models.Index(
+                fields=["user", "dataset_version", "date"],
+                name="inv_ledger_user_ver_date_idx",
+            ),
+        ]
@@ -1,18 +1,32 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
 
 class UserDataFile(models.Model):
-    """Model to track user uploaded data files"""
+    """
+    Model to track user uploaded data files. Every upload is an immutable
+    dataset version identified by its id; the latest version of a template
+    is active, older ones are kept until the storage GC removes them.
+    """
 
     class TemplateType(models.TextChoices):
         PNL_TEMPLATE = "pnl_template"
         TRANSACTIONS_TEMPLATE = "transactions_template"
         INVOICES_TEMPLATE = "invoices_template"
 
+    class StorageCodec(models.TextChoices):
+        IDENTITY = "identity"
+        ZSTD = "zstd"
+
+    # Key of the schema manifest in meta_data, next to the PnL column
+    # configuration
+    SCHEMA_META_KEY = "schema"
+
     # Keep old format for compatibility during migration
+
     TEMPLATE_CHOICES = [
         ("pnl_template", "P&L Template"),
         ("transactions_template", "Transactions Template"),
@@ -25,20 +39,55 @@ class UserDataFile(models.Model):
     stored_filename = models.CharField(max_length=255)
     file_path = models.CharField(max_length=500)
     file_size = models.PositiveIntegerField()  # Size in bytes
+    columnar_file_path = models.CharField(
+        max_length=500,
+        null=True,
+        blank=True,
+        help_text="Path to the typed Parquet copy of the uploaded file"
+    )
+    storage_codec = models.CharField(
+        max_length=16,
+        choices=StorageCodec.choices,
+        default=StorageCodec.IDENTITY,
+        help_text="Compression of the stored original file"
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="SHA-256 of the uploaded file content"
+    )
     upload_time = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    superseded_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When a newer version of the template replaced this one"
+    )
     meta_data = models.JSONField(
         null=True,
         blank=True,
         help_text="Metadata for the file (e.g., PnL column configurations)"
     )
+    monthly_rollup = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Per-month column totals of a P&L file, built at upload"
+    )
 
     class Meta:
         db_table = "user_data_files"
-        unique_together = ["user", "template_type", "is_active"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "template_type"],
+                condition=models.Q(is_active=True),
+                name="user_data_file_one_active_version",
+            ),
+        ]
         indexes = [
             models.Index(fields=["user", "template_type"]),
             models.Index(fields=["upload_time"]),
+            models.Index(fields=["superseded_at"]),
         ]
 
     def __str__(self):
@@ -47,9 +96,21 @@ class UserDataFile(models.Model):
             f"{self.original_filename}"
         )
 
+    @property
+    def column_config(self):
+        """PnL column configuration of meta_data, None if not configured"""
+        config = {
+            key: value for key, value in (self.meta_data or {}).items()
+            if key != self.SCHEMA_META_KEY
+        }
+        return config or None
+
     @classmethod
     def deactivate_existing(cls, user, template_type):
-        """Deactivate existing files of the same template type"""
+        """
+        Deactivate existing files of the same template type; their
+        retention period starts now
+        """
         return cls.objects.filter(
             user=user, template_type=template_type, is_active=True
-        ).update(is_active=False)
+        ).update(is_active=False, superseded_at=timezone.now())
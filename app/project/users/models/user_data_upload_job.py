@@ -0,0 +1,53 @@
+import uuid
+
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class UserDataUploadJob(models.Model):
+    """Upload of user data files processed in the background"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        PROCESSING = "processing"
+        COMPLETED = "completed"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="data_upload_jobs"
+    )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0, help_text="Processing progress in percent"
+    )
+    files = models.JSONField(
+        default=list,
+        help_text="Staged files: name, staged path, template type, size"
+    )
+    meta_data = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="PnL column configuration sent with the upload"
+    )
+    result = models.JSONField(
+        null=True, blank=True, help_text="Stored files information"
+    )
+    errors = models.JSONField(
+        null=True, blank=True, help_text="Validation or processing errors"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "user_data_upload_jobs"
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - upload job {self.id} - {self.status}"
@@ -0,0 +1,75 @@
+from rest_framework import serializers
+
+from users.services.analysis_ranges import get_last_months_ranges
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """Serializer for one analysis period"""
+
+    start_date = serializers.DateField(
+        help_text="Start date for analysis period (YYYY-MM-DD)"
+    )
+    end_date = serializers.DateField(
+        help_text="End date for analysis period (YYYY-MM-DD)"
+    )
+
+    def validate(self, data):
+        if data["start_date"] > data["end_date"]:
+            raise serializers.ValidationError(
+                "start_date must be before or equal to end_date"
+            )
+        return data
+
+
+class AnalysisBatchRequestSerializer(serializers.Serializer):
+    """Serializer for the periods of a batch analysis request"""
+
+    MAX_RANGES = 36
+
+    ranges = DateRangeSerializer(
+        many=True,
+        required=False,
+        help_text="Analysis periods",
+    )
+    last_months = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_RANGES,
+        help_text="Analyze each calendar month of the last N months, "
+                  "the current month included",
+    )
+
+    def validate(self, attrs):
+        ranges = attrs.get("ranges")
+        last_months = attrs.get("last_months")
+
+        if (ranges is None) == (last_months is None):
+            raise serializers.ValidationError(
+                "Укажите либо ranges, либо last_months"
+            )
+
+        if last_months is not None:
+            attrs["_ranges"] = get_last_months_ranges(last_months)
+            return attrs
+
+        if not ranges:
+            raise serializers.ValidationError(
+                {"ranges": "Укажите хотя бы один период"}
+            )
+        if len(ranges) > self.MAX_RANGES:
+            raise serializers.ValidationError(
+                {"ranges": f"Не более {self.MAX_RANGES} периодов за запрос"}
+            )
+        attrs["_ranges"] = [
+            (date_range["start_date"], date_range["end_date"])
+            for date_range in ranges
+        ]
+        return attrs
+
+
+class AnalysisBatchResponseSerializer(serializers.Serializer):
+    """Serializer for batch analysis results"""
+
+    results = serializers.DictField(
+        help_text="Result per period, keyed by <start_date>_<end_date>"
+    )
@@ -16,5 +16,6 @@ class ExpenseCategorySerializer(serializers.Serializer):
         help_text="True if category appeared first time in period"
     )
     monthly_change_percent = serializers.FloatField(
-        help_text="Month-over-month change percentage"
+        help_text="Month-over-month change percentage, 0 without "
+                  "spending the month before"
     )
\ No newline at end of file
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 
 from config.utils.file_validators import FileFormatValidator
-from users.models import UserDataFile
+from users.models import UserDataFile, UserDataUploadJob
+from users.constants.data_upload_modes import UPLOAD_MODE_REPLACE, UPLOAD_MODES
 from users.constants.file_upload_errors import FILE_SIZE_EXCEEDED, NO_FILES_PROVIDED
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
@@ -9,31 +10,35 @@ from rest_framework.status import HTTP_400_BAD_REQUEST
 class UserDataFileSerializer(serializers.ModelSerializer):
     """Serializer for user uploaded files information"""
 
+    version = serializers.IntegerField(source="id", read_only=True)
+
     class Meta:
         model = UserDataFile
         fields = [
+            "version",
             "template_type",
             "original_filename",
             "stored_filename",
             "file_path",
             "file_size",
+            "content_hash",
             "upload_time",
             "is_active",
             "meta_data",
         ]
 
 
-class UploadUserDataSerializer(serializers.Serializer):
-    """Serializer for file upload validation"""
+class UploadOptionsSerializer(serializers.Serializer):
+    """Serializer for upload mode and PnL column configuration"""
 
-    pnl_file = serializers.FileField(
-        required=False, help_text="P&L template file"
-    )
-    transactions_file = serializers.FileField(
-        required=False, help_text="Transactions template file"
-    )
-    invoices_file = serializers.FileField(
-        required=False, help_text="Invoices template file"
+    upload_mode = serializers.ChoiceField(
+        choices=UPLOAD_MODES,
+        required=False,
+        default=UPLOAD_MODE_REPLACE,
+        help_text=(
+            "replace: files replace the current data; append: file rows "
+            "are merged into it (P&L by date, invoices by Invoice_ID)"
+        )
     )
 
     # PnL metadata fields
@@ -51,8 +56,48 @@ class UploadUserDataSerializer(serializers.Serializer):
         help_text="Comma-separated revenue columns (e.g., 'Revenue,Sales')"
     )
 
+    def validate(self, attrs):
+        """Convert comma-separated column lists to lists"""
+        if "pnl_expense_columns" in attrs and attrs["pnl_expense_columns"]:
+            attrs["pnl_expense_columns"] = [
+                col.strip() for col in attrs["pnl_expense_columns"].split(",")
+                if col.strip()
+            ]
+
+        if "pnl_revenue_columns" in attrs and attrs["pnl_revenue_columns"]:
+            attrs["pnl_revenue_columns"] = [
+                col.strip() for col in attrs["pnl_revenue_columns"].split(",")
+                if col.strip()
+            ]
+
+        return attrs
+
+
+class UploadUserDataSerializer(UploadOptionsSerializer):
+    """Serializer for file upload validation"""
+
+    pnl_file = serializers.FileField(
+        required=False, help_text="P&L template file"
+    )
+    transactions_file = serializers.FileField(
+        required=False, help_text="Transactions template file"
+    )
+    invoices_file = serializers.FileField(
+        required=False, help_text="Invoices template file"
+    )
+    async_processing = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text=(
+            "Process files in the background and return a job id; "
+            "rows are validated by the job"
+        )
+    )
+
     def validate(self, attrs):
         """Validate uploaded files"""
+        # Background jobs validate rows themselves, check headers only
+        check_rows = not attrs.get("async_processing")
         uploaded_files = []
         max_file_size = 20 * 1024 * 1024  # 20 MB in bytes
 
@@ -76,17 +121,7 @@ class UploadUserDataSerializer(serializers.Serializer):
             )
 
         # Convert comma-separated strings to lists for metadata fields
-        if "pnl_expense_columns" in attrs and attrs["pnl_expense_columns"]:
-            attrs["pnl_expense_columns"] = [
-                col.strip() for col in attrs["pnl_expense_columns"].split(",")
-                if col.strip()
-            ]
-
-        if "pnl_revenue_columns" in attrs and attrs["pnl_revenue_columns"]:
-            attrs["pnl_revenue_columns"] = [
-                col.strip() for col in attrs["pnl_revenue_columns"].split(",")
-                if col.strip()
-            ]
+        attrs = super().validate(attrs)
 
         # Check if PnL file has metadata - use custom validation
         pnl_file = attrs.get('pnl_file')
@@ -106,11 +141,20 @@ class UploadUserDataSerializer(serializers.Serializer):
             
             is_valid, error_message = (
                 FileFormatValidator.validate_pnl_with_metadata(
-                    pnl_file, metadata
+                    pnl_file, metadata, check_rows
                 )
             )
             
             if not is_valid:
+                if isinstance(error_message, dict):
+                    # Structured report of invalid rows
+                    raise serializers.ValidationError({
+                        **error_message,
+                        "message": f"PnL файл: {error_message['message']}",
+                        "row_errors": {
+                            pnl_file.name: error_message["row_errors"]
+                        },
+                    })
                 raise serializers.ValidationError(
                     f"PnL файл: {error_message}"
                 )
@@ -122,7 +166,9 @@ class UploadUserDataSerializer(serializers.Serializer):
             other_files = [f for f in uploaded_files if f != pnl_file]
             if other_files:
                 is_valid, error_message, other_mapping = (
-                    FileFormatValidator.validate_multiple_files(other_files)
+                    FileFormatValidator.validate_multiple_files(
+                        other_files, check_rows
+                    )
                 )
                 if not is_valid:
                     raise serializers.ValidationError(error_message)
@@ -130,7 +176,9 @@ class UploadUserDataSerializer(serializers.Serializer):
         else:
             # Use standard validation for all files
             is_valid, error_message, file_template_mapping = (
-                FileFormatValidator.validate_multiple_files(uploaded_files)
+                FileFormatValidator.validate_multiple_files(
+                    uploaded_files, check_rows
+                )
             )
 
             if not is_valid:
@@ -148,6 +196,129 @@ class UploadUserDataSerializer(serializers.Serializer):
         return attrs
 
 
+class StreamUploadUserDataSerializer(UploadOptionsSerializer):
+    """
+    Serializer for files streamed to MinIO by MinIOMultipartUploadHandler.
+    Rows of template files are validated while they are received, here
+    only the detected headers are checked.
+    """
+
+    pnl_file = serializers.FileField(
+        required=False, help_text="P&L CSV file"
+    )
+    transactions_file = serializers.FileField(
+        required=False, help_text="Transactions CSV file"
+    )
+    invoices_file = serializers.FileField(
+        required=False, help_text="Invoices CSV file"
+    )
+
+    def validate(self, attrs):
+        """Validate headers of the staged files"""
+        attrs = super().validate(attrs)
+
+        file_fields = ['pnl_file', 'transactions_file', 'invoices_file']
+        uploaded_files = [
+            attrs[field_name] for field_name in file_fields
+            if attrs.get(field_name)
+        ]
+        if not uploaded_files:
+            raise serializers.ValidationError(
+                NO_FILES_PROVIDED, HTTP_400_BAD_REQUEST
+            )
+
+        pnl_file = attrs.get('pnl_file')
+        metadata = {
+            'date_column': attrs.get('pnl_date_column'),
+            'expense_columns': attrs.get('pnl_expense_columns', []),
+            'revenue_columns': attrs.get('pnl_revenue_columns', [])
+        }
+        has_pnl_metadata = any(metadata.values())
+
+        file_template_mapping = {}
+        errors = []
+        for file in uploaded_files:
+            if file is pnl_file and has_pnl_metadata:
+                # Rows are checked against the metadata by the job
+                error, _ = FileFormatValidator.check_pnl_metadata_columns(
+                    file.columns, metadata
+                )
+                if error:
+                    errors.append(f"PnL файл: {error}")
+                else:
+                    file_template_mapping[file.name] = 'pnl_template'
+            elif not file.template_type:
+                errors.append(
+                    f"{file.name}: Неизвестный формат файла. Файл не "
+                    f"соответствует ни одному из ожидаемых шаблонов."
+                )
+            elif file.template_type in file_template_mapping.values():
+                errors.append(
+                    f"{file.name}: Файл типа {file.template_type} "
+                    f"уже был загружен"
+                )
+            else:
+                file_template_mapping[file.name] = file.template_type
+
+        if errors:
+            raise serializers.ValidationError("; ".join(errors))
+
+        attrs["_uploaded_files"] = uploaded_files
+        attrs["_file_template_mapping"] = file_template_mapping
+
+        return attrs
+
+
+class PresignedUploadRequestSerializer(serializers.Serializer):
+    """Serializer for the files of a direct-to-storage upload"""
+
+    pnl_file_name = serializers.CharField(
+        required=False, max_length=255, help_text="Name of the P&L file"
+    )
+    transactions_file_name = serializers.CharField(
+        required=False, max_length=255,
+        help_text="Name of the transactions file"
+    )
+    invoices_file_name = serializers.CharField(
+        required=False, max_length=255, help_text="Name of the invoices file"
+    )
+
+    def validate(self, attrs):
+        """Check that files are given and are CSV or Excel files"""
+        file_names = {
+            field_name: attrs[f"{field_name}_name"]
+            for field_name in ['pnl_file', 'transactions_file', 'invoices_file']
+            if attrs.get(f"{field_name}_name")
+        }
+        if not file_names:
+            raise serializers.ValidationError(
+                NO_FILES_PROVIDED, HTTP_400_BAD_REQUEST
+            )
+
+        for file_name in file_names.values():
+            if not file_name.lower().endswith(('.csv', '.xlsx', '.xls')):
+                raise serializers.ValidationError(
+                    f"{file_name}: Неподдерживаемый формат файла. "
+                    f"Разрешены только CSV и Excel файлы."
+                )
+
+        attrs["_file_names"] = file_names
+        return attrs
+
+
+class PresignedUploadResponseSerializer(serializers.Serializer):
+    """Serializer for issued direct-to-storage upload URLs"""
+
+    upload_id = serializers.UUIDField()
+    expires_in = serializers.IntegerField(
+        help_text="Seconds the upload URLs stay valid"
+    )
+    files = serializers.DictField(
+        child=serializers.DictField(),
+        help_text="File field to method, url and object_name of its upload"
+    )
+
+
 class UploadUserDataResponseSerializer(serializers.Serializer):
     """Serializer for file upload response"""
 
@@ -156,6 +327,23 @@ class UploadUserDataResponseSerializer(serializers.Serializer):
     uploaded_files = serializers.ListField(
         child=serializers.DictField(), required=False
     )
+    job_id = serializers.UUIDField(required=False)
     errors = serializers.ListField(
         child=serializers.CharField(), required=False
     )
+
+
+class UserDataUploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for background upload job status"""
+
+    class Meta:
+        model = UserDataUploadJob
+        fields = [
+            "id",
+            "status",
+            "progress",
+            "result",
+            "errors",
+            "created_at",
+            "updated_at",
+        ]
@@ -0,0 +1,122 @@
+from rest_framework import serializers
+
+from users.serializers.analysis_start_end_date_params_serialier import (
+    StartAndEndDateParamsSerializer,
+)
+from users.services.time_series import (
+    GRANULARITY_FREQUENCIES,
+    get_series_periods,
+)
+from users.services.time_series_service import UserTimeSeriesService
+
+
+class TimeSeriesParamsSerializer(StartAndEndDateParamsSerializer):
+    """Serializer for time series request parameters"""
+
+    MAX_PERIODS = 120
+    MAX_ROLLING_WINDOW = 36
+
+    granularity = serializers.ChoiceField(
+        choices=list(GRANULARITY_FREQUENCIES),
+        default="month",
+        help_text="Period of each series point: month, quarter or year",
+    )
+    sources = serializers.MultipleChoiceField(
+        choices=list(UserTimeSeriesService.SOURCES),
+        required=False,
+        help_text="Series to include: pnl, invoices, cash; all by default",
+    )
+
+    rolling_windows = serializers.ListField(
+        child=serializers.IntegerField(min_value=2, max_value=MAX_ROLLING_WINDOW),
+        required=False,
+        max_length=4,
+        help_text="Trailing window lengths in months for P&L rolling totals "
+                  "and moving averages, e.g. 3 and 12; monthly series only",
+    )
+
+    def validate(self, data):
+        data = super().validate(data)
+        if data.get("rolling_windows") and data["granularity"] != "month":
+            raise serializers.ValidationError(
+                {"rolling_windows": "Доступно только для granularity=month"}
+            )
+        periods = get_series_periods(
+            data["start_date"], data["end_date"], data["granularity"]
+        )
+        if len(periods) > self.MAX_PERIODS:
+            raise serializers.ValidationError(
+                f"Не более {self.MAX_PERIODS} периодов за запрос, "
+                f"выберите более крупную гранулярность"
+            )
+        return data
+
+
+class RollingWindowSerializer(serializers.Serializer):
+    """Serializer for trailing window metrics, null before enough history"""
+
+    revenue = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+    revenue_average = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+    expenses = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+    expenses_average = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+    net_profit = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+    net_profit_average = serializers.ListField(
+        child=serializers.FloatField(allow_null=True)
+    )
+
+
+class PnLSeriesSerializer(serializers.Serializer):
+    """Serializer for P&L series"""
+
+    revenue = serializers.ListField(child=serializers.FloatField())
+    expenses = serializers.ListField(child=serializers.FloatField())
+    net_profit = serializers.ListField(child=serializers.FloatField())
+    expenses_by_category = serializers.DictField(
+        child=serializers.ListField(child=serializers.FloatField())
+    )
+    rolling = serializers.DictField(
+        child=RollingWindowSerializer(),
+        required=False,
+        allow_null=True,
+        help_text="Trailing window metrics keyed by window length",
+    )
+
+
+class InvoicesSeriesSerializer(serializers.Serializer):
+    """Serializer for invoices series"""
+
+    paid_count = serializers.ListField(child=serializers.IntegerField())
+    paid_amount = serializers.ListField(child=serializers.FloatField())
+    overdue_count = serializers.ListField(child=serializers.IntegerField())
+    overdue_amount = serializers.ListField(child=serializers.FloatField())
+
+
+class CashSeriesSerializer(serializers.Serializer):
+    """Serializer for cash series"""
+
+    income = serializers.ListField(child=serializers.FloatField())
+    expense = serializers.ListField(child=serializers.FloatField())
+
+
+class TimeSeriesResponseSerializer(serializers.Serializer):
+    """Serializer for time series response"""
+
+    granularity = serializers.CharField()
+    periods = serializers.ListField(
+        child=serializers.DateField(),
+        help_text="First day of each period; series values align with it",
+    )
+    period = serializers.DictField(help_text="Requested horizon")
+    pnl = PnLSeriesSerializer(allow_null=True, required=False)
+    invoices = InvoicesSeriesSerializer(allow_null=True, required=False)
+    cash = CashSeriesSerializer(allow_null=True, required=False)
@@ -20,6 +20,9 @@ User = get_user_model()
 class UserAIInsightsService:
     """Service for generating AI-powered business insights from combined data"""
 
+    # Trailing P&L windows in months given to the prompt
+    TRAILING_WINDOWS = (3, 12)
+
     def __init__(self, user):
         self.user = user
         self.claude_client = CLAUDE_CLIENT
@@ -70,8 +73,12 @@ class UserAIInsightsService:
         # Get P&L analysis data
         try:
             pnl_service = UserPNLAnalysisService(self.user)
-            pnl_data = pnl_service.get_pnl_analysis(start_date, end_date)
-            combined_data["pnl_data"] = self._extract_pnl_essentials(pnl_data)
+            # Metrics only, the analysis would request its own AI insight
+            pnl_data = pnl_service.get_pnl_metrics(start_date, end_date)
+            combined_data["pnl_data"] = {
+                **self._extract_pnl_essentials(pnl_data),
+                **self._get_trailing_pnl_totals(pnl_service, end_date),
+            }
         except Exception as e:
             logger.warning(f"Could not get P&L data: {str(e)}")
             combined_data["pnl_data"] = None
@@ -128,6 +135,27 @@ class UserAIInsightsService:
             ).get("percentage_change", 0),
         }
 
+    def _get_trailing_pnl_totals(
+        self, pnl_service: UserPNLAnalysisService, end_date: date
+    ) -> Dict:
+        """Trailing window revenue and net profit up to the period end"""
+        try:
+            rolling_sums = pnl_service.get_rolling_window_sums()
+        except Exception as e:
+            logger.warning(f"Could not get trailing P&L totals: {str(e)}")
+            return {}
+        if rolling_sums is None:
+            return {}
+
+        end_month = pd.PeriodIndex([pd.Period(end_date, freq="M")])
+        return {
+            f"trailing_{window}m_{metric}": rolling_sums.get_window_totals(
+                metric, end_month, window
+            )[0]
+            for window in self.TRAILING_WINDOWS
+            for metric in ("revenue", "net_profit")
+        }
+
     def _extract_invoices_essentials(self, invoices_data: Dict) -> Dict:
         """Extract only essential data from invoices analysis"""
         return {
@@ -282,6 +310,17 @@ FINANCIAL PERFORMANCE:
 • Net Profit: ${profit:,.0f} ({pnl_data['month_change_profit']:+.1f}% MoM, {pnl_data['year_change_profit']:+.1f}% YoY)
 • Gross Margin: {gross_margin:.1f}%""")
 
+            # Trailing windows smooth out a single unusual month
+            for window in self.TRAILING_WINDOWS:
+                trailing_revenue = pnl_data.get(f"trailing_{window}m_revenue")
+                trailing_profit = pnl_data.get(f"trailing_{window}m_net_profit")
+                if trailing_revenue is not None and trailing_profit is not None:
+                    prompt_parts.append(
+                        f"• Trailing {window} Months: Revenue "
+                        f"${trailing_revenue:,.0f}, Net Profit "
+                        f"${trailing_profit:,.0f}"
+                    )
+
         # Add invoices data if available
         invoices_data = combined_data.get("invoices_data")
         if invoices_data:
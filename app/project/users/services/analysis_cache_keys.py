@@ -0,0 +1,41 @@
+"""
+Selection of cached date-range analyses affected by a data change.
+"""
+from datetime import date
+from typing import Iterable, List, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+DateRange = Tuple[date, date]
+
+
+def get_affected_cache_keys(
+    cache_keys: Iterable[str], affected_range: DateRange
+) -> List[str]:
+    """
+    Get the analysis cache keys whose results depend on changed dates
+    Args:
+        cache_keys: Keys ending in _<start_date>_<end_date>
+        affected_range: First and last date of the changed rows
+    Returns:
+        Keys whose period or comparison periods (one month and one year
+        earlier) overlap the affected range; keys in another format are
+        always included
+    """
+    affected_start, affected_end = affected_range
+    affected_keys = []
+    for cache_key in cache_keys:
+        try:
+            start, end = cache_key.rsplit("_", 2)[-2:]
+            start_date = date.fromisoformat(start)
+            end_date = date.fromisoformat(end)
+        except ValueError:
+            affected_keys.append(cache_key)
+            continue
+
+        # The year-ago comparison period starts earliest
+        if (start_date - relativedelta(years=1) <= affected_end
+                and end_date >= affected_start):
+            affected_keys.append(cache_key)
+
+    return affected_keys
@@ -0,0 +1,72 @@
+"""
+Date ranges of period analyses and their comparison periods.
+"""
+from datetime import date
+from typing import Iterable, List, Optional
+
+from dateutil.relativedelta import relativedelta
+
+from users.services.analysis_cache_keys import DateRange
+
+
+def get_comparison_ranges(start_date: date, end_date: date) -> List[DateRange]:
+    """Get the current, previous month and previous year date ranges"""
+    return [
+        (start_date, end_date),
+        (
+            start_date - relativedelta(months=1),
+            end_date - relativedelta(months=1),
+        ),
+        (
+            start_date - relativedelta(years=1),
+            end_date - relativedelta(years=1),
+        ),
+    ]
+
+
+def get_last_months_ranges(
+    months: int, today: Optional[date] = None
+) -> List[DateRange]:
+    """
+    Get each calendar month of the last N months, oldest first
+    Args:
+        months: Number of months, the current month included
+        today: Day of the current month, today by default
+    Returns:
+        List of (first day, last day) of each month
+    """
+    current_month = (today or date.today()).replace(day=1)
+    ranges = []
+    for offset in range(months - 1, -1, -1):
+        month_start = current_month - relativedelta(months=offset)
+        ranges.append(
+            (month_start, month_start + relativedelta(months=1, days=-1))
+        )
+    return ranges
+
+
+def get_batch_ranges(
+    ranges: Iterable[DateRange], comparisons: int = 2
+) -> List[DateRange]:
+    """
+    Get the distinct ranges needed to analyze several periods
+    Args:
+        ranges: Requested periods
+        comparisons: Comparison periods needed per range, 1 for the
+            previous month, 2 for the previous month and year
+    Returns:
+        Distinct ranges in first use order; consecutive months share
+        their comparison periods
+    """
+    batch_ranges = {}
+    for start_date, end_date in ranges:
+        needed = get_comparison_ranges(start_date, end_date)[:1 + comparisons]
+        for date_range in needed:
+            batch_ranges.setdefault(date_range, None)
+    return list(batch_ranges)
+
+
+def get_range_key(date_range: DateRange) -> str:
+    """Key of a range in batch responses, <start_date>_<end_date>"""
+    start_date, end_date = date_range
+    return f"{start_date.isoformat()}_{end_date.isoformat()}"
@@ -1,12 +1,19 @@
 from decimal import Decimal
-from typing import Dict, Optional
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 import logging
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from config.instances.minio_client import MINIO_CLIENT
-from users.models.user_data_file import UserDataFile
-import io
+from users.models.ledger_entries import TransactionLedgerEntry
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.time_indexed_dataset import TimeIndexedDataset
+from users.services.time_series import sum_by_period, to_money_series
+from users.services.typed_dataset import TypedDataset
+from users.services.ledger_aggregation_service import (
+    UserLedgerAggregationService
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -15,9 +22,12 @@ User = get_user_model()
 class UserCashAnalysisService:
     """Service for analyzing user transaction data to calculate totals"""
 
+    ANALYSIS_COLUMNS = ["Date", "Type", "Category", "Amount"]
+
     def __init__(self, user):
         self.user = user
-        self.minio_client = MINIO_CLIENT
+        self.dataset_loader = UserDatasetLoader(user)
+        self.ledger_service = UserLedgerAggregationService(user)
 
     def get_cash_analysis(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
         """
@@ -25,7 +35,13 @@ class UserCashAnalysisService:
         Returns:
             Dict with total_income and total_expense
         """
-        cache_key = f"cash_analysis_{self.user.id}_{start_date}_{end_date}"
+        # Keyed by dataset version, a new upload never hits stale results,
+        # and by money scale, which a currency change changes
+        version = self.dataset_loader.get_active_version("transactions_template")
+        cache_key = (
+            f"cash_analysis_{self.user.id}_v{version}_"
+            f"s{self.dataset_loader.money_scale}_{start_date}_{end_date}"
+        )
         cached_result = cache.get(cache_key)
 
         if cached_result:
@@ -33,22 +49,31 @@ class UserCashAnalysisService:
             return cached_result
 
         try:
-            # Get Transactions DataFrame
-            transactions_df = self._get_dataframe_from_file("transactions_template")
-            if transactions_df is None:
-                raise ValueError("No transaction data found for user")
-
-            # Фильтрация по дате, если указаны параметры
-            if start_date or end_date:
-                if "Date" in transactions_df.columns:
-                    transactions_df["Date"] = pd.to_datetime(transactions_df["Date"], errors="coerce")
-                    if start_date:
-                        transactions_df = transactions_df[transactions_df["Date"] >= pd.to_datetime(start_date)]
-                    if end_date:
-                        transactions_df = transactions_df[transactions_df["Date"] <= pd.to_datetime(end_date)]
-
-            # Calculate totals
-            total_income, total_expense = self._calculate_totals(transactions_df)
+            transactions_file = self.ledger_service.get_ingested_file(
+                "transactions_template", TransactionLedgerEntry
+            )
+            if transactions_file is not None:
+                # Indexed SQL aggregation over the ingested transactions
+                total_income, total_expense = self.ledger_service.get_cash_totals(
+                    transactions_file, start_date, end_date
+                )
+            else:
+                # Get Transactions DataFrame
+                transactions_df = self._get_dataframe_from_file(
+                    "transactions_template", columns=self.ANALYSIS_COLUMNS
+                )
+                if transactions_df is None:
+                    raise ValueError("No transaction data found for user")
+
+                # Фильтрация по дате, если указаны параметры
+                if start_date or end_date:
+                    if "Date" in transactions_df.columns:
+                        transactions_df = TimeIndexedDataset(
+                            transactions_df, "Date"
+                        ).slice(start_date or None, end_date or None)
+
+                # Calculate totals
+                total_income, total_expense = self._calculate_totals(transactions_df)
 
             # Build response
             result = {
@@ -66,6 +91,59 @@ class UserCashAnalysisService:
             logger.error(f"Error calculating cash analysis for user {self.user.id}: {str(e)}")
             raise e
 
+    def get_cash_series(
+        self, start_date: date, end_date: date, periods: pd.PeriodIndex
+    ) -> Dict:
+        """
+        Get income and expense per period, grouped in one pass
+        Args:
+            start_date: First date of the horizon
+            end_date: Last date of the horizon
+            periods: Periods of the series
+        Returns:
+            Dict with income and expense lists
+        """
+        transactions_df = self._get_dataframe_from_file(
+            "transactions_template", columns=self.ANALYSIS_COLUMNS
+        )
+        if transactions_df is None:
+            raise ValueError("No transaction data found for user")
+        transactions_dataset = TimeIndexedDataset.from_candidates(
+            transactions_df, ["Date"]
+        )
+        rows = transactions_dataset.slice(start_date, end_date)
+
+        type_column = "Type" if "Type" in rows.columns else "Category"
+        if type_column not in rows.columns or "Amount" not in rows.columns:
+            raise ValueError(
+                "Missing required columns: Type or Category, and Amount"
+            )
+        amounts = (
+            TypedDataset.to_minor_units(
+                rows["Amount"], self.dataset_loader.money_scale
+            ).fillna(0).to_numpy(dtype="int64")
+        )
+        income = TypedDataset.match_values(
+            rows[type_column], ["income"]
+        ).to_numpy(dtype=bool, na_value=False)
+        expense = TypedDataset.match_values(
+            rows[type_column], ["expense"]
+        ).to_numpy(dtype=bool, na_value=False)
+
+        totals = sum_by_period(
+            rows, transactions_dataset.date_column,
+            pd.DataFrame({
+                "income": np.where(income, amounts, 0),
+                "expense": np.where(expense, amounts, 0),
+            }),
+            periods,
+        )
+        money_scale = self.dataset_loader.money_scale
+        return {
+            "income": to_money_series(totals["income"], money_scale),
+            "expense": to_money_series(totals["expense"], money_scale),
+        }
+
     def _calculate_totals(self, df: pd.DataFrame) -> tuple[Decimal, Decimal]:
         """
         Calculate total income and expense from transactions DataFrame
@@ -94,21 +172,34 @@ class UserCashAnalysisService:
             logger.info(f"Using column '{type_column}' for transaction types")
             
             # Convert Amount to numeric, handling any string values
-            df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+            # (without modifying the possibly shared input frame)
+            amounts = df['Amount']
+            if not TypedDataset.is_minor_units(amounts):
+                amounts = pd.to_numeric(amounts, errors='coerce')
             
             # Filter out rows with NaN amounts
-            df = df.dropna(subset=['Amount'])
-            logger.info(f"After filtering NaN amounts, shape: {df.shape}")
+            valid_mask = amounts.notna()
+            logger.info(f"After filtering NaN amounts, rows: {valid_mask.sum()}")
 
             # Calculate totals based on Type/Category column
-            income_mask = df[type_column].str.lower() == 'income'
-            expense_mask = df[type_column].str.lower() == 'expense'
+            transaction_types = df[type_column]
+            income_mask = valid_mask & TypedDataset.match_values(
+                transaction_types, ['income']
+            )
+            expense_mask = valid_mask & TypedDataset.match_values(
+                transaction_types, ['expense']
+            )
             
             logger.info(f"Income transactions: {income_mask.sum()}")
             logger.info(f"Expense transactions: {expense_mask.sum()}")
 
-            total_income = Decimal(str(df[income_mask]['Amount'].sum()))
-            total_expense = Decimal(str(df[expense_mask]['Amount'].sum()))
+            money_scale = self.dataset_loader.money_scale
+            total_income = TypedDataset.sum_money(
+                amounts[income_mask], money_scale
+            )
+            total_expense = TypedDataset.sum_money(
+                amounts[expense_mask], money_scale
+            )
 
             logger.info(
                 f"Calculated totals - Income: {total_income}, "
@@ -124,66 +215,7 @@ class UserCashAnalysisService:
             raise e
 
     def _get_dataframe_from_file(
-        self, template_type: str
+        self, template_type: str, columns: Optional[List[str]] = None
     ) -> Optional[pd.DataFrame]:
-        """Load CSV data from MinIO and convert to DataFrame"""
-        try:
-            # Get the most recent active file for this template type
-            user_file = (
-                UserDataFile.objects.filter(
-                    user=self.user, template_type=template_type, is_active=True
-                )
-                .order_by("-upload_time")
-                .first()
-            )
-
-            if not user_file:
-                logger.info(
-                    f"No active {template_type} file found for "
-                    f"user {self.user.id}"
-                )
-                return None
-
-            # Download file from MinIO
-            try:
-                response = self.minio_client.client.get_object(
-                    "user-data", user_file.file_path
-                )
-                csv_data = response.read()
-                response.close()
-
-                # Convert to DataFrame
-                df = pd.read_csv(io.StringIO(csv_data.decode("utf-8")))
-                logger.info(
-                    f"Successfully loaded {template_type} data for "
-                    f"user {self.user.id}"
-                )
-                return df
-
-            except Exception as e:
-                logger.error(f"Error downloading file from MinIO: {str(e)}")
-                return None
-
-        except Exception as e:
-            logger.error(
-                f"Error loading {template_type} data for user "
-                f"{self.user.id}: {str(e)}"
-            )
-            return None
-
-    def invalidate_cache(self):
-        """
-        Invalidate all cached cash analysis data for the user.
-        This should be called when transaction data is updated.
-        """
-        try:
-            # Clear cache for this user's cash analysis
-            logger.info(
-                f"Invalidated cash analysis cache for user {self.user.id}"
-            )
-            
-        except Exception as e:
-            logger.error(
-                f"Error invalidating cash analysis cache "
-                f"for user {self.user.id}: {str(e)}"
-            )
\ No newline at end of file
+        """Load file data through the shared dataset cache"""
+        return self.dataset_loader.load(template_type, columns)
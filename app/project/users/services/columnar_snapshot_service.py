@@ -0,0 +1,131 @@
+"""
+Service for building and reading typed columnar (Parquet) snapshots
+of user uploaded data files.
+"""
+import io
+import logging
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+from django.core.files.uploadedfile import UploadedFile
+
+from config.instances.storage import STORAGE
+from config.instances.object_cache import OBJECT_CACHE
+from users.models.user_data_file import UserDataFile
+from users.services.excel_ingest_service import ExcelIngestService
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataColumnarSnapshotService:
+    """
+    Service that keeps a typed Parquet copy next to every uploaded
+    CSV/Excel object, so analysis services can read only the columns
+    they need instead of re-parsing the raw file on each request.
+    Workbooks are only ever read here, at upload time.
+    """
+
+    BUCKET_NAME = "user-data"
+    SNAPSHOT_EXTENSION = "parquet"
+    SNAPSHOT_CONTENT_TYPE = "application/vnd.apache.parquet"
+    SNAPSHOT_COMPRESSION = "snappy"
+
+    def __init__(self):
+        self.storage = STORAGE
+
+    @staticmethod
+    def read_upload(file: UploadedFile) -> pd.DataFrame:
+        """Parse an uploaded CSV/Excel file into a DataFrame"""
+        file.seek(0)
+        if ExcelIngestService.is_excel(file.name):
+            df = ExcelIngestService.read(file, file.name)
+        else:
+            df = pd.read_csv(file)
+        file.seek(0)
+        return df
+
+    @classmethod
+    def get_snapshot_object_name(
+        cls, object_name: str, content_hash: Optional[str] = None
+    ) -> str:
+        """
+        Build the snapshot object name; snapshots of hashed uploads are
+        stored by content hash, so identical uploads share one snapshot
+        """
+        if content_hash:
+            folder = object_name.rsplit("/", 1)[0]
+            return f"{folder}/derived/{content_hash}.{cls.SNAPSHOT_EXTENSION}"
+
+        base_name = object_name.rsplit(".", 1)[0]
+        return f"{base_name}.{cls.SNAPSHOT_EXTENSION}"
+
+    def write_snapshot(
+        self,
+        df: pd.DataFrame,
+        object_name: str,
+        content_hash: Optional[str] = None,
+    ) -> str:
+        """
+        Write a DataFrame as a Parquet object next to the original upload
+        Args:
+            df: Parsed content of the uploaded file
+            object_name: Object name of the original upload
+            content_hash: SHA-256 of the uploaded file, if known
+        Returns:
+            Object name of the written snapshot
+        """
+        snapshot_name = self.get_snapshot_object_name(object_name, content_hash)
+
+        buffer = io.BytesIO()
+        df.to_parquet(
+            buffer,
+            engine="pyarrow",
+            compression=self.SNAPSHOT_COMPRESSION,
+            index=False,
+        )
+        snapshot_size = buffer.tell()
+        buffer.seek(0)
+
+        self.storage.upload_file(
+            bucket_name=self.BUCKET_NAME,
+            object_name=snapshot_name,
+            file_data=buffer,
+            file_size=snapshot_size,
+            content_type=self.SNAPSHOT_CONTENT_TYPE,
+        )
+        logger.info(
+            f"Stored columnar snapshot {snapshot_name} "
+            f"({snapshot_size} bytes, {len(df)} rows)"
+        )
+        return snapshot_name
+
+    def read_snapshot(
+        self, user_file: UserDataFile, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read the Parquet snapshot of a user file
+        Args:
+            user_file: File record with a columnar_file_path
+            columns: Columns to project; missing ones are skipped,
+                None reads every column
+        Returns:
+            DataFrame or None if the file has no snapshot
+        """
+        if not user_file.columnar_file_path:
+            return None
+
+        with OBJECT_CACHE.open(
+            self.BUCKET_NAME, user_file.columnar_file_path
+        ) as stream:
+            # Cached snapshots are read from disk, only the projected
+            # column chunks
+            if not stream.seekable():
+                stream = io.BytesIO(stream.read())
+            parquet_file = pq.ParquetFile(stream)
+
+            if columns is not None:
+                available_columns = set(parquet_file.schema_arrow.names)
+                columns = [col for col in columns if col in available_columns]
+
+            return parquet_file.read(columns=columns).to_pandas()
@@ -0,0 +1,554 @@
+"""
+Service storing uploaded user data files and building their derived datasets.
+"""
+import datetime
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from config.instances.storage import STORAGE
+from users.constants.data_upload_modes import (
+    UPLOAD_MODE_APPEND,
+    UPLOAD_MODE_REPLACE,
+)
+from users.models.user_data_file import UserDataFile
+from users.services.columnar_snapshot_service import (
+    UserDataColumnarSnapshotService
+)
+from users.services.data_object_codec import UserDataObjectCodec
+from users.services.dataset_append_service import UserDatasetAppendService
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.excel_ingest_service import ExcelIngestService
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import (
+    UserInvoicesAnalysisService
+)
+from users.services.ledger_aggregation_service import (
+    UserLedgerAggregationService,
+)
+from users.services.ledger_ingestion_service import UserLedgerIngestionService
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataFileUploadService:
+    """
+    Service that stores a new dataset version of a template type: stores
+    the original in object storage, builds the columnar snapshot, P&L
+    rollup and ledger rows, and creates the UserDataFile record that
+    supersedes the active one. Analysis caches are keyed by version, so
+    nothing needs to be invalidated. Files of one upload are processed on a bounded thread
+    pool sharing the storage connection pool.
+
+    Files are identified by the SHA-256 of their content: re-uploading the
+    active file is a no-op, and derived artifacts of content processed
+    before are reused.
+
+    In append mode the rows of an upload are merged into the active file
+    of its template instead, and cached analyses of unchanged dates are
+    carried over to the new version.
+    """
+
+    BUCKET_NAME = "user-data"
+
+    def __init__(self, user):
+        self.user = user
+        self.storage = STORAGE
+        self.codec = UserDataObjectCodec()
+
+    def store_files(
+        self,
+        uploads: List[Dict],
+        on_file_prepared: Optional[Callable[[str], None]] = None,
+    ) -> List[Dict]:
+        """
+        Store several uploaded files, each as the active file of its
+        template type. Files are uploaded and converted concurrently;
+        their database records are written in one transaction at the end,
+        so either every file replaces its predecessor or none does.
+        Args:
+            uploads: Dicts with file, template_type and optional
+                meta_data, content_type, content_hash and upload_mode
+            on_file_prepared: Called with the file name once a file is
+                uploaded and converted
+        Returns:
+            Dicts describing the stored files, in the order of uploads
+        """
+        prepared_files = [None] * len(uploads)
+        workers = min(settings.USER_DATA_UPLOAD_WORKERS, len(uploads))
+        # Loaded here, worker threads do not use the database
+        existing_files = self._get_existing_files(
+            upload["template_type"] for upload in uploads
+        )
+        money_scale = TypedDataset.get_user_money_scale(self.user)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        self._prepare_file,
+                        existing_files=existing_files,
+                        money_scale=money_scale,
+                        **upload
+                    ): index
+                    for index, upload in enumerate(uploads)
+                }
+                errors = []
+                for future in as_completed(futures):
+                    try:
+                        prepared = future.result()
+                    except Exception as e:
+                        # Keep collecting, so every uploaded object is known
+                        errors.append(e)
+                        continue
+                    prepared_files[futures[future]] = prepared
+                    if on_file_prepared:
+                        on_file_prepared(prepared["file"].name)
+            if errors:
+                raise errors[0]
+
+            with transaction.atomic():
+                for prepared in prepared_files:
+                    self._save_file_record(prepared)
+
+        except Exception:
+            # Nothing references the new objects, drop them
+            for prepared in prepared_files:
+                if prepared:
+                    self._delete_objects(prepared)
+            raise
+
+        # Superseded versions and their objects are removed by the storage
+        # garbage collector
+        stored_files = []
+        for prepared in prepared_files:
+            unchanged_file = prepared.get("unchanged_file")
+            if unchanged_file:
+                # Derived artifacts and caches of the active file stay valid
+                stored_files.append({
+                    "original_name": prepared["file"].name,
+                    "stored_name": unchanged_file.stored_filename,
+                    "template_type": prepared["template_type"],
+                    "file_path": unchanged_file.file_path,
+                    "upload_time": unchanged_file.upload_time.isoformat(),
+                    "version": unchanged_file.id,
+                    "created_new": False,
+                    "replaced_existing": False,
+                    "unchanged": True,
+                    "appended": False,
+                    "meta_data": prepared["meta_data"],
+                })
+                continue
+
+            if prepared["affected_range"] is not None:
+                self.carry_over_caches(prepared)
+            stored_files.append({
+                "original_name": prepared["file"].name,
+                "stored_name": prepared["stored_name"],
+                "template_type": prepared["template_type"],
+                "file_path": prepared["object_name"],
+                "upload_time": datetime.datetime.now().isoformat(),
+                "version": prepared["version"],
+                "created_new": prepared["created_new"],
+                "replaced_existing": not prepared["created_new"],
+                "unchanged": False,
+                "appended": prepared["appended"],
+                "meta_data": prepared["meta_data"],
+            })
+
+        return stored_files
+
+    def _prepare_file(
+        self,
+        file: File,
+        template_type: str,
+        meta_data: Optional[Dict] = None,
+        content_type: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        upload_mode: str = UPLOAD_MODE_REPLACE,
+        existing_files: List[UserDataFile] = (),
+        money_scale: int = MONEY_SCALE,
+    ) -> Dict:
+        """
+        Upload a file and build its derived datasets, without touching
+        the database; runs on an upload worker thread
+        """
+        content_hash = content_hash or self.compute_content_hash(file)
+        active_file = next(
+            (
+                user_file for user_file in existing_files
+                if user_file.template_type == template_type
+                and user_file.is_active
+            ),
+            None,
+        )
+
+        # Re-upload of the active file
+        if (active_file and active_file.content_hash == content_hash
+                and active_file.column_config == meta_data):
+            logger.info(
+                f"{file.name} matches the active {template_type} file "
+                f"of user {self.user.id}, skipping"
+            )
+            return self._build_unchanged_result(
+                file, template_type, meta_data, content_hash, active_file
+            )
+
+        stored_file = file
+        appended = None
+        if upload_mode == UPLOAD_MODE_APPEND and active_file:
+            appended = self._merge_into_active_file(
+                file, template_type, meta_data, active_file, money_scale
+            )
+            if appended is None:
+                logger.info(
+                    f"{file.name} adds no rows to the active {template_type} "
+                    f"file of user {self.user.id}, skipping"
+                )
+                return self._build_unchanged_result(
+                    file, template_type, meta_data, content_hash, active_file
+                )
+            stored_file = appended["file"]
+            meta_data = appended["meta_data"]
+            content_type = "text/csv"
+            content_hash = self.compute_content_hash(stored_file)
+
+        same_content_files = [
+            user_file for user_file in existing_files
+            if user_file.template_type == template_type
+            and user_file.content_hash == content_hash
+        ]
+
+        # Generate unique filename with timestamp, the random suffix keeps
+        # uploads of the same second from overwriting each other
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_extension = stored_file.name.split(".")[-1]
+        unique_filename = (
+            f"{template_type}_{timestamp}_{uuid4().hex[:8]}.{file_extension}"
+        )
+
+        # Get user folder path
+        user_folder = self.storage.get_user_folder_path(
+            self.user.id, "data_uploads"
+        )
+        storage_codec = UserDataObjectCodec.get_codec(stored_file.name)
+        object_name = UserDataObjectCodec.get_object_name(
+            f"{user_folder}/{unique_filename}", storage_codec
+        )
+
+        # Upload file to storage, compressed with the storage codec
+        self.codec.upload(
+            bucket_name=self.BUCKET_NAME,
+            object_name=object_name,
+            file=stored_file,
+            file_size=stored_file.size,
+            codec=storage_codec,
+            content_type=content_type or "application/octet-stream",
+        )
+
+        # Parse once for the derived datasets
+        if appended:
+            df = appended["df"]
+        else:
+            try:
+                df = UserDataColumnarSnapshotService.read_upload(file)
+            except Exception as e:
+                logger.error(f"Failed to parse {file.name}: {str(e)}")
+                df = None
+
+        created_objects = [object_name]
+
+        # Store typed columnar copy for analysis reads, once per content
+        columnar_object_name = next(
+            (
+                user_file.columnar_file_path
+                for user_file in same_content_files
+                if user_file.columnar_file_path
+            ),
+            None,
+        )
+        if columnar_object_name is None and df is not None:
+            columnar_object_name = self._build_columnar_snapshot(
+                df, object_name, content_hash
+            )
+            if columnar_object_name:
+                created_objects.append(columnar_object_name)
+        if (columnar_object_name is None
+                and ExcelIngestService.is_excel(stored_file.name)):
+            # Workbooks are only readable through their snapshot
+            self.storage.delete_files(self.BUCKET_NAME, created_objects)
+            raise ValueError(
+                f"{file.name}: не удалось преобразовать Excel файл"
+            )
+
+        # Precompute monthly totals for PnL files, once per content
+        # and column configuration
+        monthly_rollup = None
+        if (template_type == UserDataFile.TemplateType.PNL_TEMPLATE
+                and df is not None):
+            monthly_rollup = (
+                appended and appended["monthly_rollup"]
+            ) or next(
+                (
+                    user_file.monthly_rollup
+                    for user_file in same_content_files
+                    if user_file.column_config == meta_data
+                    and user_file.monthly_rollup
+                ),
+                None,
+            ) or PnLMonthlyRollup.build_from_upload(df, meta_data)
+
+        # Record column types, so reads skip inference
+        schema = None
+        if df is not None:
+            schema = DatasetSchemaManifest.build(df, template_type, meta_data)
+
+        return {
+            "file": file,
+            "file_size": stored_file.size,
+            "template_type": template_type,
+            "meta_data": meta_data,
+            "content_hash": content_hash,
+            "stored_name": unique_filename,
+            "object_name": object_name,
+            "storage_codec": storage_codec,
+            "columnar_object_name": columnar_object_name,
+            "monthly_rollup": monthly_rollup,
+            "schema": schema,
+            "appended": appended is not None,
+            "previous_version": active_file.id if active_file else None,
+            "affected_range": appended["affected_range"] if appended else None,
+            "created_objects": created_objects,
+            "df": df,
+        }
+
+    @staticmethod
+    def _build_unchanged_result(
+        file: File,
+        template_type: str,
+        meta_data: Optional[Dict],
+        content_hash: str,
+        active_file: UserDataFile,
+    ) -> Dict:
+        return {
+            "file": file,
+            "template_type": template_type,
+            "meta_data": meta_data,
+            "content_hash": content_hash,
+            "unchanged_file": active_file,
+            "created_objects": [],
+        }
+
+    def _merge_into_active_file(
+        self,
+        file: File,
+        template_type: str,
+        meta_data: Optional[Dict],
+        active_file: UserDataFile,
+        money_scale: int = MONEY_SCALE,
+    ) -> Optional[Dict]:
+        """
+        Merge the rows of an appended upload into the active file
+        Args:
+            file: Appended upload
+            template_type: Template type of the upload
+            meta_data: PnL column configuration of the upload, if any
+            active_file: Active file of the template type
+            money_scale: Money scale of the user, resolved on the main
+                thread
+        Returns:
+            Dict with the merged CSV file, its parsed rows, meta_data,
+            monthly_rollup and the affected_range of dates, or None if
+            the upload adds nothing
+        """
+        current_df = UserDatasetLoader(
+            self.user, money_scale
+        ).read_original(active_file)
+        if current_df is None:
+            raise ValueError(
+                "Не удалось загрузить текущие данные для добавления строк"
+            )
+        meta_data = meta_data or active_file.column_config
+
+        result = UserDatasetAppendService.merge(
+            current_df,
+            UserDataColumnarSnapshotService.read_upload(file),
+            template_type,
+            meta_data,
+        )
+        if result.is_empty:
+            return None
+
+        # Stored objects are immutable, the merged dataset is a new file
+        base_name = file.name.rsplit(".", 1)[0]
+        merged_file = ContentFile(
+            result.merged.to_csv(index=False).encode("utf-8"),
+            name=f"{base_name}.csv",
+        )
+        # Parse the stored content, so derived datasets match it
+        df = UserDataColumnarSnapshotService.read_upload(merged_file)
+
+        # Only the months of the appended rows change in the rollup,
+        # they are summed again over every merged row of the month
+        monthly_rollup = None
+        if (template_type == UserDataFile.TemplateType.PNL_TEMPLATE
+                and active_file.monthly_rollup
+                and active_file.column_config == meta_data):
+            date_column = (meta_data or {}).get("date_column") or "Month"
+            try:
+                changed_months = PnLMonthlyRollup.get_months(
+                    result.merged[date_column]
+                ).isin(PnLMonthlyRollup.get_months(
+                    result.added_rows[date_column]
+                ).dropna())
+                monthly_rollup = PnLMonthlyRollup.from_dict(
+                    active_file.monthly_rollup
+                ).replace_periods(
+                    PnLMonthlyRollup.build(
+                        result.merged[changed_months], date_column
+                    )
+                ).to_dict()
+            except Exception as e:
+                logger.error(
+                    f"Failed to update P&L monthly rollup, "
+                    f"rebuilding it: {str(e)}"
+                )
+
+        return {
+            "file": merged_file,
+            "df": df,
+            "meta_data": meta_data,
+            "monthly_rollup": monthly_rollup,
+            "affected_range": result.get_affected_range(),
+        }
+
+    def _save_file_record(self, prepared: Dict):
+        """Create the dataset version and ledger rows of a prepared file"""
+        if prepared.get("unchanged_file"):
+            return
+
+        meta_data = prepared["meta_data"]
+        if prepared["schema"]:
+            meta_data = {
+                **(meta_data or {}),
+                UserDataFile.SCHEMA_META_KEY: prepared["schema"],
+            }
+
+        # Versions are immutable, the new one supersedes the active one
+        replaced = UserDataFile.deactivate_existing(
+            self.user, prepared["template_type"]
+        )
+        user_data_file = UserDataFile.objects.create(
+            user=self.user,
+            template_type=prepared["template_type"],
+            original_filename=prepared["file"].name,
+            stored_filename=prepared["stored_name"],
+            file_path=prepared["object_name"],
+            file_size=prepared["file_size"],
+            storage_codec=prepared["storage_codec"],
+            columnar_file_path=prepared["columnar_object_name"],
+            content_hash=prepared["content_hash"],
+            upload_time=datetime.datetime.now(),
+            is_active=True,
+            meta_data=meta_data,
+            monthly_rollup=prepared["monthly_rollup"],
+        )
+        prepared["version"] = user_data_file.id
+        prepared["created_new"] = not replaced
+
+        # Load rows into the SQL ledger, only read by the SQL backend;
+        # files uploaded before it is enabled are loaded by backfill_ledger
+        df = prepared.pop("df")
+        if df is not None and UserLedgerAggregationService.is_enabled():
+            self._ingest_ledger_rows(user_data_file, df)
+
+    def _delete_objects(self, prepared: Dict):
+        """Delete the objects written for a file that was not stored"""
+        if prepared["created_objects"]:
+            self.storage.delete_files(
+                self.BUCKET_NAME, prepared["created_objects"]
+            )
+
+    def _get_existing_files(
+        self, template_types: Iterable[str]
+    ) -> List[UserDataFile]:
+        """Get the user's files of the template types"""
+        return list(
+            UserDataFile.objects.filter(
+                user=self.user, template_type__in=list(template_types)
+            )
+        )
+
+    @staticmethod
+    def compute_content_hash(file: File) -> str:
+        """Get the SHA-256 of a file's content"""
+        content_hash = hashlib.sha256()
+        for chunk in file.chunks():
+            content_hash.update(chunk)
+        file.seek(0)
+        return content_hash.hexdigest()
+
+    def _build_columnar_snapshot(
+        self, df, object_name: str, content_hash: Optional[str] = None
+    ) -> Optional[str]:
+        """Store a typed Parquet copy of the uploaded file by its hash"""
+        try:
+            snapshot_service = UserDataColumnarSnapshotService()
+            return snapshot_service.write_snapshot(
+                df, object_name, content_hash
+            )
+        except Exception as e:
+            # Analysis services fall back to the original CSV file
+            logger.error(
+                f"Failed to build columnar snapshot for {object_name}: {str(e)}"
+            )
+            return None
+
+    def _ingest_ledger_rows(self, user_data_file: UserDataFile, df):
+        """Bulk-load the uploaded rows into the ledger tables"""
+        try:
+            UserLedgerIngestionService(self.user).ingest(user_data_file, df)
+        except Exception as e:
+            # Analysis services fall back to the stored file
+            logger.error(
+                f"Failed to ingest {user_data_file.template_type} rows: {str(e)}"
+            )
+
+    def carry_over_caches(self, prepared: Dict):
+        """
+        Keep cached analyses of the dates an appended file did not change
+        for its new dataset version
+        Args:
+            prepared: Stored appended file with previous_version, version
+                and affected_range
+        """
+        template_type = prepared["template_type"]
+        try:
+            if template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+                analysis_service = UserPNLAnalysisService(self.user)
+            elif template_type == UserDataFile.TemplateType.INVOICES_TEMPLATE:
+                analysis_service = UserInvoicesAnalysisService(self.user)
+            else:
+                return
+
+            analysis_service.carry_over_cache(
+                prepared["previous_version"],
+                prepared["version"],
+                prepared["affected_range"],
+            )
+
+        except Exception as e:
+            # Analyses are recomputed for the new version
+            logger.error(
+                f"Failed to carry over {template_type} caches: {str(e)}"
+            )
@@ -0,0 +1,167 @@
+"""
+Transparent compression of original user data files in object storage.
+"""
+import logging
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+import zstandard
+from django.conf import settings
+
+from config.instances.storage import STORAGE
+from config.instances.object_cache import OBJECT_CACHE
+from users.models.user_data_file import UserDataFile
+from users.services.excel_ingest_service import ExcelIngestService
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataObjectCodec:
+    """
+    Writes CSV data files zstd-compressed and reads them back through a
+    streaming decompressor. The codec is recorded in the object metadata
+    and on UserDataFile.storage_codec; readers only need the latter.
+    Workbooks are already zip-compressed and are stored as uploaded.
+    """
+
+    BUCKET_NAME = "user-data"
+    METADATA_KEY = "codec"
+    ZSTD_EXTENSION = ".zst"
+    # Compressed output kept in memory up to this size, then on disk
+    SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+    def __init__(self):
+        self.storage = STORAGE
+
+    @staticmethod
+    def get_codec(file_name: str) -> str:
+        """Get the codec a file is stored with"""
+        if (settings.USER_DATA_STORAGE_CODEC == UserDataFile.StorageCodec.ZSTD
+                and not ExcelIngestService.is_excel(file_name)):
+            return UserDataFile.StorageCodec.ZSTD
+        return UserDataFile.StorageCodec.IDENTITY
+
+    @classmethod
+    def get_object_name(cls, object_name: str, codec: str) -> str:
+        if codec == UserDataFile.StorageCodec.ZSTD:
+            return f"{object_name}{cls.ZSTD_EXTENSION}"
+        return object_name
+
+    def upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        file: IO,
+        file_size: int,
+        codec: str,
+        content_type: Optional[str] = None,
+    ) -> int:
+        """
+        Upload a data file with a codec
+        Args:
+            bucket_name: Target bucket
+            object_name: Object name, including the codec extension
+            file: Binary file object of the uncompressed content
+            file_size: Size of the uncompressed content
+            codec: UserDataFile.StorageCodec value
+            content_type: Content type of the uncompressed content
+        Returns:
+            Number of bytes stored
+        """
+        file.seek(0)
+        if codec == UserDataFile.StorageCodec.IDENTITY:
+            self.storage.upload_file(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                file_data=file,
+                file_size=file_size,
+                content_type=content_type,
+                metadata={self.METADATA_KEY: codec},
+            )
+            return file_size
+
+        with tempfile.SpooledTemporaryFile(
+            max_size=self.SPOOL_MAX_BYTES
+        ) as compressed:
+            compressor = zstandard.ZstdCompressor(
+                level=settings.USER_DATA_ZSTD_LEVEL
+            )
+            compressor.copy_stream(file, compressed, size=file_size)
+            stored_size = compressed.tell()
+            compressed.seek(0)
+
+            self.storage.upload_file(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                file_data=compressed,
+                file_size=stored_size,
+                content_type=content_type,
+                metadata={self.METADATA_KEY: codec},
+            )
+
+        logger.info(
+            f"Stored {object_name} with {codec} "
+            f"({file_size} -> {stored_size} bytes)"
+        )
+        return stored_size
+
+    def compress_stored_file(self, user_file: UserDataFile) -> Optional[int]:
+        """
+        Rewrite an uncompressed stored file with the configured codec.
+        The compressed copy is a new object, the original is left to the
+        storage GC once no record references it.
+        Args:
+            user_file: Record of the stored file
+        Returns:
+            Number of bytes stored, None if the file is not recompressed
+        """
+        codec = self.get_codec(user_file.file_path)
+        if (user_file.storage_codec != UserDataFile.StorageCodec.IDENTITY
+                or codec == UserDataFile.StorageCodec.IDENTITY):
+            return None
+
+        object_name = self.get_object_name(user_file.file_path, codec)
+        with tempfile.SpooledTemporaryFile(
+            max_size=self.SPOOL_MAX_BYTES
+        ) as original:
+            with self.open(
+                self.BUCKET_NAME, user_file.file_path, user_file.storage_codec
+            ) as stream:
+                shutil.copyfileobj(stream, original)
+            original_size = original.tell()
+            stored_size = self.upload(
+                self.BUCKET_NAME, object_name, original, original_size,
+                codec, content_type="text/csv",
+            )
+
+        # Every version pointing at the object switches to the copy
+        UserDataFile.objects.filter(
+            file_path=user_file.file_path,
+            storage_codec=UserDataFile.StorageCodec.IDENTITY,
+        ).update(file_path=object_name, storage_codec=codec)
+        return stored_size
+
+    @contextmanager
+    def open(
+        self, bucket_name: str, object_name: str, codec: str
+    ) -> Iterator[IO[bytes]]:
+        """
+        Open a stored data file for streaming reads of its content,
+        through the node-local object cache
+        Args:
+            bucket_name: Bucket of the object
+            object_name: Object name
+            codec: UserDataFile.StorageCodec the object was stored with
+        Yields:
+            Binary file object of the uncompressed content
+        """
+        with OBJECT_CACHE.open(bucket_name, object_name) as stream:
+            if codec == UserDataFile.StorageCodec.ZSTD:
+                with zstandard.ZstdDecompressor().stream_reader(
+                    stream, closefd=False
+                ) as reader:
+                    yield reader
+            else:
+                yield stream
@@ -0,0 +1,347 @@
+"""
+Service for background processing of user data uploads.
+"""
+import logging
+import shutil
+from datetime import date
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile,
+    UploadedFile,
+)
+
+from config.instances.storage import STORAGE
+from config.utils.file_validators import FileFormatValidator
+from config.utils.send_ws_message_to_user import send_ws_message_to_user
+from users.constants.data_upload_events import (
+    DATA_UPLOAD_COMPLETED,
+    DATA_UPLOAD_FAILED,
+    DATA_UPLOAD_PROGRESS,
+)
+from users.constants.data_upload_modes import UPLOAD_MODE_REPLACE
+from users.models.user_data_file import UserDataFile
+from users.models.user_data_upload_job import UserDataUploadJob
+from users.services.cash_analysis_service import UserCashAnalysisService
+from users.services.data_file_upload_service import UserDataFileUploadService
+from users.services.expense_breakdown_service import (
+    UserExpenseBreakdownService
+)
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataUploadJobService:
+    """
+    Service that stages uploaded files in storage and later validates,
+    stores and converts them in a Celery worker, reporting progress to
+    the user's WebSocket group.
+    """
+
+    BUCKET_NAME = "user-data"
+
+    def __init__(self, user):
+        self.user = user
+        self.storage = STORAGE
+
+    def create_job(
+        self,
+        files: List[UploadedFile],
+        file_template_mapping: Dict[str, str],
+        meta_data: Optional[Dict] = None,
+        content_hashes: Optional[Dict[str, str]] = None,
+        upload_mode: str = UPLOAD_MODE_REPLACE,
+    ) -> UserDataUploadJob:
+        """
+        Stage raw files and create a pending job for them
+        Args:
+            files: Uploaded files with validated headers
+            file_template_mapping: File name to detected template type
+            meta_data: PnL column configuration, if any
+            content_hashes: File name to SHA-256 of the content, if known
+            upload_mode: Whether files replace or are appended to the
+                active files
+        Returns:
+            Created UserDataUploadJob
+        """
+        job = UserDataUploadJob(user=self.user, meta_data=meta_data)
+        staging_folder = self.get_staging_folder(job.id)
+
+        staged_files = []
+        for file in files:
+            staged_path = f"{staging_folder}/{file.name}"
+            file.seek(0)
+            self.storage.upload_file(
+                bucket_name=self.BUCKET_NAME,
+                object_name=staged_path,
+                file_data=file,
+                file_size=file.size,
+                content_type=file.content_type,
+            )
+            staged_files.append({
+                "original_name": file.name,
+                "staged_path": staged_path,
+                "template_type": file_template_mapping[file.name],
+                "content_type": file.content_type,
+                "size": file.size,
+                "sha256": (content_hashes or {}).get(file.name),
+                "upload_mode": upload_mode,
+            })
+
+        job.files = staged_files
+        job.save()
+        logger.info(f"Created upload job {job.id} for user {self.user.id}")
+        return job
+
+    def get_staging_folder(self, job_id: UUID) -> str:
+        """Get the storage folder holding the raw files of a job"""
+        return self.storage.get_user_folder_path(
+            self.user.id, f"upload_jobs/{job_id}"
+        )
+
+    def create_job_from_staged(
+        self,
+        job_id: UUID,
+        files: List[UploadedFile],
+        file_template_mapping: Dict[str, str],
+        meta_data: Optional[Dict] = None,
+        upload_mode: str = UPLOAD_MODE_REPLACE,
+        rows_validated: bool = True,
+    ) -> UserDataUploadJob:
+        """
+        Create a pending job for files already streamed to its staging folder
+        Args:
+            job_id: Id the staging folder was created for
+            files: StagedUploadedFile objects of the streaming upload
+                handler, or PresignedUploadedFile objects
+            file_template_mapping: File name to template type
+            meta_data: PnL column configuration, if any
+            upload_mode: Whether files replace or are appended to the
+                active files
+            rows_validated: Whether rows were validated while the files
+                were received; otherwise the job validates them
+        Returns:
+            Created UserDataUploadJob
+        """
+        staged_files = []
+        for file in files:
+            template_type = file_template_mapping[file.name]
+            staged_files.append({
+                "original_name": file.name,
+                "staged_path": file.staged_path,
+                "template_type": template_type,
+                "content_type": file.content_type,
+                "size": file.size,
+                "sha256": file.sha256,
+                "upload_mode": upload_mode,
+                # Rows of custom P&L layouts are checked against metadata
+                # by the job
+                "validated": rows_validated and not (
+                    meta_data
+                    and template_type == UserDataFile.TemplateType.PNL_TEMPLATE
+                ),
+            })
+
+        job = UserDataUploadJob.objects.create(
+            id=job_id, user=self.user, files=staged_files, meta_data=meta_data
+        )
+        logger.info(
+            f"Created upload job {job.id} for {len(files)} staged file(s) "
+            f"of user {self.user.id}"
+        )
+        return job
+
+    def process_job(self, job: UserDataUploadJob):
+        """Validate, store and convert the staged files of a job"""
+        upload_service = UserDataFileUploadService(self.user)
+        # Validation and storing of each file, plus cache warming
+        total_steps = 2 * len(job.files) + 1
+        completed_steps = 0
+
+        self._update_job(job, UserDataUploadJob.Status.PROCESSING, 0)
+        files = []
+
+        try:
+            # Validate every file before replacing any stored data
+            for staged_file in job.files:
+                file = self._download_staged_file(staged_file)
+                files.append(file)
+                # Streamed files were validated while they were received
+                if staged_file.get("validated"):
+                    errors = None
+                else:
+                    errors = self._validate_file(
+                        file, staged_file["template_type"], job.meta_data
+                    )
+                if errors:
+                    self._fail_job(job, errors)
+                    return
+
+                completed_steps += 1
+                self._update_job(
+                    job, job.status, completed_steps * 100 // total_steps,
+                    staged_file["original_name"]
+                )
+
+            def on_file_prepared(file_name: str):
+                nonlocal completed_steps
+                completed_steps += 1
+                self._update_job(
+                    job, job.status, completed_steps * 100 // total_steps,
+                    file_name
+                )
+
+            stored_files = upload_service.store_files(
+                [
+                    {
+                        "file": file,
+                        "template_type": staged_file["template_type"],
+                        "meta_data": (
+                            job.meta_data
+                            if staged_file["template_type"]
+                            == UserDataFile.TemplateType.PNL_TEMPLATE
+                            else None
+                        ),
+                        "content_type": staged_file["content_type"],
+                        "content_hash": staged_file.get("sha256"),
+                        "upload_mode": staged_file.get(
+                            "upload_mode", UPLOAD_MODE_REPLACE
+                        ),
+                    }
+                    for file, staged_file in zip(files, job.files)
+                ],
+                on_file_prepared=on_file_prepared,
+            )
+
+            self._warm_caches([f["template_type"] for f in job.files])
+
+            job.result = stored_files
+            self._update_job(job, UserDataUploadJob.Status.COMPLETED, 100)
+            self._notify(DATA_UPLOAD_COMPLETED, job)
+
+        except Exception as e:
+            logger.error(f"Upload job {job.id} failed: {str(e)}")
+            self._fail_job(job, {"message": str(e)})
+
+        finally:
+            for file in files:
+                file.close()
+            self._delete_staged_files(job)
+
+    def _download_staged_file(self, staged_file: Dict) -> TemporaryUploadedFile:
+        """Download a staged file to a temporary file in parts"""
+        file = TemporaryUploadedFile(
+            staged_file["original_name"], staged_file["content_type"],
+            staged_file["size"], None
+        )
+        with self.storage.open_object(
+            self.BUCKET_NAME, staged_file["staged_path"]
+        ) as stream:
+            shutil.copyfileobj(
+                stream, file, settings.USER_DATA_UPLOAD_PART_SIZE
+            )
+
+        file.seek(0)
+        return file
+
+    @staticmethod
+    def _validate_file(
+        file: UploadedFile, template_type: str, meta_data: Optional[Dict]
+    ) -> Optional[Dict]:
+        """Validate the rows of a staged file, return errors if invalid"""
+        if template_type == UserDataFile.TemplateType.PNL_TEMPLATE and meta_data:
+            is_valid, error = FileFormatValidator.validate_pnl_with_metadata(
+                file, meta_data
+            )
+        else:
+            is_valid, error, _ = FileFormatValidator.validate_file_format(file)
+
+        if is_valid:
+            return None
+        if isinstance(error, dict):
+            return {**error, "row_errors": {file.name: error["row_errors"]}}
+        return {"message": f"{file.name}: {error}"}
+
+    def _warm_caches(self, template_types: List[str]):
+        """Precompute default analyses of the uploaded data"""
+        for template_type in template_types:
+            try:
+                if (template_type ==
+                        UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE):
+                    # Totals over all transactions
+                    UserCashAnalysisService(self.user).get_cash_analysis()
+
+                elif template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+                    # Expense breakdown of the latest month in the file
+                    user_file = UserDataFile.objects.filter(
+                        user=self.user, template_type=template_type,
+                        is_active=True
+                    ).first()
+                    if not user_file or not user_file.monthly_rollup:
+                        continue
+
+                    rollup = PnLMonthlyRollup.from_dict(user_file.monthly_rollup)
+                    if not rollup.periods:
+                        continue
+                    latest_period = date.fromisoformat(rollup.periods[-1])
+                    month_start = latest_period.replace(day=1)
+                    month_end = month_start + relativedelta(months=1, days=-1)
+                    UserExpenseBreakdownService(self.user).get_expense_breakdown(
+                        month_start, month_end
+                    )
+
+            except Exception as e:
+                # Warming is best effort
+                logger.warning(
+                    f"Failed to warm {template_type} caches "
+                    f"for user {self.user.id}: {str(e)}"
+                )
+
+    def _update_job(
+        self, job: UserDataUploadJob, status: str, progress: int,
+        file_name: Optional[str] = None
+    ):
+        job.status = status
+        job.progress = progress
+        job.save(update_fields=["status", "progress", "result", "updated_at"])
+
+        if status != UserDataUploadJob.Status.COMPLETED:
+            self._notify(DATA_UPLOAD_PROGRESS, job, file_name)
+
+    def _fail_job(self, job: UserDataUploadJob, errors: Dict):
+        job.status = UserDataUploadJob.Status.FAILED
+        job.errors = errors
+        job.save(update_fields=["status", "errors", "updated_at"])
+        self._notify(DATA_UPLOAD_FAILED, job)
+
+    def _notify(
+        self, message_type: str, job: UserDataUploadJob,
+        file_name: Optional[str] = None
+    ):
+        """Publish job state to the user's WebSocket group"""
+        data = {
+            "job_id": str(job.id),
+            "status": job.status,
+            "progress": job.progress,
+        }
+        if file_name:
+            data["file"] = file_name
+        if message_type == DATA_UPLOAD_COMPLETED:
+            data["uploaded_files"] = job.result
+        if message_type == DATA_UPLOAD_FAILED:
+            data["errors"] = job.errors
+
+        try:
+            send_ws_message_to_user(message_type, self.user, data)
+        except Exception as e:
+            logger.warning(f"Failed to notify user {self.user.id}: {str(e)}")
+
+    def _delete_staged_files(self, job: UserDataUploadJob):
+        self.storage.delete_files(
+            self.BUCKET_NAME,
+            [staged_file["staged_path"] for staged_file in job.files],
+        )
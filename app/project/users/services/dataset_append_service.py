@@ -0,0 +1,187 @@
+"""
+Merging of appended upload rows into a user's current dataset.
+"""
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from users.models.user_data_file import UserDataFile
+from users.services.invoices_analysis_service import (
+    UserInvoicesAnalysisService
+)
+
+DateRange = Tuple[date, date]
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse dates value by value, the two files may use different formats"""
+    return pd.to_datetime(
+        values.map(lambda value: pd.to_datetime(value, errors="coerce")),
+        errors="coerce",
+    )
+
+
+class DatasetAppendResult:
+    """Merged dataset and the rows an append changed"""
+
+    def __init__(
+        self,
+        merged: pd.DataFrame,
+        added_rows: pd.DataFrame,
+        replaced_rows: pd.DataFrame,
+        date_columns: List[str],
+    ):
+        self.merged = merged
+        self.added_rows = added_rows
+        self.replaced_rows = replaced_rows
+        self.date_columns = date_columns
+
+    @property
+    def is_empty(self) -> bool:
+        return self.added_rows.empty and self.replaced_rows.empty
+
+    def get_affected_range(self) -> Optional[DateRange]:
+        """Get the dates spanned by the changed rows, None if unknown"""
+        dates = pd.concat(
+            [
+                parse_dates(rows[column])
+                for rows in (self.added_rows, self.replaced_rows)
+                for column in self.date_columns
+                if column in rows.columns
+            ]
+            or [pd.Series(dtype="datetime64[ns]")]
+        ).dropna()
+        if dates.empty:
+            return None
+        return dates.min().date(), dates.max().date()
+
+
+class UserDatasetAppendService:
+    """
+    Merges the rows of an upload into the current dataset of its template:
+    P&L rows replace the rows of the same period, invoices the rows with
+    the same Invoice_ID, and transactions are added unless an identical
+    row already exists.
+    """
+
+    INVOICE_ID_COLUMN = "Invoice_ID"
+    TRANSACTION_DATE_COLUMNS = ["Date"]
+
+    @classmethod
+    def merge(
+        cls,
+        current_df: pd.DataFrame,
+        new_df: pd.DataFrame,
+        template_type: str,
+        meta_data: Optional[Dict] = None,
+    ) -> DatasetAppendResult:
+        """
+        Merge appended rows into the current dataset
+        Args:
+            current_df: Dataset of the active file
+            new_df: Parsed appended file
+            template_type: Template type of both files
+            meta_data: PnL column configuration, if any
+        Returns:
+            DatasetAppendResult
+        """
+        if set(new_df.columns) != set(current_df.columns):
+            raise ValueError(
+                "Колонки добавляемого файла не совпадают с текущими данными"
+            )
+        new_df = new_df[list(current_df.columns)]
+
+        if template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+            date_column = (meta_data or {}).get("date_column") or "Month"
+            return cls._merge_by_key(
+                current_df, new_df,
+                cls._get_period_keys, date_column, [date_column],
+                sort_by_key=True,
+            )
+        if template_type == UserDataFile.TemplateType.INVOICES_TEMPLATE:
+            # Only the column invoices are analysed by bounds the change;
+            # without one every period depends on every invoice
+            date_columns = [
+                column for column in UserInvoicesAnalysisService.DATE_COLUMNS
+                if column in current_df.columns
+            ][:1]
+            return cls._merge_by_key(
+                current_df, new_df,
+                cls._get_id_keys, cls.INVOICE_ID_COLUMN, date_columns,
+            )
+        return cls._merge_new_rows(current_df, new_df)
+
+    @staticmethod
+    def _get_period_keys(values: pd.Series) -> pd.Series:
+        # Equal periods may be written differently in the two files
+        periods = parse_dates(values)
+        return periods.astype(str).where(periods.notna(), values.astype(str))
+
+    @staticmethod
+    def _get_id_keys(values: pd.Series) -> pd.Series:
+        return values.astype(str).str.strip()
+
+    @classmethod
+    def _merge_by_key(
+        cls,
+        current_df: pd.DataFrame,
+        new_df: pd.DataFrame,
+        get_keys,
+        key_column: str,
+        date_columns: List[str],
+        sort_by_key: bool = False,
+    ) -> DatasetAppendResult:
+        """Replace current rows whose key appears in the appended rows"""
+        new_keys = get_keys(new_df[key_column])
+        # The last row of a key in the appended file wins
+        new_df = new_df[~new_keys.duplicated(keep="last")]
+        # Rows appended unchanged replace nothing
+        new_df = new_df[cls._is_new_row(current_df, new_df)]
+        new_keys = get_keys(new_df[key_column])
+        is_replaced = get_keys(current_df[key_column]).isin(set(new_keys))
+
+        merged = pd.concat(
+            [current_df[~is_replaced], new_df], ignore_index=True
+        )
+        if sort_by_key:
+            # Keep P&L periods in order, as in an uploaded file
+            periods = parse_dates(merged[key_column])
+            order = periods.sort_values(kind="mergesort").index
+            merged = merged.loc[order].reset_index(drop=True)
+
+        return DatasetAppendResult(
+            merged=merged,
+            added_rows=new_df,
+            replaced_rows=current_df[is_replaced],
+            date_columns=date_columns,
+        )
+
+    @classmethod
+    def _merge_new_rows(
+        cls, current_df: pd.DataFrame, new_df: pd.DataFrame
+    ) -> DatasetAppendResult:
+        """Add the appended rows not already present in the dataset"""
+        added_rows = new_df[cls._is_new_row(current_df, new_df)]
+
+        return DatasetAppendResult(
+            merged=pd.concat([current_df, added_rows], ignore_index=True),
+            added_rows=added_rows,
+            replaced_rows=current_df.iloc[0:0],
+            date_columns=cls.TRANSACTION_DATE_COLUMNS,
+        )
+
+    @staticmethod
+    def _is_new_row(current_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.Series:
+        """Mark the appended rows without an identical current row"""
+        current_rows = set(
+            current_df.astype(str).itertuples(index=False, name=None)
+        )
+        return pd.Series(
+            [
+                row not in current_rows
+                for row in new_df.astype(str).itertuples(index=False, name=None)
+            ],
+            index=new_df.index,
+            dtype=bool,
+        )
@@ -0,0 +1,388 @@
+"""
+Shared loader for uploaded user datasets with a process-local,
+memory-bounded DataFrame cache.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+from django.conf import settings
+
+from config.instances.storage import STORAGE
+from users.models.user_data_file import UserDataFile
+from users.services.columnar_snapshot_service import (
+    UserDataColumnarSnapshotService
+)
+from users.services.data_object_codec import UserDataObjectCodec
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.excel_ingest_service import ExcelIngestService
+from users.services.typed_dataset import TypedDataset
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """Cached DataFrame together with the columns it was loaded for"""
+
+    def __init__(
+        self, df: pd.DataFrame, requested_columns: Optional[List[str]], size: int
+    ):
+        self.df = df
+        # None means every column of the file was loaded
+        self.requested_columns = (
+            None if requested_columns is None else set(requested_columns)
+        )
+        self.size = size
+
+    def covers(self, columns: Optional[List[str]]) -> bool:
+        if self.requested_columns is None:
+            return True
+        if columns is None:
+            return False
+        return set(columns) <= self.requested_columns
+
+
+class DataFrameCache:
+    """
+    Thread-safe LRU cache of parsed DataFrames bounded by their memory
+    footprint. Lives in the worker process, so repeated reads of unchanged
+    data cost neither a storage round-trip nor a parse.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _project(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+        """Return the cached DataFrame limited to the requested columns"""
+        if columns is None:
+            return df
+        wanted = set(columns)
+        projected = [col for col in df.columns if col in wanted]
+        if len(projected) == len(df.columns):
+            return df
+        return df[projected]
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        columns: Optional[List[str]],
+        load: Callable[[Optional[List[str]]], Optional[pd.DataFrame]],
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get a DataFrame from the cache or load and cache it
+        Args:
+            key: Identity of the dataset
+            columns: Columns the caller needs, None for every column
+            load: Callable reading the given columns from storage
+        Returns:
+            DataFrame shared with other callers, which must not modify it
+            in place, or None if loading failed
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.covers(columns):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._project(entry.df, columns)
+
+            self.misses += 1
+            load_columns = columns
+            if entry is not None and columns is not None:
+                # Widen the cached projection instead of keeping two copies
+                load_columns = sorted(entry.requested_columns | set(columns))
+
+        df = load(load_columns)
+        if df is None:
+            return None
+
+        self._store(key, df, load_columns)
+        return self._project(df, columns)
+
+    def _store(
+        self, key: Hashable, df: pd.DataFrame, columns: Optional[List[str]]
+    ):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            logger.info(f"Dataset {key} ({size} bytes) exceeds cache budget")
+            return
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = _CacheEntry(df, columns, size)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+                self.evictions += 1
+                logger.info(f"Evicted dataset {oldest_key} from cache")
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]):
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._discard(key)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters and current memory usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class UserDatasetLoader:
+    """
+    Loads the active dataset of a user for a template type, in the compact
+    typed representation of TypedDataset
+    """
+
+    BUCKET_NAME = "user-data"
+
+    def __init__(self, user, money_scale: Optional[int] = None):
+        """
+        Args:
+            user: Owner of the datasets
+            money_scale: Minor units per major unit of money columns,
+                read from the user's profile when not given
+        """
+        self.user = user
+        self.storage = STORAGE
+        # Money columns are loaded as integers of the currency minor unit
+        self.money_scale = (
+            money_scale if money_scale is not None
+            else TypedDataset.get_user_money_scale(user)
+        )
+        self.snapshot_service = UserDataColumnarSnapshotService()
+        self.codec = UserDataObjectCodec()
+
+    def get_active_file(self, template_type: str) -> Optional[UserDataFile]:
+        """Get the most recent active file for this template type"""
+        return (
+            UserDataFile.objects.filter(
+                user=self.user, template_type=template_type, is_active=True
+            )
+            .order_by("-upload_time")
+            .first()
+        )
+
+    def get_active_version(self, template_type: str) -> Optional[int]:
+        """
+        Get the id of the active dataset version. Every upload creates a
+        new version, so results cached under it can never be stale.
+        """
+        return (
+            UserDataFile.objects.filter(
+                user=self.user, template_type=template_type, is_active=True
+            )
+            .values_list("id", flat=True)
+            .first()
+        )
+
+    def load(
+        self, template_type: str, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Load the active dataset, reading only the requested columns
+        Args:
+            template_type: Template type of the dataset
+            columns: Columns the caller needs, None for every column
+        Returns:
+            Date-sorted DataFrame shared through the cache, read-only for
+            the caller, or None if there is no data
+        """
+        try:
+            user_file = self.get_active_file(template_type)
+
+            if not user_file:
+                logger.info(
+                    f"No active {template_type} file found for user {self.user.id}"
+                )
+                return None
+
+            return self.load_file(user_file, columns)
+
+        except Exception as e:
+            logger.error(
+                f"Error loading {template_type} data "
+                f"for user {self.user.id}: {str(e)}"
+            )
+            return None
+
+    def load_file(
+        self, user_file: UserDataFile, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Load a dataset version through the shared cache"""
+        # A currency change keeps the version but changes the money scale
+        key = (
+            user_file.user_id, user_file.template_type, user_file.id,
+            self.money_scale,
+        )
+        if user_file.is_active:
+            # Analyses read the active version, drop superseded ones
+            DATASET_CACHE.invalidate(
+                lambda cached: cached[:2] == key[:2] and (
+                    cached[2] < key[2] or cached[3] != key[3]
+                )
+            )
+        return DATASET_CACHE.get_or_load(
+            key,
+            columns,
+            lambda load_columns: self._read_typed_file(user_file, load_columns),
+        )
+
+    def read_original(self, user_file: UserDataFile) -> Optional[pd.DataFrame]:
+        """Read a dataset version with the column types of its upload"""
+        return self._read_file(user_file, None)
+
+    def _read_typed_file(
+        self, user_file: UserDataFile, columns: Optional[List[str]]
+    ) -> Optional[pd.DataFrame]:
+        """Read a file and convert it to the compact typed representation"""
+        schema = DatasetSchemaManifest.get_schema(user_file)
+        if schema and schema["row_count"] == 0:
+            # Nothing to read, every date range is empty
+            df = DatasetSchemaManifest.empty_frame(schema, columns)
+        else:
+            df = self._read_file(user_file, columns)
+        if df is None:
+            return None
+
+        if schema:
+            column_kinds = DatasetSchemaManifest.get_column_kinds(schema)
+            date_formats = DatasetSchemaManifest.get_date_formats(schema)
+        else:
+            # Files uploaded before the schema manifest
+            date_columns = []
+            if user_file.template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+                date_columns.append(
+                    (user_file.meta_data or {}).get("date_column") or "Month"
+                )
+            column_kinds = TypedDataset.get_column_kinds(
+                user_file.template_type, date_columns
+            )
+            date_formats = None
+
+        if user_file.template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+            # Every P&L value column is an amount
+            column_kinds = self._get_pnl_column_kinds(df, column_kinds)
+        df = TypedDataset.normalize(
+            df, column_kinds, date_formats, self.money_scale
+        )
+        return self._sort_by_date(df, self._get_date_column(user_file, df))
+
+    @staticmethod
+    def _get_date_column(
+        user_file: UserDataFile, df: pd.DataFrame
+    ) -> Optional[str]:
+        """Get the column the analyses of a template query by date"""
+        if user_file.template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+            candidates = [(user_file.meta_data or {}).get("date_column") or "Month"]
+        elif user_file.template_type == UserDataFile.TemplateType.INVOICES_TEMPLATE:
+            candidates = TypedDataset.INVOICE_DATE_COLUMNS
+        else:
+            candidates = ["Date"]
+        return next((col for col in candidates if col in df.columns), None)
+
+    @staticmethod
+    def _sort_by_date(df: pd.DataFrame, date_column: Optional[str]) -> pd.DataFrame:
+        """
+        Sort rows by date once per cached dataset, undated rows last, so
+        TimeIndexedDataset indexes the cached rows without sorting a copy
+        """
+        if date_column is None or not pd.api.types.is_datetime64_any_dtype(
+            df[date_column]
+        ):
+            return df
+        return df.sort_values(
+            date_column, kind="mergesort", na_position="last", ignore_index=True
+        )
+
+    @staticmethod
+    def _get_pnl_column_kinds(
+        df: pd.DataFrame, column_kinds: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Mark the numeric value columns of a P&L file as money"""
+        pnl_kinds = dict(column_kinds)
+        for column in df.columns:
+            kind = column_kinds.get(column)
+            if kind == DatasetSchemaManifest.VALUE_ROLE or (
+                kind is None and pd.api.types.is_numeric_dtype(df[column])
+            ):
+                pnl_kinds[column] = TypedDataset.MONEY
+        return pnl_kinds
+
+    def _read_file(
+        self, user_file: UserDataFile, columns: Optional[List[str]]
+    ) -> Optional[pd.DataFrame]:
+        """Read a file from storage, preferring its columnar snapshot"""
+        if user_file.columnar_file_path:
+            try:
+                df = self.snapshot_service.read_snapshot(user_file, columns)
+                logger.info(
+                    f"Loaded {user_file.template_type} columnar snapshot "
+                    f"for user {self.user.id}"
+                )
+                return df
+            except Exception as e:
+                logger.error(f"Error reading columnar snapshot: {str(e)}")
+
+        if ExcelIngestService.is_excel(user_file.file_path):
+            # Workbooks are converted once at upload, never on a request
+            logger.error(
+                f"No columnar snapshot for {user_file.template_type} "
+                f"workbook of user {self.user.id}"
+            )
+            return None
+
+        try:
+            schema = DatasetSchemaManifest.get_schema(user_file)
+            if schema:
+                # Column types recorded at upload, no inference
+                read_options = DatasetSchemaManifest.get_read_csv_options(
+                    schema, columns
+                )
+            else:
+                read_options = {
+                    "usecols": (
+                        (lambda col: col in columns)
+                        if columns is not None else None
+                    ),
+                }
+            # Parsed while the object is streamed and decompressed
+            with self.codec.open(
+                self.BUCKET_NAME, user_file.file_path, user_file.storage_codec
+            ) as stream:
+                df = pd.read_csv(stream, encoding="utf-8", **read_options)
+            logger.info(
+                f"Successfully loaded {user_file.template_type} data "
+                f"for user {self.user.id}"
+            )
+            return df
+
+        except Exception as e:
+            logger.error(f"Error downloading file from storage: {str(e)}")
+            return None
+
+
+# Process-wide dataset cache shared by all analysis services
+DATASET_CACHE = DataFrameCache(settings.USER_DATA_FRAME_CACHE_MAX_BYTES)
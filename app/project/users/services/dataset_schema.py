@@ -0,0 +1,228 @@
+"""
+Schema manifest of uploaded datasets, recorded at upload so later reads
+skip type and date inference.
+"""
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from users.models.user_data_file import UserDataFile
+from users.services.typed_dataset import TypedDataset
+
+
+class DatasetSchemaManifest:
+    """
+    Builds and applies the manifest stored under the "schema" key of
+    UserDataFile.meta_data:
+
+        {
+            "version": 2,
+            "row_count": 1200,
+            "columns": [
+                {"name": "Date", "dtype": "object", "role": "date",
+                 "date_format": "%Y-%m-%d", "month_start": false},
+                {"name": "Amount", "dtype": "float64", "role": "money"},
+                ...
+            ],
+        }
+
+    Columns keep their order in the file. Roles are the TypedDataset
+    column kinds, "value" for other numeric columns and "text" for the
+    rest.
+    """
+
+    # Version 1 manifests may record day-first formats for ambiguous
+    # dates and are read like files without a manifest
+    VERSION = 2
+    VALUE_ROLE = "value"
+    TEXT_ROLE = "text"
+
+    # Tried in order; the first that parses every value of a column wins,
+    # unless its day and month order is ambiguous
+    DATE_FORMATS = [
+        "%Y-%m-%d",
+        "%Y-%m",
+        "%Y-%m-%d %H:%M:%S",
+        "%Y/%m/%d",
+        "%d.%m.%Y",
+        "%d/%m/%Y",
+        "%m/%d/%Y",
+        "%b %Y",
+        "%B %Y",
+    ]
+    # Formats that differ only in the order of day and month; when both
+    # parse every value (no day above 12) the order is unknown
+    SWAPPED_DATE_FORMATS = {
+        "%d/%m/%Y": "%m/%d/%Y",
+        "%m/%d/%Y": "%d/%m/%Y",
+    }
+    # dtypes read_csv can be given as they were inferred at upload
+    CSV_DTYPES = {"int64", "float64", "bool", "object"}
+
+    @classmethod
+    def build(
+        cls,
+        df: pd.DataFrame,
+        template_type: str,
+        meta_data: Optional[Dict] = None,
+    ) -> Dict:
+        """
+        Build the manifest of a parsed upload
+        Args:
+            df: Parsed content of the uploaded file
+            template_type: Template type of the upload
+            meta_data: PnL column configuration, if any
+        Returns:
+            Serializable manifest
+        """
+        date_columns = []
+        if template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
+            date_columns.append((meta_data or {}).get("date_column") or "Month")
+        column_kinds = TypedDataset.get_column_kinds(template_type, date_columns)
+
+        columns = []
+        for name in df.columns:
+            values = df[name]
+            column = {"name": str(name), "dtype": str(values.dtype)}
+            if name in column_kinds:
+                column["role"] = column_kinds[name]
+            elif pd.api.types.is_numeric_dtype(values):
+                column["role"] = cls.VALUE_ROLE
+            else:
+                column["role"] = cls.TEXT_ROLE
+
+            if column["role"] == TypedDataset.DATE:
+                column["date_format"] = cls.detect_date_format(values)
+                column["month_start"] = cls.is_month_start(
+                    values, column["date_format"]
+                )
+            columns.append(column)
+
+        return {
+            "version": cls.VERSION,
+            "row_count": len(df),
+            "columns": columns,
+        }
+
+    @classmethod
+    def detect_date_format(cls, values: pd.Series) -> Optional[str]:
+        """
+        Get the format every value of a text date column is written in,
+        None if unknown or ambiguous; such columns are parsed with
+        pd.to_datetime inference when read
+        """
+        if (pd.api.types.is_numeric_dtype(values)
+                or pd.api.types.is_datetime64_any_dtype(values)):
+            return None
+        dates = values.dropna().astype(str)
+        if dates.empty:
+            return None
+
+        for date_format in cls.DATE_FORMATS:
+            if not cls._parses_all(dates, date_format):
+                continue
+            swapped_format = cls.SWAPPED_DATE_FORMATS.get(date_format)
+            if swapped_format and cls._parses_all(dates, swapped_format):
+                # e.g. 02/01/2024, left to inference as before the manifest
+                return None
+            return date_format
+        return None
+
+    @staticmethod
+    def is_month_start(values: pd.Series, date_format: Optional[str]) -> bool:
+        """Whether every parsed date is the first day of a month, at midnight"""
+        dates = pd.to_datetime(
+            values, format=date_format, errors="coerce"
+        ).dropna()
+        return bool(
+            ((dates.dt.day == 1) & (dates == dates.dt.normalize())).all()
+        )
+
+    @staticmethod
+    def _parses_all(dates: pd.Series, date_format: str) -> bool:
+        parsed = pd.to_datetime(dates, format=date_format, errors="coerce")
+        return bool(parsed.notna().all())
+
+    @classmethod
+    def get_schema(cls, user_file: UserDataFile) -> Optional[Dict]:
+        """Get the manifest of a file, None for files uploaded before it"""
+        schema = (user_file.meta_data or {}).get(UserDataFile.SCHEMA_META_KEY)
+        if not schema or schema.get("version") != cls.VERSION:
+            return None
+        return schema
+
+    @staticmethod
+    def get_column_kinds(schema: Dict) -> Dict[str, str]:
+        """Column name to TypedDataset kind of the manifest columns"""
+        return {column["name"]: column["role"] for column in schema["columns"]}
+
+    @staticmethod
+    def get_month_start_columns(schema: Optional[Dict]) -> List[str]:
+        """Date columns whose every value is the first day of a month"""
+        if not schema:
+            return []
+        return [
+            column["name"] for column in schema["columns"]
+            if column.get("month_start")
+        ]
+
+    @staticmethod
+    def get_integer_columns(schema: Dict) -> List[str]:
+        """Columns read as integers at upload"""
+        return [
+            column["name"] for column in schema["columns"]
+            if pd.api.types.is_integer_dtype(column["dtype"])
+        ]
+
+    @staticmethod
+    def get_date_formats(schema: Dict) -> Dict[str, str]:
+        return {
+            column["name"]: column["date_format"]
+            for column in schema["columns"]
+            if column.get("date_format")
+        }
+
+    @classmethod
+    def get_read_csv_options(
+        cls, schema: Dict, columns: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Get read_csv arguments that skip type inference
+        Args:
+            schema: Manifest of the file
+            columns: Columns to read, None for every column
+        Returns:
+            Dict with usecols and dtype
+        """
+        schema_columns = [
+            column for column in schema["columns"]
+            if columns is None or column["name"] in columns
+        ]
+        return {
+            "usecols": [column["name"] for column in schema_columns],
+            # Dates are read as text and parsed with their format
+            "dtype": {
+                column["name"]: (
+                    "object" if column["role"] == TypedDataset.DATE
+                    else column["dtype"]
+                )
+                for column in schema_columns
+                if column["dtype"] in cls.CSV_DTYPES
+            },
+        }
+
+    @classmethod
+    def empty_frame(
+        cls, schema: Dict, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Build the empty DataFrame of a file without rows"""
+        return pd.DataFrame({
+            column["name"]: pd.Series(
+                dtype=(
+                    column["dtype"] if column["dtype"] in cls.CSV_DTYPES
+                    else "object"
+                )
+            )
+            for column in schema["columns"]
+            if columns is None or column["name"] in columns
+        })
@@ -9,7 +9,7 @@ from urllib.parse import urljoin
 from django.conf import settings
 from django.core.cache import cache
 
-from config.instances.minio_client import MINIO_CLIENT
+from config.instances.storage import STORAGE
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +30,8 @@ class DocumentsService:
     }
 
     def __init__(self):
-        """Initialize service with MinIO client."""
-        self.minio_client = MINIO_CLIENT
+        """Initialize service with storage client."""
+        self.storage = STORAGE
         self._ensure_documents_uploaded()
 
     def _ensure_documents_uploaded(self):
@@ -99,7 +99,7 @@ class DocumentsService:
             with open(local_path, 'rb') as file_data:
                 file_size = os.path.getsize(local_path)
                 
-                self.minio_client.upload_file(
+                self.storage.upload_file(
                     bucket_name=self.DOCUMENTS_BUCKET,
                     object_name=bucket_filename,
                     file_data=file_data,
@@ -234,12 +234,9 @@ class DocumentsService:
             bool: True if file exists, False otherwise
         """
         try:
-            # Try to get object info to check existence
-            bucket = self.DOCUMENTS_BUCKET
-            self.minio_client.client.stat_object(bucket, filename)
-            return True
+            return self.storage.object_exists(self.DOCUMENTS_BUCKET, filename)
         except Exception:
-            # File doesn't exist or other error
+            # Storage unavailable or other error
             return False
 
     def refresh_cache(self) -> Dict[str, str]:
@@ -1,15 +1,32 @@
-from decimal import Decimal
 from datetime import date
-from dateutil.relativedelta import relativedelta
 import pandas as pd
-import io
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import logging
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from config.instances.minio_client import MINIO_CLIENT
 from config.instances.claude_ai_client import CLAUDE_CLIENT
 from users.models.user_data_file import UserDataFile
+from users.models.ledger_entries import PnLLedgerEntry
+from users.services.analysis_cache_keys import (
+    DateRange,
+    get_affected_cache_keys,
+)
+from users.services.analysis_ranges import (
+    get_batch_ranges,
+    get_comparison_ranges,
+    get_range_key,
+)
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.pnl_metrics_engine import ColumnTotals, PnLMetricsEngine
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+from users.services.rolling_metrics import RollingWindowSums
+from users.services.time_indexed_dataset import TimeIndexedDataset
+from users.services.time_series import sum_by_period
+from users.services.typed_dataset import TypedDataset
+from users.services.ledger_aggregation_service import (
+    UserLedgerAggregationService
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -20,37 +37,109 @@ class UserPNLAnalysisService:
 
     def __init__(self, user):
         self.user = user
-        self.minio_client = MINIO_CLIENT
+        self.dataset_loader = UserDatasetLoader(user)
+        self.ledger_service = UserLedgerAggregationService(user)
         # Use Claude client instance
         self.claude_client = CLAUDE_CLIENT
         # Cache for file metadata to avoid repeated database queries
+        self._pnl_file = None
         self._pnl_file_metadata = None
 
-    def _get_pnl_file_metadata(self) -> Optional[Dict]:
-        """Get PnL file metadata, cached for the service instance"""
-        if self._pnl_file_metadata is not None:
-            return self._pnl_file_metadata
-
-        try:
-            user_file = (
+    def _get_pnl_file(self) -> Optional[UserDataFile]:
+        """Get the active PnL file, cached for the service instance"""
+        if self._pnl_file is None:
+            self._pnl_file = (
                 UserDataFile.objects.filter(
                     user=self.user, template_type="pnl_template", is_active=True
                 )
                 .order_by("-upload_time")
                 .first()
             )
+        return self._pnl_file
+
+    def _get_dataset_version(self) -> Optional[int]:
+        """Get the id of the active PnL dataset version"""
+        pnl_file = self._get_pnl_file()
+        return pnl_file.id if pnl_file else None
+
+    def _get_pnl_file_metadata(self) -> Optional[Dict]:
+        """Get PnL file metadata, cached for the service instance"""
+        if self._pnl_file_metadata is not None:
+            return self._pnl_file_metadata
 
-            if not user_file or not user_file.meta_data:
+        try:
+            user_file = self._get_pnl_file()
+
+            if not user_file or not user_file.column_config:
                 logger.warning(f"No PnL file metadata found for user {self.user.id}")
                 return None
 
-            self._pnl_file_metadata = user_file.meta_data
+            self._pnl_file_metadata = user_file.column_config
             return self._pnl_file_metadata
 
         except Exception as e:
             logger.error(f"Error getting PnL file metadata: {str(e)}")
             return None
 
+    def _get_monthly_rollup(
+        self, ranges: Optional[List[DateRange]] = None
+    ) -> Optional[PnLMonthlyRollup]:
+        """
+        Get the monthly rollup stored with the active PnL file
+        Args:
+            ranges: Date ranges to sum, None for whole months only
+        Returns:
+            PnLMonthlyRollup or None if the file has none, or if its
+            totals of a range would differ from the row sums
+        """
+        try:
+            user_file = self._get_pnl_file()
+            if not user_file or not user_file.monthly_rollup:
+                return None
+            if ranges and not self._is_rollup_exact(user_file, ranges):
+                logger.info(
+                    f"Summing P&L rows of ranges within months "
+                    f"for user {self.user.id}"
+                )
+                return None
+            return PnLMonthlyRollup.from_dict(
+                user_file.monthly_rollup, self.dataset_loader.money_scale
+            )
+
+        except Exception as e:
+            logger.error(f"Error loading PnL monthly rollup: {str(e)}")
+            return None
+
+    def _is_rollup_exact(
+        self, user_file: UserDataFile, ranges: List[DateRange]
+    ) -> bool:
+        """
+        Whole months sum to the rows of month-aligned ranges; other ranges
+        only when every row is dated on the first of a month
+        """
+        if all(
+            PnLMonthlyRollup.is_month_aligned(start_date, end_date)
+            for start_date, end_date in ranges
+        ):
+            return True
+        schema = DatasetSchemaManifest.get_schema(user_file)
+        return (
+            self._get_date_column()
+            in DatasetSchemaManifest.get_month_start_columns(schema)
+        )
+
+    def _get_integer_columns(self) -> Optional[List[str]]:
+        """
+        Get the columns of the active PnL file uploaded as integers
+        Returns:
+            Column names, or None for files without a schema manifest
+        """
+        user_file = self._get_pnl_file()
+        schema = DatasetSchemaManifest.get_schema(user_file) if user_file else None
+        if not schema:
+            return None
+        return DatasetSchemaManifest.get_integer_columns(schema)
+
     def _get_expense_columns(self) -> List[str]:
         """Get expense column names from file metadata or fallback to defaults"""
         metadata = self._get_pnl_file_metadata()
@@ -105,7 +194,12 @@ class UserPNLAnalysisService:
         Returns:
             Dict with pnl_data, totals, and change calculations
         """
-        cache_key = f"pnl_analysis_{self.user.id}_{start_date}_{end_date}"
+        # Keyed by dataset version, a new upload never hits stale results,
+        # and by money scale, which a currency change changes
+        cache_key = (
+            f"pnl_analysis_{self.user.id}_v{self._get_dataset_version()}_"
+            f"s{self.dataset_loader.money_scale}_{start_date}_{end_date}"
+        )
         cached_result = cache.get(cache_key)
 
         if cached_result:
@@ -115,54 +209,24 @@ class UserPNLAnalysisService:
             return cached_result
 
         try:
-            # Get PnL DataFrame
-            pnl_df = self._get_dataframe_from_file("pnl_template")
-            if pnl_df is None:
-                raise ValueError("No P&L data found for user")
-
-            # Filter data for the requested period
-            pnl_data = self._filter_pnl_data(pnl_df, start_date, end_date)
-
-            # Calculate totals for the period
-            total_revenue = self._calculate_total_revenue(pnl_data)
-            total_expenses = self._calculate_total_expenses(pnl_data)
-            net_profit = total_revenue - total_expenses
-            
-            # Calculate margins
-            gross_margin = self._calculate_gross_margin(pnl_data, total_revenue)
-            operating_margin = self._get_industry_operating_margin()
-
-            # Calculate changes (1 month and 1 year ago)
-            month_changes = self._calculate_period_changes(
-                pnl_df, start_date, end_date, "month"
-            )
-            year_changes = self._calculate_period_changes(
-                pnl_df, start_date, end_date, "year"
-            )
+            pnl_data, metrics = self._calculate_pnl_metrics(start_date, end_date)
+            serialized_metrics = self._serialize_metrics(metrics)
 
             # Generate AI insights
             ai_insights = self._generate_ai_insights(
-                total_revenue, total_expenses, net_profit, month_changes, year_changes, pnl_data
+                serialized_metrics["total_revenue"],
+                serialized_metrics["total_expenses"],
+                serialized_metrics["net_profit"], metrics["month_change"],
+                metrics["year_change"], metrics["expenses_by_category"],
             )
 
             # Build response
             result = {
-                "pnl_data": pnl_data.to_dict("records"),
-                "total_revenue": float(total_revenue),
-                "total_expenses": float(total_expenses),
-                "net_profit": float(net_profit),
-                "gross_margin": float(gross_margin),
-                "operating_margin": operating_margin,
-                "month_change": {
-                    "revenue": month_changes["revenue"],
-                    "expenses": month_changes["expenses"],
-                    "net_profit": month_changes["net_profit"],
-                },
-                "year_change": {
-                    "revenue": year_changes["revenue"],
-                    "expenses": year_changes["expenses"],
-                    "net_profit": year_changes["net_profit"],
-                },
+                "pnl_data": TypedDataset.to_major_units(
+                    pnl_data, self.dataset_loader.money_scale,
+                    self._get_integer_columns(),
+                ).to_dict("records"),
+                **serialized_metrics,
                 "period": {
                     "start_date": start_date.isoformat(),
                     "end_date": end_date.isoformat(),
@@ -182,6 +246,293 @@ class UserPNLAnalysisService:
             )
             raise
 
+    def get_pnl_metrics(self, start_date: date, end_date: date) -> Dict:
+        """
+        Get P&L totals, margins and changes for a date range, without the
+        period rows and the AI insight of get_pnl_analysis
+        Args:
+            start_date: Start date for analysis period
+            end_date: End date for analysis period
+        Returns:
+            Dict with totals, margins and change calculations
+        """
+        _, metrics = self._calculate_pnl_metrics(start_date, end_date)
+        return self._serialize_metrics(metrics)
+
+    def _get_metrics_engine(self) -> PnLMetricsEngine:
+        return PnLMetricsEngine(
+            self._get_revenue_columns(), self._get_expense_columns(),
+            self.dataset_loader.money_scale,
+        )
+
+    def get_pnl_metrics_batch(self, ranges: List[DateRange]) -> Dict:
+        """
+        Get P&L totals, margins and changes for several date ranges from
+        one load of the data; the column totals of every range and
+        comparison period are summed together
+        Args:
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            Dict of <start_date>_<end_date> to the metrics of the range
+        """
+        engine = self._get_metrics_engine()
+        batch_ranges = get_batch_ranges(ranges)
+        _, column_totals = self._get_pnl_column_totals(engine, batch_ranges)
+        totals_by_range = dict(zip(batch_ranges, column_totals))
+        operating_margin = self._get_industry_operating_margin()
+
+        results = {}
+        for start_date, end_date in ranges:
+            current, month_ago, year_ago = (
+                totals_by_range[date_range]
+                for date_range in get_comparison_ranges(start_date, end_date)
+            )
+            metrics = self._build_metrics(
+                engine, current, month_ago, year_ago, operating_margin
+            )
+            results[get_range_key((start_date, end_date))] = {
+                **self._serialize_metrics(metrics),
+                "period": {
+                    "start_date": start_date.isoformat(),
+                    "end_date": end_date.isoformat(),
+                },
+            }
+        return results
+
+    def get_pnl_series(
+        self, start_date: date, end_date: date, periods: pd.PeriodIndex
+    ) -> Dict:
+        """
+        Get revenue, expenses, net profit and expense categories per
+        period, grouped in one pass
+        Args:
+            start_date: First date of the horizon
+            end_date: Last date of the horizon
+            periods: Periods of the series
+        Returns:
+            Dict of metric to its list of period values
+        """
+        engine = self._get_metrics_engine()
+        pnl_dataset = self._get_period_totals_dataset(
+            engine, (start_date, end_date)
+        )
+        rows = pnl_dataset.slice(start_date, end_date)
+        return engine.get_series(
+            self._sum_pnl_by_period(engine, pnl_dataset, rows, periods)
+        )
+
+    def get_rolling_window_sums(self) -> Optional[RollingWindowSums]:
+        """
+        Get the cumulative sums of monthly revenue, expenses and net
+        profit over the whole history, for trailing window metrics
+        Returns:
+            RollingWindowSums or None if there are no dated rows
+        """
+        engine = self._get_metrics_engine()
+        pnl_dataset = self._get_period_totals_dataset(engine)
+        if pnl_dataset.date_column is None or pnl_dataset.empty:
+            return None
+
+        dates = pnl_dataset.frame[pnl_dataset.date_column]
+        months = pd.period_range(start=dates.iloc[0], end=dates.iloc[-1], freq="M")
+        metric_totals = engine.get_metric_totals(
+            self._sum_pnl_by_period(engine, pnl_dataset, pnl_dataset.frame, months)
+        )
+        return RollingWindowSums(
+            months,
+            {
+                metric: totals.to_numpy(dtype="int64")
+                for metric, totals in metric_totals.items()
+            },
+            engine.money_scale,
+        )
+
+    def get_rolling_metrics(
+        self, periods: pd.PeriodIndex, windows: List[int]
+    ) -> Optional[Dict]:
+        """
+        Get trailing window totals and moving averages per month
+        Args:
+            periods: Months of the series
+            windows: Window lengths in months, e.g. [3, 12]
+        Returns:
+            Dict of window length to the revenue, expenses and net_profit
+            totals and averages per month, None without dated rows
+        """
+        rolling_sums = self.get_rolling_window_sums()
+        if rolling_sums is None:
+            return None
+        return {
+            str(window): rolling_sums.get_window_metrics(periods, window)
+            for window in windows
+        }
+
+    def _get_period_totals_dataset(
+        self, engine: PnLMetricsEngine,
+        horizon: Optional[DateRange] = None,
+    ) -> TimeIndexedDataset:
+        """
+        Get the date-indexed rows to sum per period
+        Args:
+            engine: Metrics engine of the file columns
+            horizon: Range the rows are sliced to, None for every row
+        """
+        # Monthly totals of the rollup regroup into any coarser period
+        monthly_rollup = self._get_monthly_rollup(
+            [horizon] if horizon else None
+        )
+        if monthly_rollup is not None:
+            date_column = self._get_date_column()
+            return TimeIndexedDataset(
+                pd.DataFrame({
+                    date_column: monthly_rollup.periods,
+                    **monthly_rollup.totals,
+                }),
+                date_column,
+            )
+
+        pnl_df = self._get_dataframe_from_file(
+            "pnl_template",
+            columns=[self._get_date_column()] + engine.columns,
+        )
+        if pnl_df is None:
+            raise ValueError("No P&L data found for user")
+        return self._build_pnl_dataset(pnl_df)
+
+    @staticmethod
+    def _sum_pnl_by_period(
+        engine: PnLMetricsEngine, pnl_dataset: TimeIndexedDataset,
+        rows: pd.DataFrame, periods: pd.PeriodIndex,
+    ) -> pd.DataFrame:
+        """Sum the metric columns of the rows per period"""
+        columns = [col for col in engine.columns if col in rows.columns]
+        return sum_by_period(
+            rows, pnl_dataset.date_column,
+            pd.DataFrame(engine.to_matrix(rows, columns), columns=columns),
+            periods,
+        )
+
+    def _calculate_pnl_metrics(
+        self, start_date: date, end_date: date
+    ) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Load the period rows and compute the period metrics
+        Returns:
+            Period rows and metrics with month and year changes
+        """
+        engine = self._get_metrics_engine()
+        pnl_data, column_totals = self._get_pnl_column_totals(
+            engine, get_comparison_ranges(start_date, end_date),
+            rows_range=(start_date, end_date),
+        )
+        current, month_ago, year_ago = column_totals
+        return pnl_data, self._build_metrics(
+            engine, current, month_ago, year_ago,
+            self._get_industry_operating_margin(),
+        )
+
+    def _get_pnl_column_totals(
+        self, engine: PnLMetricsEngine, ranges: List[DateRange],
+        rows_range: Optional[DateRange] = None,
+    ) -> Tuple[Optional[pd.DataFrame], List[Optional[ColumnTotals]]]:
+        """
+        Sum the P&L columns of several date ranges
+        Args:
+            engine: Metrics engine of the file columns
+            ranges: List of (start_date, end_date) tuples
+            rows_range: Range whose rows are returned as well
+        Returns:
+            Rows of rows_range (None without it) and the column totals
+            of each range
+        """
+        pnl_data = None
+        pnl_file = self.ledger_service.get_ingested_file(
+            "pnl_template", PnLLedgerEntry
+        )
+        if pnl_file is not None:
+            # Read only the period rows, compare periods with SQL aggregates
+            if rows_range is not None:
+                pnl_data = self.ledger_service.get_pnl_frame(
+                    pnl_file, self._get_date_column(), *rows_range
+                )
+            # Exact SQL sums, converted to minor units like the rows
+            return pnl_data, [
+                {
+                    column: TypedDataset.decimal_to_minor_units(
+                        total, engine.money_scale
+                    )
+                    for column, total in column_totals.items()
+                }
+                for column_totals in self.ledger_service.get_pnl_column_totals(
+                    pnl_file, ranges
+                )
+            ]
+
+        # Answer range totals from the rollup built at upload; the file
+        # is only read for the rows of rows_range
+        monthly_rollup = self._get_monthly_rollup(ranges)
+        if monthly_rollup is not None:
+            if rows_range is not None:
+                pnl_data = self._filter_pnl_data(
+                    self._load_pnl_dataset(), *rows_range
+                )
+            return pnl_data, monthly_rollup.get_range_totals(ranges)
+
+        # Sum every range in one pass over the rows
+        pnl_dataset = self._load_pnl_dataset()
+        if rows_range is not None:
+            pnl_data = self._filter_pnl_data(pnl_dataset, *rows_range)
+        return pnl_data, engine.get_range_totals(pnl_dataset, ranges)
+
+    def _load_pnl_dataset(self) -> TimeIndexedDataset:
+        """Load the P&L file indexed by its date column"""
+        pnl_df = self._get_dataframe_from_file("pnl_template")
+        if pnl_df is None:
+            raise ValueError("No P&L data found for user")
+        return self._build_pnl_dataset(pnl_df)
+
+    @staticmethod
+    def _build_metrics(
+        engine: PnLMetricsEngine,
+        current: Optional[ColumnTotals],
+        month_ago: Optional[ColumnTotals],
+        year_ago: Optional[ColumnTotals],
+        operating_margin: Optional[str],
+    ) -> Dict:
+        """Build the metrics of a period with its month and year changes"""
+        return {
+            **engine.get_period_metrics(current),
+            "operating_margin": operating_margin,
+            "month_change": engine.compare(current, month_ago),
+            "year_change": engine.compare(current, year_ago),
+            "expenses_by_category": engine.get_expense_categories(current),
+        }
+
+    def _serialize_metrics(self, metrics: Dict) -> Dict:
+        """Get the response fields of the period metrics"""
+        def to_money(amount: int) -> float:
+            return float(TypedDataset.from_minor_units(
+                amount, self.dataset_loader.money_scale
+            ))
+
+        return {
+            "total_revenue": to_money(metrics["total_revenue"]),
+            "total_expenses": to_money(metrics["total_expenses"]),
+            "net_profit": to_money(metrics["net_profit"]),
+            "gross_margin": float(metrics["gross_margin"]),
+            "operating_margin": metrics["operating_margin"],
+            "month_change": {
+                "revenue": metrics["month_change"]["revenue"],
+                "expenses": metrics["month_change"]["expenses"],
+                "net_profit": metrics["month_change"]["net_profit"],
+            },
+            "year_change": {
+                "revenue": metrics["year_change"]["revenue"],
+                "expenses": metrics["year_change"]["expenses"],
+                "net_profit": metrics["year_change"]["net_profit"],
+            },
+        }
+
     def _store_in_cache(self, cache_key: str, result: Dict):
         """Store result in cache with LRU management (max 5 entries per user)"""
         user_cache_list_key = f"pnl_cache_list_{self.user.id}"
@@ -225,12 +576,12 @@ class UserPNLAnalysisService:
 
     def _generate_ai_insights(
         self,
-        total_revenue: Decimal,
-        total_expenses: Decimal,
-        net_profit: Decimal,
+        total_revenue: float,
+        total_expenses: float,
+        net_profit: float,
         month_changes: Dict,
         year_changes: Dict,
-        current_period_data: pd.DataFrame,
+        expense_categories: Dict[str, float],
     ) -> str:
         """Generate AI-powered insights summary using Claude"""
         try:
@@ -242,9 +593,6 @@ class UserPNLAnalysisService:
             profit_mom = month_changes["net_profit"]["percentage_change"]
             profit_yoy = year_changes["net_profit"]["percentage_change"]
 
-            # Calculate expense categories for the actual current period
-            expense_categories = self._calculate_expenses_by_categories(current_period_data)
-            
             # Build expense categories info for prompt
             expense_info = ""
 
@@ -296,29 +644,6 @@ Respond with format: "[Main trend] - [specific action]"
             # Return fallback insight based on basic analysis
             return self._generate_fallback_insight(month_changes, year_changes)
 
-    def _calculate_expenses_by_categories(
-        self, pnl_data: pd.DataFrame
-    ) -> Dict[str, float]:
-        """Calculate total expenses for each category using metadata columns"""
-        try:
-            expense_columns = self._get_expense_columns()
-
-            if pnl_data.empty:
-                return {}
-
-            category_totals = {}
-            for col in expense_columns:
-                if col in pnl_data.columns:
-                    col_sum = pnl_data[col].sum()
-                    if not pd.isna(col_sum) and col_sum > 0:
-                        category_totals[col] = float(col_sum)
-
-            return category_totals
-
-        except Exception as e:
-            logger.error(f"Error calculating expenses by categories: {str(e)}")
-            return {}
-
     def _generate_fallback_insight(
         self, month_changes: Dict, year_changes: Dict
     ) -> str:
@@ -342,179 +667,27 @@ Respond with format: "[Main trend] - [specific action]"
         except Exception:
             return "Financial analysis completed, review metrics for trends."
 
-    def _filter_pnl_data(
-        self, pnl_df: pd.DataFrame, start_date: date, end_date: date
-    ) -> pd.DataFrame:
-        """Filter P&L data for the specified date range"""
-        try:
-            date_column = self._get_date_column()
-            
-            if date_column not in pnl_df.columns:
-                raise ValueError(f"Date column '{date_column}' not found in P&L data")
-
-            # Convert date column to datetime
-            pnl_df = pnl_df.copy()
-            pnl_df[date_column] = pd.to_datetime(pnl_df[date_column])
-
-            # Filter for the period
-            filtered_data = pnl_df[
-                (pnl_df[date_column] >= pd.Timestamp(start_date))
-                & (pnl_df[date_column] <= pd.Timestamp(end_date))
-            ]
-
-            return filtered_data
-
-        except Exception as e:
-            logger.error(f"Error filtering P&L data: {str(e)}")
-            return pd.DataFrame()
-
-    def _calculate_total_revenue(self, pnl_data: pd.DataFrame) -> Decimal:
-        """Calculate total revenue from P&L data using metadata columns"""
-        try:
-            revenue_columns = self._get_revenue_columns()
-            
-            if pnl_data.empty:
-                return Decimal("0")
-
-            total_revenue = Decimal("0")
-            for col in revenue_columns:
-                if col in pnl_data.columns:
-                    col_sum = pnl_data[col].sum()
-                    if not pd.isna(col_sum):
-                        total_revenue += Decimal(str(col_sum))
-
-            return total_revenue
-
-        except Exception as e:
-            logger.error(f"Error calculating total revenue: {str(e)}")
-            return Decimal("0")
-
-    def _calculate_total_expenses(self, pnl_data: pd.DataFrame) -> Decimal:
-        """Calculate total expenses from P&L data using metadata columns"""
-        try:
-            expense_columns = self._get_expense_columns()
-
-            if pnl_data.empty:
-                return Decimal("0")
-
-            total_expenses = Decimal("0")
-            for col in expense_columns:
-                if col in pnl_data.columns:
-                    col_sum = pnl_data[col].sum()
-                    if not pd.isna(col_sum):
-                        total_expenses += Decimal(str(col_sum))
-
-            return total_expenses
-
-        except Exception as e:
-            logger.error(f"Error calculating total expenses: {str(e)}")
-            return Decimal("0")
-
-    def _calculate_period_changes(
-        self, pnl_df: pd.DataFrame, start_date: date, end_date: date, period_type: str
-    ) -> Dict:
-        """Calculate changes compared to same period 1 month or 1 year ago"""
-        try:
-            # Calculate offset based on period type
-            if period_type == "month":
-                offset_start = start_date - relativedelta(months=1)
-                offset_end = end_date - relativedelta(months=1)
-            else:  # year
-                offset_start = start_date - relativedelta(years=1)
-                offset_end = end_date - relativedelta(years=1)
-
-            # Get data for comparison period
-            comparison_data = self._filter_pnl_data(pnl_df, offset_start, offset_end)
-
-            # Calculate totals for comparison period
-            comparison_revenue = self._calculate_total_revenue(comparison_data)
-            comparison_expenses = self._calculate_total_expenses(comparison_data)
-            comparison_net_profit = comparison_revenue - comparison_expenses
-
-            # Current period totals
-            current_data = self._filter_pnl_data(pnl_df, start_date, end_date)
-            current_revenue = self._calculate_total_revenue(current_data)
-            current_expenses = self._calculate_total_expenses(current_data)
-            current_net_profit = current_revenue - current_expenses
-
-            # Calculate changes and percentages
-            return {
-                "revenue": self._build_change_data(current_revenue, comparison_revenue),
-                "expenses": self._build_change_data(
-                    current_expenses, comparison_expenses
-                ),
-                "net_profit": self._build_change_data(
-                    current_net_profit, comparison_net_profit
-                ),
-            }
-
-        except Exception as e:
-            logger.error(f"Error calculating period changes: {str(e)}")
-            return {
-                "revenue": {"change": 0.0, "percentage_change": 0.0},
-                "expenses": {"change": 0.0, "percentage_change": 0.0},
-                "net_profit": {"change": 0.0, "percentage_change": 0.0},
-            }
-
-    def _build_change_data(self, current: Decimal, previous: Decimal) -> Dict:
-        """Build change data structure"""
-        change = current - previous
-        if previous > 0:
-            percentage_change = float(change / previous * 100)
-        elif current > 0:
-            percentage_change = 100.0
-        else:
-            percentage_change = 0.0
+    def _build_pnl_dataset(self, pnl_df: pd.DataFrame) -> TimeIndexedDataset:
+        """Index P&L data by its date column for range queries"""
+        date_column = self._get_date_column()
 
-        return {
-            "change": float(change),
-            "percentage_change": round(percentage_change, 2),
-        }
+        if date_column not in pnl_df.columns:
+            logger.error(f"Date column '{date_column}' not found in P&L data")
+            return TimeIndexedDataset(pd.DataFrame(), None)
 
-    def _get_dataframe_from_file(self, template_type: str) -> Optional[pd.DataFrame]:
-        """Load CSV data from MinIO and convert to DataFrame"""
-        try:
-            # Get the most recent active file for this template type
-            user_file = (
-                UserDataFile.objects.filter(
-                    user=self.user, template_type=template_type, is_active=True
-                )
-                .order_by("-upload_time")
-                .first()
-            )
-
-            if not user_file:
-                logger.info(
-                    f"No active {template_type} file found " f"for user {self.user.id}"
-                )
-                return None
-
-            # Download file from MinIO
-            try:
-                response = self.minio_client.client.get_object(
-                    "user-data", user_file.file_path
-                )
-                csv_data = response.read()
-                response.close()
-
-                # Convert to DataFrame
-                df = pd.read_csv(io.StringIO(csv_data.decode("utf-8")))
-                logger.info(
-                    f"Successfully loaded {template_type} data "
-                    f"for user {self.user.id}"
-                )
-                return df
+        return TimeIndexedDataset(pnl_df, date_column)
 
-            except Exception as e:
-                logger.error(f"Error downloading file from MinIO: {str(e)}")
-                return None
+    def _filter_pnl_data(
+        self, pnl_dataset: TimeIndexedDataset, start_date: date, end_date: date
+    ) -> pd.DataFrame:
+        """Filter P&L data for the specified date range"""
+        return pnl_dataset.slice(start_date, end_date)
 
-        except Exception as e:
-            logger.error(
-                f"Error loading {template_type} data "
-                f"for user {self.user.id}: {str(e)}"
-            )
-            return None
+    def _get_dataframe_from_file(
+        self, template_type: str, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Load file data through the shared dataset cache"""
+        return self.dataset_loader.load(template_type, columns)
 
     def get_expense_breakdown(self, start_date: date, end_date: date) -> Dict:
         """
@@ -525,7 +698,7 @@ Respond with format: "[Main trend] - [specific action]"
         Returns:
             Dict with expense breakdown by category
         """
-        cache_key = f"expense_breakdown_{self.user.id}_{start_date}_{end_date}"
+        cache_key = self._get_expense_breakdown_cache_key(start_date, end_date)
         cached_result = cache.get(cache_key)
 
         if cached_result:
@@ -535,21 +708,12 @@ Respond with format: "[Main trend] - [specific action]"
             return cached_result
 
         try:
-            # Get PnL DataFrame
-            pnl_df = self._get_dataframe_from_file("pnl_template")
-            if pnl_df is None:
-                raise ValueError("No P&L data found for user")
-
-            # Filter data for the requested period
-            period_data = self._filter_pnl_data(pnl_df, start_date, end_date)
-            if period_data.empty:
+            expense_breakdown = self._calculate_expense_breakdowns(
+                [(start_date, end_date)]
+            )[0]
+            if expense_breakdown is None:
                 raise ValueError("No data found for the specified period")
 
-            # Analyze each expense category
-            expense_breakdown = self._analyze_expense_categories(
-                period_data, pnl_df, start_date, end_date
-            )
-
             # Store in cache (1 hour)
             cache.set(cache_key, expense_breakdown, timeout=3600)
             logger.info(
@@ -566,119 +730,110 @@ Respond with format: "[Main trend] - [specific action]"
             )
             raise e
 
-    def _analyze_expense_categories(
-        self, period_data: pd.DataFrame, pnl_df: pd.DataFrame,
-        start_date: date, end_date: date
-    ) -> Dict:
+    def get_expense_breakdown_batch(self, ranges: List[DateRange]) -> Dict:
         """
-        Analyze each expense category for total amount, spike, and new status
+        Get expense breakdowns for several date ranges from one load of
+        the data; ranges are cached like get_expense_breakdown
+        Args:
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            Dict of <start_date>_<end_date> to the breakdown of the
+            range, None for ranges without data
         """
-        expense_columns = self._get_expense_columns()
-
-        result = {}
+        cache_keys = {
+            date_range: self._get_expense_breakdown_cache_key(*date_range)
+            for date_range in ranges
+        }
+        cached_results = cache.get_many(list(cache_keys.values()))
+        missing = [
+            date_range for date_range in ranges
+            if cache_keys[date_range] not in cached_results
+        ]
+
+        calculated = {}
+        if missing:
+            breakdowns = self._calculate_expense_breakdowns(missing)
+            calculated = dict(zip(missing, breakdowns))
+            cache.set_many(
+                {
+                    cache_keys[date_range]: breakdown
+                    for date_range, breakdown in calculated.items()
+                    if breakdown is not None
+                },
+                timeout=3600,
+            )
+            logger.info(
+                f"Calculated {len(missing)} of {len(ranges)} expense "
+                f"breakdowns for user {self.user.id}"
+            )
 
-        # Calculate total expenses for the period (for spike % calculation)
-        total_expenses = self._calculate_total_expenses(period_data)
+        return {
+            get_range_key(date_range): (
+                calculated[date_range] if date_range in calculated
+                else cached_results[cache_keys[date_range]]
+            )
+            for date_range in ranges
+        }
 
-        # Get previous month data for MoM comparison
-        prev_month_start = start_date - relativedelta(months=1)
-        prev_month_end = end_date - relativedelta(months=1)
-        prev_month_data = self._filter_pnl_data(
-            pnl_df, prev_month_start, prev_month_end
+    def _get_expense_breakdown_cache_key(
+        self, start_date: date, end_date: date
+    ) -> str:
+        return (
+            f"expense_breakdown_{self.user.id}_v{self._get_dataset_version()}_"
+            f"s{self.dataset_loader.money_scale}_{start_date}_{end_date}"
         )
 
-        for category in expense_columns:
-            if category in period_data.columns:
-                # Calculate total amount for this category
-                total_amount = period_data[category].sum()
-                total_amount = (
-                    total_amount if not pd.isna(total_amount) else 0
-                )
-
-                # Calculate spike status
-                spike = self._calculate_spike_status(
-                    category, total_amount, total_expenses,
-                    period_data, prev_month_data
-                )
-
-                # Calculate new status (set to False for now)
-                new = False
-
-                result[category] = {
-                    "total_amount": float(total_amount),
-                    "spike": spike,
-                    "new": new
-                }
+    def _calculate_expense_breakdowns(
+        self, ranges: List[DateRange]
+    ) -> List[Optional[Dict]]:
+        """
+        Calculate the expense breakdowns of several date ranges, summing
+        every range and its previous month in one pass
+        Returns:
+            Breakdown per range, None for ranges without rows
+        """
+        engine = self._get_metrics_engine()
+        batch_ranges = get_batch_ranges(ranges, comparisons=1)
+        totals_by_range = dict(
+            zip(batch_ranges, self._get_expense_column_totals(batch_ranges))
+        )
 
-        return result
+        breakdowns = []
+        for start_date, end_date in ranges:
+            current, previous_month = (
+                totals_by_range[date_range] for date_range in
+                get_comparison_ranges(start_date, end_date)[:2]
+            )
+            # Analyze each expense category
+            breakdowns.append(
+                engine.get_expense_breakdown(current, previous_month)
+                if current is not None else None
+            )
+        return breakdowns
 
-    def _calculate_spike_status(
-        self, category: str, current_amount: float, total_expenses: Decimal,
-        period_data: pd.DataFrame, prev_month_data: pd.DataFrame
-    ) -> bool:
+    def _get_expense_column_totals(
+        self, ranges: List[DateRange]
+    ) -> List[Optional[ColumnTotals]]:
         """
-        Calculate if category has spike based on:
-        - MoM growth > +20%
-        - Category ≥ 3% of total expenses
-        """
-        # Check if category ≥ 3% of total expenses
-        if total_expenses > 0:
-            percentage_of_total = (
-                current_amount / float(total_expenses)
-            ) * 100
-            if percentage_of_total >= 3:
-                return True
-
-        # Check MoM growth > 20%
-        if (not prev_month_data.empty and
-                category in prev_month_data.columns):
-            prev_amount = prev_month_data[category].sum()
-            prev_amount = prev_amount if not pd.isna(prev_amount) else 0
-
-            if prev_amount > 0:
-                mom_growth = (
-                    (current_amount - prev_amount) / prev_amount
-                ) * 100
-                if mom_growth > 20:
-                    return True
-
-        return False
-
-    def _calculate_gross_margin(
-        self, pnl_data: pd.DataFrame, total_revenue: Decimal
-    ) -> Decimal:
-        """Calculate gross margin percentage from PnL data using metadata columns"""
-        try:
-            if total_revenue <= 0:
-                return Decimal("0")
-            
-            # Get expense columns to find COGS-related columns
-            expense_columns = self._get_expense_columns()
-            
-            # Calculate total COGS for the period
-            # Look for columns that might represent COGS
-            total_cogs = Decimal("0")
-            cogs_candidates = [col for col in expense_columns 
-                             if any(keyword in col.upper() 
-                                   for keyword in ['COGS', 'COST', 'GOODS'])]
-            
-            if not cogs_candidates and 'COGS' in pnl_data.columns:
-                # Fallback to standard COGS column if no COGS found in metadata
-                cogs_candidates = ['COGS']
-            
-            for col in cogs_candidates:
-                if col in pnl_data.columns:
-                    cogs_sum = pnl_data[col].sum()
-                    if not pd.isna(cogs_sum):
-                        total_cogs += Decimal(str(cogs_sum))
-            
-            # Gross Margin = (Revenue - COGS) / Revenue * 100
-            gross_margin_percentage = ((total_revenue - total_cogs) / total_revenue) * 100
-            return gross_margin_percentage.quantize(Decimal('0.01'))
-            
-        except Exception as e:
-            logger.error(f"Error calculating gross margin: {str(e)}")
-            return Decimal("0")
+        Sum the expense columns of several date ranges, from the monthly
+        rollup when its totals equal the row sums
+        Returns:
+            Column totals per range, None for ranges without rows
+        """
+        monthly_rollup = self._get_monthly_rollup(ranges)
+        if monthly_rollup is not None:
+            return monthly_rollup.get_range_totals(ranges)
+
+        # Get PnL DataFrame with only the date and expense columns
+        pnl_df = self._get_dataframe_from_file(
+            "pnl_template",
+            columns=[self._get_date_column()] + self._get_expense_columns(),
+        )
+        if pnl_df is None:
+            raise ValueError("No P&L data found for user")
+        return self._get_metrics_engine().get_range_totals(
+            self._build_pnl_dataset(pnl_df), ranges
+        )
 
     def _get_industry_operating_margin(self) -> Optional[str]:
         """Get operating margin range from Industry_norms.csv for user's industry"""
@@ -740,18 +895,38 @@ Respond with format: "[Main trend] - [specific action]"
             logger.error(f"Error loading operating margin from industry norms: {str(e)}")
             return None
 
-    def invalidate_cache(self):
-        """Invalidate all cached data for this user"""
+    def carry_over_cache(
+        self, previous_version: int, version: int, affected_range: DateRange
+    ):
+        """
+        Re-key cached analyses of the previous dataset version that an
+        appended upload did not change to the new version
+        Args:
+            previous_version: Id of the superseded dataset version
+            version: Id of the new dataset version
+            affected_range: Dates of the changed rows
+        """
         user_cache_list_key = f"pnl_cache_list_{self.user.id}"
-        cache_list = cache.get(user_cache_list_key, [])
-
-        # Delete all cache entries for this user
-        if cache_list:
-            cache.delete_many(cache_list)
-            logger.info(
-                f"Deleted {len(cache_list)} cache entries for user {self.user.id}"
-            )
+        previous_marker = f"_v{previous_version}_"
+        previous_keys = [
+            key for key in cache.get(user_cache_list_key, [])
+            if previous_marker in key
+        ]
+        affected_keys = set(
+            get_affected_cache_keys(previous_keys, affected_range)
+        )
+        unaffected = cache.get_many(
+            [key for key in previous_keys if key not in affected_keys]
+        )
 
-        # Delete the cache list itself
-        cache.delete(user_cache_list_key)
-        logger.info(f"Cache invalidated for user {self.user.id}")
+        # Oldest first, so the LRU order is kept
+        for key in reversed(previous_keys):
+            if key in unaffected:
+                self._store_in_cache(
+                    key.replace(previous_marker, f"_v{version}_"),
+                    unaffected[key],
+                )
+        logger.info(
+            f"Carried over {len(unaffected)} of {len(previous_keys)} cache "
+            f"entries for user {self.user.id} to dataset version {version}"
+        )
@@ -1,14 +1,28 @@
 from decimal import Decimal
 from datetime import date
-from dateutil.relativedelta import relativedelta
+import numpy as np
 import pandas as pd
-import io
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 import logging
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from config.instances.minio_client import MINIO_CLIENT
-from users.models.user_data_file import UserDataFile
+from users.models.ledger_entries import InvoiceLedgerEntry
+from users.services.analysis_cache_keys import (
+    DateRange,
+    get_affected_cache_keys,
+)
+from users.services.analysis_ranges import (
+    get_batch_ranges,
+    get_comparison_ranges,
+    get_range_key,
+)
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.time_indexed_dataset import TimeIndexedDataset
+from users.services.time_series import sum_by_period, to_money_series
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+from users.services.ledger_aggregation_service import (
+    UserLedgerAggregationService
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -17,9 +31,14 @@ User = get_user_model()
 class UserInvoicesAnalysisService:
     """Service for analyzing user invoices data with date ranges"""
 
+    # Look for date columns (common names)
+    DATE_COLUMNS = TypedDataset.INVOICE_DATE_COLUMNS
+    ANALYSIS_COLUMNS = DATE_COLUMNS + ["Status", "Amount", "Due_Date"]
+
     def __init__(self, user):
         self.user = user
-        self.minio_client = MINIO_CLIENT
+        self.dataset_loader = UserDatasetLoader(user)
+        self.ledger_service = UserLedgerAggregationService(user)
 
     def get_invoices_analysis(self, start_date: date, end_date: date) -> Dict:
         """
@@ -30,7 +49,13 @@ class UserInvoicesAnalysisService:
         Returns:
             Dict with invoices analysis data, totals, and change calculations
         """
-        cache_key = f"invoices_analysis_{self.user.id}_{start_date}_{end_date}"
+        # Keyed by dataset version, a new upload never hits stale results,
+        # and by money scale, which a currency change changes
+        version = self.dataset_loader.get_active_version("invoices_template")
+        cache_key = (
+            f"invoices_analysis_{self.user.id}_v{version}_"
+            f"s{self.dataset_loader.money_scale}_{start_date}_{end_date}"
+        )
         cached_result = cache.get(cache_key)
 
         if cached_result:
@@ -40,58 +65,13 @@ class UserInvoicesAnalysisService:
             return cached_result
 
         try:
-            # Get invoices DataFrame
-            invoices_df = self._get_dataframe_from_file("invoices_template")
-            if invoices_df is None:
-                raise ValueError("No invoices data found for user")
-
-            # Filter data for the requested period
-            invoices_data = self._filter_invoices_data(invoices_df, start_date, end_date)
-
-            # Calculate totals for the period
-            total_count = len(invoices_data)
-            
-            # Calculate paid invoices metrics
-            paid_invoices = self._calculate_paid_invoices_metrics(invoices_data)
-            
-            # Calculate overdue invoices metrics
-            overdue_invoices = self._calculate_overdue_invoices_metrics(invoices_data)
-
-            # Calculate changes (1 month and 1 year ago)
-            month_changes = self._calculate_period_changes(
-                invoices_df, start_date, end_date, "month"
+            current, month_ago, year_ago = self._get_range_metrics(
+                get_comparison_ranges(start_date, end_date)
             )
-            year_changes = self._calculate_period_changes(
-                invoices_df, start_date, end_date, "year"
+            result = self._build_result(
+                start_date, end_date, current, month_ago, year_ago
             )
 
-            # Build response
-            result = {
-                "total_count": total_count,
-                "paid_invoices": {
-                    "total_count": paid_invoices["count"],
-                    "total_amount": paid_invoices["amount"],
-                },
-                "overdue_invoices": {
-                    "total_count": overdue_invoices["count"],
-                    "total_amount": overdue_invoices["amount"],
-                },
-                "month_change": {
-                    "paid_invoices": month_changes["paid_invoices"],
-                    "overdue_invoices": month_changes["overdue_invoices"],
-                    "total_count": month_changes["total_count"],
-                },
-                "year_change": {
-                    "paid_invoices": year_changes["paid_invoices"],
-                    "overdue_invoices": year_changes["overdue_invoices"],
-                    "total_count": year_changes["total_count"],
-                },
-                "period": {
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                },
-            }
-
             # Store in cache with LRU management
             self._store_in_cache(cache_key, result)
             logger.info(f"Calculated and cached invoices analysis for user {self.user.id}")
@@ -105,33 +85,220 @@ class UserInvoicesAnalysisService:
             )
             raise
 
+    def get_invoices_analysis_batch(self, ranges: List[DateRange]) -> Dict:
+        """
+        Get invoices analyses for several date ranges from one load of
+        the data; every range and comparison period is aggregated in one
+        pass
+        Args:
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            Dict of <start_date>_<end_date> to the analysis of the range
+        """
+        batch_ranges = get_batch_ranges(ranges)
+        metrics_by_range = dict(
+            zip(batch_ranges, self._get_range_metrics(batch_ranges))
+        )
+
+        results = {}
+        for start_date, end_date in ranges:
+            current, month_ago, year_ago = (
+                metrics_by_range[date_range]
+                for date_range in get_comparison_ranges(start_date, end_date)
+            )
+            results[get_range_key((start_date, end_date))] = self._build_result(
+                start_date, end_date, current, month_ago, year_ago
+            )
+        return results
+
+    def get_invoices_series(
+        self, start_date: date, end_date: date, periods: pd.PeriodIndex
+    ) -> Dict:
+        """
+        Get paid and overdue invoice counts and amounts per period,
+        grouped in one pass
+        Args:
+            start_date: First date of the horizon
+            end_date: Last date of the horizon
+            periods: Periods of the series
+        Returns:
+            Dict of metric to its list of period values
+        """
+        invoices_df = self._get_dataframe_from_file(
+            "invoices_template", columns=self.ANALYSIS_COLUMNS
+        )
+        if invoices_df is None:
+            raise ValueError("No invoices data found for user")
+        invoices_dataset = self._build_invoices_dataset(invoices_df)
+        rows = invoices_dataset.slice(start_date, end_date)
+
+        paid = self._get_paid_mask(rows)
+        overdue = self._get_overdue_mask(rows)
+        amounts = self._get_minor_unit_amounts(
+            rows, self.dataset_loader.money_scale
+        )
+        totals = sum_by_period(
+            rows, invoices_dataset.date_column,
+            pd.DataFrame({
+                "paid_count": paid.astype("int64"),
+                "paid_amount": np.where(paid, amounts, 0),
+                "overdue_count": overdue.astype("int64"),
+                "overdue_amount": np.where(overdue, amounts, 0),
+            }),
+            periods,
+        )
+        return {
+            "paid_count": [int(count) for count in totals["paid_count"]],
+            "paid_amount": to_money_series(
+                totals["paid_amount"], self.dataset_loader.money_scale
+            ),
+            "overdue_count": [int(count) for count in totals["overdue_count"]],
+            "overdue_amount": to_money_series(
+                totals["overdue_amount"], self.dataset_loader.money_scale
+            ),
+        }
+
+    def _get_range_metrics(self, ranges: List[DateRange]) -> List[Dict]:
+        """
+        Count and sum paid/overdue invoices for several date ranges
+        Args:
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            List of metric dicts, one per range
+        """
+        invoices_file = self.ledger_service.get_ingested_file(
+            "invoices_template", InvoiceLedgerEntry
+        )
+        if invoices_file is not None:
+            # One SQL aggregation over every range
+            return self.ledger_service.get_invoices_metrics(
+                invoices_file, ranges, self.dataset_loader.money_scale
+            )
+
+        # Get invoices DataFrame
+        invoices_df = self._get_dataframe_from_file(
+            "invoices_template", columns=self.ANALYSIS_COLUMNS
+        )
+        if invoices_df is None:
+            raise ValueError("No invoices data found for user")
+        return self._calculate_range_metrics(
+            self._build_invoices_dataset(invoices_df), ranges
+        )
+
+    def _calculate_range_metrics(
+        self, invoices_dataset: TimeIndexedDataset, ranges: List[DateRange]
+    ) -> List[Dict]:
+        """
+        Count and sum paid/overdue invoices for several date ranges in one
+        pass: prefix sums of the counts and minor unit amounts over the
+        date-sorted rows answer each range with two lookups
+        """
+        frame = invoices_dataset.frame
+        paid = self._get_paid_mask(frame)
+        overdue = self._get_overdue_mask(frame)
+        amounts = self._get_minor_unit_amounts(
+            frame, self.dataset_loader.money_scale
+        )
+
+        values = np.column_stack([
+            np.ones(len(frame), "int64"),
+            paid, np.where(paid, amounts, 0),
+            overdue, np.where(overdue, amounts, 0),
+        ]).astype("int64")
+        prefix_sums = np.vstack([
+            np.zeros((1, values.shape[1]), "int64"),
+            np.cumsum(values, axis=0),
+        ])
+
+        metrics = []
+        for start_date, end_date in ranges:
+            lower, upper = invoices_dataset.get_range_bounds(start_date, end_date)
+            (total_count, paid_count, paid_amount,
+             overdue_count, overdue_amount) = (
+                int(total) for total in prefix_sums[upper] - prefix_sums[lower]
+            )
+            metrics.append({
+                "total_count": total_count,
+                "paid": {"count": paid_count, "amount": paid_amount},
+                "overdue": {"count": overdue_count, "amount": overdue_amount},
+            })
+        return metrics
+
+    def _build_result(
+        self, start_date: date, end_date: date,
+        current: Dict, month_ago: Dict, year_ago: Dict,
+    ) -> Dict:
+        """Build the analysis response of a period from range metrics"""
+        month_changes = self._build_period_changes(current, month_ago)
+        year_changes = self._build_period_changes(current, year_ago)
+
+        return {
+            "total_count": current["total_count"],
+            "paid_invoices": {
+                "total_count": current["paid"]["count"],
+                "total_amount": self._to_money(current["paid"]["amount"]),
+            },
+            "overdue_invoices": {
+                "total_count": current["overdue"]["count"],
+                "total_amount": self._to_money(current["overdue"]["amount"]),
+            },
+            "month_change": {
+                "paid_invoices": month_changes["paid_invoices"],
+                "overdue_invoices": month_changes["overdue_invoices"],
+                "total_count": month_changes["total_count"],
+            },
+            "year_change": {
+                "paid_invoices": year_changes["paid_invoices"],
+                "overdue_invoices": year_changes["overdue_invoices"],
+                "total_count": year_changes["total_count"],
+            },
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+            },
+        }
+
+    @staticmethod
+    def _get_minor_unit_amounts(
+        invoices_data: pd.DataFrame, money_scale: int = MONEY_SCALE
+    ) -> np.ndarray:
+        """Invoice amounts in int64 minor units, missing amounts as 0"""
+        if "Amount" not in invoices_data.columns:
+            return np.zeros(len(invoices_data), "int64")
+        return (
+            TypedDataset.to_minor_units(invoices_data["Amount"], money_scale)
+            .fillna(0).to_numpy(dtype="int64")
+        )
+
+    @staticmethod
+    def _get_paid_mask(invoices_data: pd.DataFrame) -> np.ndarray:
+        """Mask of the paid invoices"""
+        if "Status" not in invoices_data.columns:
+            return np.zeros(len(invoices_data), bool)
+        return TypedDataset.match_values(
+            invoices_data["Status"], ["paid", "completed"]
+        ).to_numpy(dtype=bool, na_value=False)
+
+    @staticmethod
+    def _get_overdue_mask(invoices_data: pd.DataFrame) -> np.ndarray:
+        """Mask of the overdue invoices, by status or else by due date"""
+        if "Status" in invoices_data.columns:
+            return TypedDataset.match_values(
+                invoices_data["Status"], ["overdue", "unpaid", "pending"]
+            ).to_numpy(dtype=bool, na_value=False)
+        if "Due_Date" in invoices_data.columns:
+            due_dates = pd.to_datetime(invoices_data["Due_Date"], errors="coerce")
+            return (due_dates < pd.Timestamp.now()).to_numpy(dtype=bool)
+        return np.zeros(len(invoices_data), bool)
+
     def _calculate_paid_invoices_metrics(self, invoices_data: pd.DataFrame) -> Dict:
         """Calculate metrics for paid invoices"""
         try:
-            if invoices_data.empty:
-                return {"count": 0, "amount": 0.0}
-
-            # Filter paid invoices (assuming Status column exists)
             if "Status" not in invoices_data.columns:
                 logger.warning("Status column not found in invoices data")
-                return {"count": 0, "amount": 0.0}
-
-            paid_invoices = invoices_data[
-                invoices_data["Status"].str.lower().isin(["paid", "completed"])
-            ]
-
-            count = len(paid_invoices)
-            
-            # Calculate total amount (assuming Amount column exists)
-            total_amount = 0.0
-            if "Amount" in paid_invoices.columns and not paid_invoices.empty:
-                amount_sum = paid_invoices["Amount"].sum()
-                total_amount = float(amount_sum) if not pd.isna(amount_sum) else 0.0
-
-            return {
-                "count": count,
-                "amount": total_amount
-            }
+            return self._sum_invoices(
+                invoices_data[self._get_paid_mask(invoices_data)]
+            )
 
         except Exception as e:
             logger.error(f"Error calculating paid invoices metrics: {str(e)}")
@@ -140,204 +307,91 @@ class UserInvoicesAnalysisService:
     def _calculate_overdue_invoices_metrics(self, invoices_data: pd.DataFrame) -> Dict:
         """Calculate metrics for overdue invoices"""
         try:
-            if invoices_data.empty:
-                return {"count": 0, "amount": 0.0}
-
-            # Filter overdue invoices
-            overdue_invoices = pd.DataFrame()
-            
-            if "Status" in invoices_data.columns:
-                # Method 1: Filter by status
-                overdue_invoices = invoices_data[
-                    invoices_data["Status"].str.lower().isin(["overdue", "unpaid", "pending"])
-                ]
-            elif "Due_Date" in invoices_data.columns:
-                # Method 2: Filter by due date if status not available
-                invoices_copy = invoices_data.copy()
-                invoices_copy["Due_Date"] = pd.to_datetime(invoices_copy["Due_Date"])
-                current_date = pd.Timestamp.now()
-                overdue_invoices = invoices_copy[invoices_copy["Due_Date"] < current_date]
-
-            count = len(overdue_invoices)
-            
-            # Calculate total amount
-            total_amount = 0.0
-            if "Amount" in overdue_invoices.columns and not overdue_invoices.empty:
-                amount_sum = overdue_invoices["Amount"].sum()
-                total_amount = float(amount_sum) if not pd.isna(amount_sum) else 0.0
-
-            return {
-                "count": count,
-                "amount": total_amount
-            }
+            return self._sum_invoices(
+                invoices_data[self._get_overdue_mask(invoices_data)]
+            )
 
         except Exception as e:
             logger.error(f"Error calculating overdue invoices metrics: {str(e)}")
             return {"count": 0, "amount": 0.0}
 
-    def _calculate_period_changes(
-        self, invoices_df: pd.DataFrame, start_date: date, end_date: date, period_type: str
-    ) -> Dict:
-        """Calculate changes compared to same period 1 month or 1 year ago"""
-        try:
-            # Calculate offset based on period type
-            if period_type == "month":
-                offset_start = start_date - relativedelta(months=1)
-                offset_end = end_date - relativedelta(months=1)
-            else:  # year
-                offset_start = start_date - relativedelta(years=1)
-                offset_end = end_date - relativedelta(years=1)
-
-            # Get data for comparison period
-            comparison_data = self._filter_invoices_data(invoices_df, offset_start, offset_end)
-
-            # Calculate metrics for comparison period
-            comparison_total_count = len(comparison_data)
-            comparison_paid = self._calculate_paid_invoices_metrics(comparison_data)
-            comparison_overdue = self._calculate_overdue_invoices_metrics(comparison_data)
-
-            # Current period metrics
-            current_data = self._filter_invoices_data(invoices_df, start_date, end_date)
-            current_total_count = len(current_data)
-            current_paid = self._calculate_paid_invoices_metrics(current_data)
-            current_overdue = self._calculate_overdue_invoices_metrics(current_data)
-
-            # Calculate changes
-            return {
-                "total_count": self._build_change_data(
-                    Decimal(str(current_total_count)), 
-                    Decimal(str(comparison_total_count))
+    def _sum_invoices(self, invoices_data: pd.DataFrame) -> Dict:
+        total_amount = 0.0
+        if "Amount" in invoices_data.columns and not invoices_data.empty:
+            total_amount = float(TypedDataset.sum_money(
+                invoices_data["Amount"], self.dataset_loader.money_scale
+            ))
+        return {"count": len(invoices_data), "amount": total_amount}
+
+    def _to_money(self, minor_units: int) -> float:
+        """Convert a minor unit amount to major units"""
+        return float(TypedDataset.from_minor_units(
+            minor_units, self.dataset_loader.money_scale
+        ))
+
+    def _build_period_changes(self, current: Dict, comparison: Dict) -> Dict:
+        """
+        Build change data between current and comparison period metrics,
+        from integer counts and minor unit amounts
+        """
+        money_scale = self.dataset_loader.money_scale
+        return {
+            "total_count": self._build_change_data(
+                current["total_count"], comparison["total_count"]
+            ),
+            "paid_invoices": {
+                "count_change": self._build_change_data(
+                    current["paid"]["count"], comparison["paid"]["count"]
+                ),
+                "amount_change": TypedDataset.build_change_data(
+                    current["paid"]["amount"], comparison["paid"]["amount"],
+                    money_scale,
+                ),
+            },
+            "overdue_invoices": {
+                "count_change": self._build_change_data(
+                    current["overdue"]["count"], comparison["overdue"]["count"]
                 ),
-                "paid_invoices": {
-                    "count_change": self._build_change_data(
-                        Decimal(str(current_paid["count"])), 
-                        Decimal(str(comparison_paid["count"]))
-                    ),
-                    "amount_change": self._build_change_data(
-                        Decimal(str(current_paid["amount"])), 
-                        Decimal(str(comparison_paid["amount"]))
-                    ),
-                },
-                "overdue_invoices": {
-                    "count_change": self._build_change_data(
-                        Decimal(str(current_overdue["count"])), 
-                        Decimal(str(comparison_overdue["count"]))
-                    ),
-                    "amount_change": self._build_change_data(
-                        Decimal(str(current_overdue["amount"])), 
-                        Decimal(str(comparison_overdue["amount"]))
-                    ),
-                },
-            }
+                "amount_change": TypedDataset.build_change_data(
+                    current["overdue"]["amount"],
+                    comparison["overdue"]["amount"],
+                    money_scale,
+                ),
+            },
+        }
 
-        except Exception as e:
-            logger.error(f"Error calculating period changes: {str(e)}")
-            return {
-                "total_count": {"change": 0.0, "percentage_change": 0.0},
-                "paid_invoices": {
-                    "count_change": {"change": 0.0, "percentage_change": 0.0},
-                    "amount_change": {"change": 0.0, "percentage_change": 0.0},
-                },
-                "overdue_invoices": {
-                    "count_change": {"change": 0.0, "percentage_change": 0.0},
-                    "amount_change": {"change": 0.0, "percentage_change": 0.0},
-                },
-            }
-
-    def _build_change_data(self, current: Decimal, previous: Decimal) -> Dict:
+    def _build_change_data(
+        self, current: Union[int, Decimal], previous: Union[int, Decimal]
+    ) -> Dict:
         """Build change data structure"""
-        change = current - previous
-        if previous > 0:
-            percentage_change = float(change / previous * 100)
-        elif current > 0:
-            percentage_change = 100.0
-        else:
-            percentage_change = 0.0
-
-        return {
-            "change": float(change),
-            "percentage_change": round(percentage_change, 2),
-        }
+        return TypedDataset.build_change_data(current, previous)
+
+    def _build_invoices_dataset(
+        self, invoices_df: pd.DataFrame
+    ) -> TimeIndexedDataset:
+        """Index invoices data by its date column for range queries"""
+        invoices_dataset = TimeIndexedDataset.from_candidates(
+            invoices_df, self.DATE_COLUMNS
+        )
+        if invoices_dataset.date_column is None and not invoices_df.empty:
+            # All data matches every period if no date column
+            logger.warning("No date column found in invoices data")
+        return invoices_dataset
 
     def _filter_invoices_data(
-        self, invoices_df: pd.DataFrame, start_date: date, end_date: date
+        self, invoices_data: Union[pd.DataFrame, TimeIndexedDataset],
+        start_date: date, end_date: date
     ) -> pd.DataFrame:
         """Filter invoices data for the specified date range"""
-        try:
-            if invoices_df.empty:
-                return pd.DataFrame()
-
-            # Look for date columns (common names)
-            date_column = None
-            possible_date_columns = ["Date", "Invoice_Date", "Created_Date", "Issue_Date"]
-            
-            for col in possible_date_columns:
-                if col in invoices_df.columns:
-                    date_column = col
-                    break
-
-            if not date_column:
-                logger.warning("No date column found in invoices data")
-                return invoices_df  # Return all data if no date column
-
-            # Convert date column to datetime
-            invoices_df = invoices_df.copy()
-            invoices_df[date_column] = pd.to_datetime(invoices_df[date_column])
-
-            # Filter for the period
-            filtered_data = invoices_df[
-                (invoices_df[date_column] >= pd.Timestamp(start_date))
-                & (invoices_df[date_column] <= pd.Timestamp(end_date))
-            ]
-
-            return filtered_data
-
-        except Exception as e:
-            logger.error(f"Error filtering invoices data: {str(e)}")
-            return pd.DataFrame()
-
-    def _get_dataframe_from_file(self, template_type: str) -> Optional[pd.DataFrame]:
-        """Load CSV data from MinIO and convert to DataFrame"""
-        try:
-            # Get the most recent active file for this template type
-            user_file = (
-                UserDataFile.objects.filter(
-                    user=self.user, template_type=template_type, is_active=True
-                )
-                .order_by("-upload_time")
-                .first()
-            )
-
-            if not user_file:
-                logger.info(
-                    f"No active {template_type} file found for user {self.user.id}"
-                )
-                return None
-
-            # Download file from MinIO
-            try:
-                response = self.minio_client.client.get_object(
-                    "user-data", user_file.file_path
-                )
-                csv_data = response.read()
-                response.close()
-
-                # Convert to DataFrame
-                df = pd.read_csv(io.StringIO(csv_data.decode("utf-8")))
-                logger.info(
-                    f"Successfully loaded {template_type} data for user {self.user.id}"
-                )
-                return df
+        if isinstance(invoices_data, pd.DataFrame):
+            invoices_data = self._build_invoices_dataset(invoices_data)
+        return invoices_data.slice(start_date, end_date)
 
-            except Exception as e:
-                logger.error(f"Error downloading file from MinIO: {str(e)}")
-                return None
-
-        except Exception as e:
-            logger.error(
-                f"Error loading {template_type} data for user {self.user.id}: {str(e)}"
-            )
-            return None
+    def _get_dataframe_from_file(
+        self, template_type: str, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Load file data through the shared dataset cache"""
+        return self.dataset_loader.load(template_type, columns)
 
     def _store_in_cache(self, cache_key: str, result: Dict):
         """Store result in cache with LRU management (max 5 entries per user)"""
@@ -379,18 +433,38 @@ class UserInvoicesAnalysisService:
             cache_list.insert(0, cache_key)
             cache.set(user_cache_list_key, cache_list, 3600)
 
-    def invalidate_cache(self):
-        """Invalidate all cached data for this user"""
+    def carry_over_cache(
+        self, previous_version: int, version: int, affected_range: DateRange
+    ):
+        """
+        Re-key cached analyses of the previous dataset version that an
+        appended upload did not change to the new version
+        Args:
+            previous_version: Id of the superseded dataset version
+            version: Id of the new dataset version
+            affected_range: Dates of the changed rows
+        """
         user_cache_list_key = f"invoices_cache_list_{self.user.id}"
-        cache_list = cache.get(user_cache_list_key, [])
-
-        # Delete all cache entries for this user
-        if cache_list:
-            cache.delete_many(cache_list)
-            logger.info(
-                f"Deleted {len(cache_list)} cache entries for user {self.user.id}"
-            )
+        previous_marker = f"_v{previous_version}_"
+        previous_keys = [
+            key for key in cache.get(user_cache_list_key, [])
+            if previous_marker in key
+        ]
+        affected_keys = set(
+            get_affected_cache_keys(previous_keys, affected_range)
+        )
+        unaffected = cache.get_many(
+            [key for key in previous_keys if key not in affected_keys]
+        )
 
-        # Delete the cache list itself
-        cache.delete(user_cache_list_key)
-        logger.info(f"Invoices cache invalidated for user {self.user.id}")
\ No newline at end of file
+        # Oldest first, so the LRU order is kept
+        for key in reversed(previous_keys):
+            if key in unaffected:
+                self._store_in_cache(
+                    key.replace(previous_marker, f"_v{version}_"),
+                    unaffected[key],
+                )
+        logger.info(
+            f"Carried over {len(unaffected)} of {len(previous_keys)} cache "
+            f"entries for user {self.user.id} to dataset version {version}"
+        )
@@ -0,0 +1,237 @@
+"""
+Service for answering analysis queries with SQL aggregates over the
+ingested ledger tables.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from users.models.ledger_entries import (
+    InvoiceLedgerEntry,
+    PnLLedgerEntry,
+    TransactionLedgerEntry,
+)
+from users.models.user_data_file import UserDataFile
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[date, date]
+
+
+class UserLedgerAggregationService:
+    """
+    SQL-aggregation backend for the P&L, invoices and cash analysis
+    services. Every query is bounded by the
+    (user, dataset_version, date) index of the ledger tables.
+    """
+
+    PAID_STATUSES = ["paid", "completed"]
+    OVERDUE_STATUSES = ["overdue", "unpaid", "pending"]
+
+    def __init__(self, user):
+        self.user = user
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check whether analysis services should use the SQL backend"""
+        return settings.USER_DATA_ANALYSIS_BACKEND == "sql"
+
+    def get_active_file(self, template_type: str) -> Optional[UserDataFile]:
+        """Get the active file whose rows are ingested in the ledger"""
+        return (
+            UserDataFile.objects.filter(
+                user=self.user, template_type=template_type, is_active=True
+            )
+            .order_by("-upload_time")
+            .first()
+        )
+
+    def has_entries(self, model, user_file: UserDataFile) -> bool:
+        """Check whether the file rows were ingested"""
+        return model.objects.filter(
+            user=self.user, dataset_version=user_file
+        ).exists()
+
+    def get_ingested_file(
+        self, template_type: str, model
+    ) -> Optional[UserDataFile]:
+        """
+        Get the active file to aggregate in SQL, None when the SQL backend
+        is disabled or the file rows were not ingested
+        """
+        if not self.is_enabled():
+            return None
+
+        user_file = self.get_active_file(template_type)
+        if user_file is None or not self.has_entries(model, user_file):
+            return None
+        return user_file
+
+    @staticmethod
+    def _sum_or_zero(value: Optional[Decimal]) -> Decimal:
+        return value if value is not None else Decimal("0")
+
+    def get_pnl_column_totals(
+        self, user_file: UserDataFile, ranges: List[DateRange]
+    ) -> List[Dict[str, Decimal]]:
+        """
+        Sum every P&L column for several date ranges in one GROUP BY query
+        Args:
+            user_file: Ingested P&L file
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            List of {column_name: total} dicts, one per range
+        """
+        aggregates = {
+            f"range_{index}": Sum(
+                "amount", filter=Q(date__gte=start_date, date__lte=end_date)
+            )
+            for index, (start_date, end_date) in enumerate(ranges)
+        }
+        rows = (
+            PnLLedgerEntry.objects.filter(
+                user=self.user,
+                dataset_version=user_file,
+                date__gte=min(start for start, _ in ranges),
+                date__lte=max(end for _, end in ranges),
+            )
+            .values("column_name")
+            .annotate(**aggregates)
+        )
+
+        totals = [{} for _ in ranges]
+        for row in rows:
+            for index in range(len(ranges)):
+                totals[index][row["column_name"]] = self._sum_or_zero(
+                    row[f"range_{index}"]
+                )
+        return totals
+
+    def get_pnl_frame(
+        self, user_file: UserDataFile, date_column: str,
+        start_date: date, end_date: date
+    ) -> pd.DataFrame:
+        """Rebuild the P&L rows of a date range as a DataFrame"""
+        entries = (
+            PnLLedgerEntry.objects.filter(
+                user=self.user,
+                dataset_version=user_file,
+                date__gte=start_date,
+                date__lte=end_date,
+            )
+            .order_by("row_number")
+            .values_list("row_number", "date", "column_name", "amount")
+        )
+
+        records: Dict[int, Dict] = {}
+        for row_number, entry_date, column_name, amount in entries:
+            record = records.setdefault(
+                row_number, {date_column: pd.Timestamp(entry_date)}
+            )
+            record[column_name] = float(amount) if amount is not None else None
+
+        return pd.DataFrame(list(records.values()))
+
+    def get_invoices_metrics(
+        self, user_file: UserDataFile, ranges: List[DateRange],
+        money_scale: int = MONEY_SCALE,
+    ) -> List[Dict]:
+        """
+        Count and sum paid/overdue invoices for several date ranges
+        Args:
+            user_file: Ingested invoices file
+            ranges: List of (start_date, end_date) tuples
+            money_scale: Minor units per major unit of the amounts
+        Returns:
+            List of metric dicts, one per range, amounts in minor units
+        """
+        entries = InvoiceLedgerEntry.objects.filter(
+            user=self.user, dataset_version=user_file
+        )
+
+        # Files without a recognised date column are not filtered by date
+        is_dated = entries.filter(date__isnull=False).exists()
+        # Without a Status column overdue invoices are detected by due date
+        has_status = entries.filter(status__isnull=False).exists()
+
+        paid_filter = Q(status__in=self.PAID_STATUSES)
+        if has_status:
+            overdue_filter = Q(status__in=self.OVERDUE_STATUSES)
+        else:
+            overdue_filter = Q(due_date__lte=timezone.now().date())
+
+        aggregates = {}
+        for index, (start_date, end_date) in enumerate(ranges):
+            range_filter = (
+                Q(date__gte=start_date, date__lte=end_date) if is_dated else Q()
+            )
+            aggregates.update({
+                f"total_count_{index}": Count("id", filter=range_filter),
+                f"paid_count_{index}": Count(
+                    "id", filter=range_filter & paid_filter
+                ),
+                f"paid_amount_{index}": Sum(
+                    "amount", filter=range_filter & paid_filter
+                ),
+                f"overdue_count_{index}": Count(
+                    "id", filter=range_filter & overdue_filter
+                ),
+                f"overdue_amount_{index}": Sum(
+                    "amount", filter=range_filter & overdue_filter
+                ),
+            })
+
+        if is_dated:
+            entries = entries.filter(
+                date__gte=min(start for start, _ in ranges),
+                date__lte=max(end for _, end in ranges),
+            )
+        result = entries.aggregate(**aggregates)
+
+        return [
+            {
+                "total_count": result[f"total_count_{index}"],
+                "paid": {
+                    "count": result[f"paid_count_{index}"],
+                    "amount": TypedDataset.decimal_to_minor_units(
+                        result[f"paid_amount_{index}"], money_scale
+                    ),
+                },
+                "overdue": {
+                    "count": result[f"overdue_count_{index}"],
+                    "amount": TypedDataset.decimal_to_minor_units(
+                        result[f"overdue_amount_{index}"], money_scale
+                    ),
+                },
+            }
+            for index in range(len(ranges))
+        ]
+
+    def get_cash_totals(
+        self, user_file: UserDataFile,
+        start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> Tuple[Decimal, Decimal]:
+        """Sum income and expense transactions, optionally by date range"""
+        entries = TransactionLedgerEntry.objects.filter(
+            user=self.user, dataset_version=user_file
+        )
+        if start_date:
+            entries = entries.filter(date__gte=start_date)
+        if end_date:
+            entries = entries.filter(date__lte=end_date)
+
+        result = entries.aggregate(
+            total_income=Sum("amount", filter=Q(transaction_type="income")),
+            total_expense=Sum("amount", filter=Q(transaction_type="expense")),
+        )
+        return (
+            self._sum_or_zero(result["total_income"]),
+            self._sum_or_zero(result["total_expense"]),
+        )
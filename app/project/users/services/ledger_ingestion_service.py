@@ -0,0 +1,178 @@
+"""
+Service for bulk-loading uploaded file rows into the ledger tables.
+"""
+import io
+import logging
+from typing import Callable, Dict, Type
+
+import pandas as pd
+from django.db import connection, models, transaction
+
+from users.models.ledger_entries import (
+    InvoiceLedgerEntry,
+    PnLLedgerEntry,
+    TransactionLedgerEntry,
+)
+from users.models.user_data_file import UserDataFile
+from users.services.invoices_analysis_service import UserInvoicesAnalysisService
+
+logger = logging.getLogger(__name__)
+
+
+class UserLedgerIngestionService:
+    """
+    Service that loads the rows of an uploaded file into the per-template
+    ledger table with Postgres COPY. Rows belong to their dataset version
+    and are deleted with it.
+    """
+
+    # NULL marker used in the COPY stream, so empty strings stay empty
+    COPY_NULL = "\\N"
+
+    LEDGER_MODELS: Dict[str, Type[models.Model]] = {
+        UserDataFile.TemplateType.PNL_TEMPLATE: PnLLedgerEntry,
+        UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE: TransactionLedgerEntry,
+        UserDataFile.TemplateType.INVOICES_TEMPLATE: InvoiceLedgerEntry,
+    }
+
+    def __init__(self, user):
+        self.user = user
+
+    def ingest(self, user_file: UserDataFile, df: pd.DataFrame) -> int:
+        """
+        Load the rows of a dataset version into its template ledger
+        Args:
+            user_file: File record the rows belong to
+            df: Parsed content of the uploaded file
+        Returns:
+            Number of ledger rows written
+        """
+        builders: Dict[str, Callable] = {
+            UserDataFile.TemplateType.PNL_TEMPLATE: self._build_pnl_rows,
+            UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE: (
+                self._build_transaction_rows
+            ),
+            UserDataFile.TemplateType.INVOICES_TEMPLATE: self._build_invoice_rows,
+        }
+        model = self.LEDGER_MODELS[user_file.template_type]
+        build_rows = builders[user_file.template_type]
+
+        rows = build_rows(user_file, df)
+        rows.insert(0, "user", self.user.id)
+        rows.insert(1, "dataset_version", user_file.id)
+
+        # A failed COPY must not abort the caller's transaction
+        with transaction.atomic():
+            self._copy_rows(model, rows)
+
+        logger.info(
+            f"Ingested {len(rows)} {user_file.template_type} ledger rows "
+            f"for user {self.user.id}"
+        )
+        return len(rows)
+
+    def is_ingested(self, user_file: UserDataFile) -> bool:
+        """Check whether the rows of a dataset version are in its ledger"""
+        model = self.LEDGER_MODELS[user_file.template_type]
+        return model.objects.filter(
+            user=self.user, dataset_version=user_file
+        ).exists()
+
+    def _copy_rows(self, model: Type[models.Model], rows: pd.DataFrame):
+        """Stream rows into the model table with COPY FROM STDIN"""
+        buffer = io.StringIO()
+        rows.to_csv(buffer, index=False, header=False, na_rep=self.COPY_NULL)
+        buffer.seek(0)
+
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(
+            quote_name(model._meta.get_field(name).column) for name in rows.columns
+        )
+        copy_sql = (
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{self.COPY_NULL}')"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, buffer)
+
+    @staticmethod
+    def _to_dates(values: pd.Series) -> pd.Series:
+        """Parse a column to dates, unparseable values become NULL"""
+        return pd.to_datetime(values, errors="coerce").dt.date
+
+    def _build_pnl_rows(
+        self, user_file: UserDataFile, df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Melt numeric P&L columns into (date, column, amount) rows"""
+        meta_data = user_file.meta_data or {}
+        date_column = meta_data.get("date_column") or "Month"
+
+        numeric_df = df.drop(columns=[date_column], errors="ignore").select_dtypes(
+            "number"
+        )
+        numeric_df.insert(0, "row_number", range(len(df)))
+        numeric_df.insert(
+            0,
+            "date",
+            self._to_dates(df[date_column]) if date_column in df.columns else None,
+        )
+
+        return numeric_df.melt(
+            id_vars=["date", "row_number"],
+            var_name="column_name",
+            value_name="amount",
+        )
+
+    def _build_transaction_rows(
+        self, user_file: UserDataFile, df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Build one ledger row per transaction"""
+        type_column = next(
+            (col for col in ["Type", "Category"] if col in df.columns), None
+        )
+
+        return pd.DataFrame({
+            "date": (
+                self._to_dates(df["Date"]) if "Date" in df.columns else None
+            ),
+            "row_number": range(len(df)),
+            "transaction_type": (
+                df[type_column].astype(str).str.lower().where(
+                    df[type_column].notna()
+                )
+                if type_column else None
+            ),
+            "amount": (
+                pd.to_numeric(df["Amount"], errors="coerce")
+                if "Amount" in df.columns else None
+            ),
+        })
+
+    def _build_invoice_rows(
+        self, user_file: UserDataFile, df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Build one ledger row per invoice"""
+        date_column = next(
+            (
+                col for col in UserInvoicesAnalysisService.DATE_COLUMNS
+                if col in df.columns
+            ),
+            None,
+        )
+
+        return pd.DataFrame({
+            "date": self._to_dates(df[date_column]) if date_column else None,
+            "row_number": range(len(df)),
+            "status": (
+                df["Status"].fillna("").astype(str).str.lower()
+                if "Status" in df.columns else None
+            ),
+            "due_date": (
+                self._to_dates(df["Due_Date"]) if "Due_Date" in df.columns else None
+            ),
+            "amount": (
+                pd.to_numeric(df["Amount"], errors="coerce")
+                if "Amount" in df.columns else None
+            ),
+        })
@@ -0,0 +1,266 @@
+"""
+Vectorized P&L metrics shared by the analysis services.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from users.services.time_indexed_dataset import TimeIndexedDataset
+from users.services.time_series import to_money_series
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[date, date]
+# Column totals in minor units of the currency
+ColumnTotals = Dict[str, int]
+
+
+class PnLMetricsEngine:
+    """
+    Computes totals, margins, expense categories and period comparisons
+    of P&L data. The column totals of every requested period come from
+    one product of a period membership matrix with the int64 minor unit
+    matrix of the rows, so sums and deltas are exact integers converted
+    to major units only for the response. Totals from the monthly rollup
+    or the ledger feed the same metrics, so every analysis agrees on them.
+    """
+
+    COGS_KEYWORDS = ("COGS", "COST", "GOODS")
+    # An expense category is a spike from this share of total expenses
+    # or from this month over month growth
+    SPIKE_SHARE_PERCENT = 3
+    SPIKE_GROWTH_PERCENT = 20
+
+    def __init__(
+        self,
+        revenue_columns: List[str],
+        expense_columns: List[str],
+        money_scale: int = MONEY_SCALE,
+    ):
+        self.revenue_columns = revenue_columns
+        self.expense_columns = expense_columns
+        self.money_scale = money_scale
+        # Falls back to the standard COGS column
+        self.cogs_columns = [
+            col for col in expense_columns
+            if any(keyword in col.upper() for keyword in self.COGS_KEYWORDS)
+        ] or ["COGS"]
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns the metrics are computed from"""
+        return list(dict.fromkeys(
+            self.revenue_columns + self.expense_columns + self.cogs_columns
+        ))
+
+    def get_range_totals(
+        self, dataset: TimeIndexedDataset, ranges: List[DateRange]
+    ) -> List[Optional[ColumnTotals]]:
+        """
+        Sum the metric columns for several date ranges in one pass
+        Args:
+            dataset: Date-indexed P&L data
+            ranges: List of (start_date, end_date) tuples
+        Returns:
+            {column_name: total} in minor units per range, for the
+            columns present in the data; None for ranges without rows
+        """
+        columns = [col for col in self.columns if col in dataset.frame.columns]
+        bounds = [dataset.get_range_bounds(start, end) for start, end in ranges]
+        lower = min(start for start, _ in bounds)
+        upper = max(lower, max(end for _, end in bounds))
+
+        matrix = self.to_matrix(dataset.frame.iloc[lower:upper], columns)
+        positions = np.arange(lower, upper)
+        membership = np.array(
+            [(positions >= start) & (positions < end) for start, end in bounds],
+            dtype="int64",
+        ).reshape(len(bounds), len(positions))
+        sums = membership @ matrix
+
+        return [
+            {
+                column: int(total)
+                for column, total in zip(columns, range_sums)
+            } if end > start else None
+            for (start, end), range_sums in zip(bounds, sums)
+        ]
+
+    def to_matrix(self, frame: pd.DataFrame, columns: List[str]) -> np.ndarray:
+        """
+        Int64 minor unit matrix of the columns, missing and unparseable
+        values as 0
+        """
+        if not columns:
+            return np.zeros((len(frame), 0), dtype="int64")
+        return np.column_stack([
+            TypedDataset.to_minor_units(frame[col], self.money_scale)
+            .fillna(0).to_numpy(dtype="int64")
+            for col in columns
+        ])
+
+    @staticmethod
+    def sum_columns(totals: Optional[ColumnTotals], columns: List[str]) -> int:
+        """Sum the totals of the given columns"""
+        totals = totals or {}
+        return sum(totals.get(col, 0) for col in columns)
+
+    def to_money(self, amount: int) -> float:
+        """Serialize an amount of minor units in major units"""
+        return float(TypedDataset.from_minor_units(amount, self.money_scale))
+
+    def get_period_metrics(self, totals: Optional[ColumnTotals]) -> Dict:
+        """
+        Get the metrics of one period
+        Args:
+            totals: Column totals of the period
+        Returns:
+            Dict with total_revenue, total_expenses, net_profit and
+            total_cogs in minor units, and gross_margin (percent) as
+            Decimal
+        """
+        total_revenue = self.sum_columns(totals, self.revenue_columns)
+        total_expenses = self.sum_columns(totals, self.expense_columns)
+        total_cogs = self.sum_columns(totals, self.cogs_columns)
+
+        # Gross Margin = (Revenue - COGS) / Revenue * 100
+        gross_margin = Decimal("0")
+        if total_revenue > 0:
+            gross_margin = (
+                Decimal(total_revenue - total_cogs) * 100 / Decimal(total_revenue)
+            ).quantize(Decimal("0.01"))
+
+        return {
+            "total_revenue": total_revenue,
+            "total_expenses": total_expenses,
+            "net_profit": total_revenue - total_expenses,
+            "total_cogs": total_cogs,
+            "gross_margin": gross_margin,
+        }
+
+    def compare(
+        self, current: Optional[ColumnTotals], previous: Optional[ColumnTotals]
+    ) -> Dict:
+        """Build revenue, expenses and net profit changes between periods"""
+        current_metrics = self.get_period_metrics(current)
+        previous_metrics = self.get_period_metrics(previous)
+        return {
+            metric: self.build_change_data(
+                current_metrics[key], previous_metrics[key]
+            )
+            for metric, key in (
+                ("revenue", "total_revenue"),
+                ("expenses", "total_expenses"),
+                ("net_profit", "net_profit"),
+            )
+        }
+
+    def build_change_data(self, current: int, previous: int) -> Dict:
+        """Build change data structure of two minor unit amounts"""
+        return TypedDataset.build_change_data(
+            current, previous, self.money_scale
+        )
+
+    def get_expense_categories(
+        self, totals: Optional[ColumnTotals]
+    ) -> Dict[str, float]:
+        """Get the positive expense totals per category"""
+        totals = totals or {}
+        return {
+            col: self.to_money(totals[col]) for col in self.expense_columns
+            if col in totals and totals[col] > 0
+        }
+
+    def get_metric_totals(self, totals: pd.DataFrame) -> Dict[str, pd.Series]:
+        """
+        Get revenue, expenses and net profit of consecutive periods
+        Args:
+            totals: Minor unit column totals indexed by period, as from
+                sum_by_period
+        Returns:
+            Dict of metric to its int64 minor unit totals per period
+        """
+        def sum_present(columns: List[str]) -> pd.Series:
+            present = [col for col in columns if col in totals.columns]
+            return totals[present].sum(axis=1).astype("int64")
+
+        revenue = sum_present(self.revenue_columns)
+        expenses = sum_present(self.expense_columns)
+        return {
+            "revenue": revenue,
+            "expenses": expenses,
+            "net_profit": revenue - expenses,
+        }
+
+    def get_series(self, totals: pd.DataFrame) -> Dict:
+        """
+        Get the metrics of consecutive periods
+        Args:
+            totals: Minor unit column totals indexed by period
+        Returns:
+            Dict with revenue, expenses and net_profit lists, and
+            expenses_by_category of category to its list
+        """
+        return {
+            **{
+                metric: to_money_series(metric_totals, self.money_scale)
+                for metric, metric_totals in self.get_metric_totals(totals).items()
+            },
+            "expenses_by_category": {
+                col: to_money_series(totals[col], self.money_scale)
+                for col in self.expense_columns if col in totals.columns
+            },
+        }
+
+    def get_expense_breakdown(
+        self, current: ColumnTotals, previous: Optional[ColumnTotals]
+    ) -> Dict:
+        """
+        Analyze each expense category for total amount, spike, and new
+        status
+        Args:
+            current: Column totals of the period
+            previous: Column totals of the month before, None without rows
+        Returns:
+            Dict of category to total_amount, spike, new and
+            monthly_change_percent, 0 without spending the month before
+        """
+        total_expenses = self.sum_columns(current, self.expense_columns)
+
+        result = {}
+        for category in self.expense_columns:
+            if category not in current:
+                continue
+            amount = current[category]
+            spike = False
+            monthly_change_percent = 0.0
+
+            # Share of total expenses, compared without division
+            if (total_expenses > 0 and amount * 100
+                    >= self.SPIKE_SHARE_PERCENT * total_expenses):
+                spike = True
+
+            # Growth is only measured against spending the month before
+            previous_amount = (previous or {}).get(category, 0)
+            if previous_amount > 0:
+                monthly_change_percent = float(
+                    Decimal(amount - previous_amount) * 100
+                    / Decimal(previous_amount)
+                )
+                if monthly_change_percent > self.SPIKE_GROWTH_PERCENT:
+                    spike = True
+
+            result[category] = {
+                "total_amount": self.to_money(amount),
+                "spike": spike,
+                # New categories are not detected yet
+                "new": False,
+                "monthly_change_percent": round(monthly_change_percent, 2),
+            }
+
+        return result
@@ -0,0 +1,181 @@
+"""
+Monthly rollup cube of P&L files, built once at upload time.
+"""
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from users.services.typed_dataset import MONEY_SCALE
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[date, date]
+
+
+class PnLMonthlyRollup:
+    """
+    Totals of every numeric P&L column per calendar month, each month
+    labelled by its first day. Range totals are answered from prefix
+    sums, so their cost depends on the number of months rather than on
+    the size of the uploaded file; a month counts towards a range when
+    its first day is within it, as a P&L row of the month ("2024-01")
+    does. Totals of a range equal its row sums only when the range is
+    month-aligned or every row is dated on the first of a month. Totals are stored in major units and summed as integers of
+    the currency minor unit.
+    """
+
+    def __init__(
+        self,
+        periods: List[str],
+        totals: Dict[str, List[float]],
+        money_scale: int = MONEY_SCALE,
+    ):
+        self.periods = periods
+        self.totals = totals
+        self._index = pd.DatetimeIndex(pd.to_datetime(periods))
+        self._prefix_sums = {
+            column: self._build_prefix_sums(values, money_scale)
+            for column, values in totals.items()
+        }
+
+    @staticmethod
+    def _build_prefix_sums(values: List[float], money_scale: int) -> np.ndarray:
+        minor_units = np.rint(
+            np.asarray(values, dtype="float64") * money_scale
+        ).astype("int64")
+        return np.concatenate([[0], np.cumsum(minor_units)]).astype("int64")
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, date_column: str) -> "PnLMonthlyRollup":
+        """
+        Build the rollup from the parsed content of a P&L file
+        Args:
+            df: Parsed P&L file
+            date_column: Name of the period column
+        Returns:
+            PnLMonthlyRollup instance
+        """
+        if date_column not in df.columns:
+            raise ValueError(f"Date column '{date_column}' not found in P&L data")
+
+        numeric_df = df.drop(columns=[date_column]).select_dtypes("number")
+        # Rows with unparseable dates never match a date range
+        months = cls.get_months(df[date_column])
+        grouped = numeric_df[months.notna()].groupby(months[months.notna()]).sum()
+        grouped = grouped.sort_index()
+
+        return cls(
+            periods=[
+                month.start_time.date().isoformat() for month in grouped.index
+            ],
+            totals={
+                column: [float(value) for value in grouped[column]]
+                for column in grouped.columns
+            },
+        )
+
+    @staticmethod
+    def get_months(values: pd.Series) -> pd.Series:
+        """Calendar month of each date, NaT if unparseable"""
+        return pd.to_datetime(values, errors="coerce").dt.to_period("M")
+
+    @classmethod
+    def from_dict(
+        cls, data: Dict, money_scale: int = MONEY_SCALE
+    ) -> "PnLMonthlyRollup":
+        return cls(
+            periods=data["periods"], totals=data["totals"],
+            money_scale=money_scale,
+        )
+
+    def to_dict(self) -> Dict:
+        """Serialize the rollup for storage in a JSON field"""
+        return {"periods": self.periods, "totals": self.totals}
+
+    def replace_periods(self, other: "PnLMonthlyRollup") -> "PnLMonthlyRollup":
+        """
+        Merge the rollup of newly appended rows into this one
+        Args:
+            other: Rollup of every row of the months it replaces
+        Returns:
+            PnLMonthlyRollup with the periods of other replaced or added
+        """
+        columns = list(self.totals) + [
+            column for column in other.totals if column not in self.totals
+        ]
+
+        by_period = {}
+        for rollup in (self, other):
+            for position, period in enumerate(rollup.periods):
+                by_period[period] = {
+                    column: rollup.totals[column][position]
+                    if column in rollup.totals else 0.0
+                    for column in columns
+                }
+
+        periods = sorted(by_period)
+        return PnLMonthlyRollup(
+            periods=periods,
+            totals={
+                column: [by_period[period][column] for period in periods]
+                for column in columns
+            },
+        )
+
+    def get_totals(
+        self, start_date: date, end_date: date
+    ) -> Optional[Dict[str, int]]:
+        """
+        Sum every column over the periods within [start_date, end_date]
+        Returns:
+            {column_name: total} in minor units, None if no month of the
+            range has rows
+        """
+        lower = self._index.searchsorted(pd.Timestamp(start_date), side="left")
+        upper = self._index.searchsorted(pd.Timestamp(end_date), side="right")
+        if upper == lower:
+            return None
+
+        return {
+            column: int(prefix_sums[upper] - prefix_sums[lower])
+            for column, prefix_sums in self._prefix_sums.items()
+        }
+
+    def get_range_totals(
+        self, ranges: List[DateRange]
+    ) -> List[Optional[Dict[str, int]]]:
+        """Sum every column for several date ranges"""
+        return [self.get_totals(start, end) for start, end in ranges]
+
+    @staticmethod
+    def is_month_aligned(start_date: date, end_date: date) -> bool:
+        """
+        Whether a range starts on the first and ends on the last day of a
+        month; the rollup totals of such ranges equal their row sums
+        """
+        return (
+            start_date.day == 1
+            and (pd.Timestamp(end_date) + pd.Timedelta(days=1)).day == 1
+        )
+
+    @classmethod
+    def build_from_upload(
+        cls, df: pd.DataFrame, meta_data: Optional[Dict]
+    ) -> Optional[Dict]:
+        """
+        Build the serialized rollup of an uploaded P&L file
+        Args:
+            df: Parsed P&L file
+            meta_data: File metadata with an optional date_column
+        Returns:
+            Serialized rollup or None if it could not be built
+        """
+        date_column = (meta_data or {}).get("date_column") or "Month"
+        try:
+            return cls.build(df, date_column).to_dict()
+        except Exception as e:
+            logger.error(f"Error building P&L monthly rollup: {str(e)}")
+            return None
@@ -0,0 +1,184 @@
+"""
+Service for direct-to-storage uploads of user data files through
+presigned URLs.
+"""
+import logging
+import shutil
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile,
+    UploadedFile,
+)
+from django.utils.text import get_valid_filename
+
+from config.instances.storage import STORAGE
+from config.utils.file_validators import FileFormatValidator
+from users.services.excel_ingest_service import ExcelIngestService
+
+logger = logging.getLogger(__name__)
+
+
+class PresignedUploadedFile(UploadedFile):
+    """File uploaded by the client straight into the staging folder"""
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        staged_path: str,
+        columns: Optional[List[str]],
+        template_type: Optional[str],
+    ):
+        super().__init__(
+            file=None, name=name, content_type=self._get_content_type(name),
+            size=size,
+        )
+        self.staged_path = staged_path
+        # Hashed when the job stores the file
+        self.sha256 = None
+        self.columns = columns
+        self.template_type = template_type
+
+    @staticmethod
+    def _get_content_type(name: str) -> str:
+        if ExcelIngestService.is_excel(name):
+            return "application/vnd.ms-excel"
+        return "text/csv"
+
+
+class UserPresignedUploadService:
+    """
+    Issues presigned PUT URLs under user_<id>/data_uploads/incoming/<id>,
+    so file bytes go from the browser to storage without passing through
+    Django. Finalizing an upload checks the uploaded objects and hands
+    them to a background upload job, which validates their rows and
+    stores them as new dataset versions. Objects of uploads that are
+    never finalized are removed by the storage GC.
+    """
+
+    BUCKET_NAME = "user-data"
+    FILE_FIELDS = ("pnl_file", "transactions_file", "invoices_file")
+    # Workbooks are read whole to find their header, like regular uploads
+    EXCEL_MAX_BYTES = 20 * 1024 * 1024
+
+    def __init__(self, user):
+        self.user = user
+        self.storage = STORAGE
+
+    def get_upload_folder(self, upload_id: UUID) -> str:
+        return self.storage.get_user_folder_path(
+            self.user.id, f"data_uploads/incoming/{upload_id}"
+        )
+
+    def create_upload(self, file_names: Dict[str, str]) -> Dict:
+        """
+        Issue upload URLs for the files of one upload
+        Args:
+            file_names: File field (pnl_file, ...) to client file name
+        Returns:
+            Dict with upload_id, expires_in and per-field upload urls
+        """
+        upload_id = uuid4()
+        folder = self.get_upload_folder(upload_id)
+        expires_in = settings.USER_DATA_PRESIGNED_UPLOAD_EXPIRY_SECONDS
+
+        files = {}
+        for field_name, file_name in file_names.items():
+            object_name = f"{folder}/{field_name}/{get_valid_filename(file_name)}"
+            files[field_name] = {
+                "method": "PUT",
+                "url": self.storage.get_upload_url(
+                    self.BUCKET_NAME, object_name, expires_in
+                ),
+                "object_name": object_name,
+            }
+
+        logger.info(
+            f"Issued {len(files)} upload URL(s) for upload {upload_id} "
+            f"of user {self.user.id}"
+        )
+        return {
+            "upload_id": str(upload_id),
+            "expires_in": expires_in,
+            "files": files,
+        }
+
+    def get_uploaded_files(
+        self, upload_id: UUID
+    ) -> Dict[str, PresignedUploadedFile]:
+        """
+        Get the files the client uploaded, with their headers read
+        Args:
+            upload_id: Id returned by create_upload
+        Returns:
+            File field to uploaded file; empty if nothing was uploaded
+        Raises:
+            ValueError: If a file exceeds the size limit
+        """
+        folder = self.get_upload_folder(upload_id)
+        objects = self.storage.list_user_files(
+            self.user.id, f"data_uploads/incoming/{upload_id}"
+        )
+
+        files = {}
+        for obj in objects:
+            field_name, _, file_name = (
+                obj.object_name[len(folder) + 1:].partition("/")
+            )
+            if field_name not in self.FILE_FIELDS or not file_name:
+                continue
+
+            max_size = (
+                self.EXCEL_MAX_BYTES if ExcelIngestService.is_excel(file_name)
+                else settings.USER_DATA_STREAMING_UPLOAD_MAX_BYTES
+            )
+            if obj.size > max_size:
+                raise ValueError(
+                    f"{file_name}: Файл превышает допустимый размер "
+                    f"{max_size // (1024 * 1024)} МБ"
+                )
+
+            columns, template_type = self._read_header(
+                obj.object_name, file_name, obj.size
+            )
+            files[field_name] = PresignedUploadedFile(
+                name=file_name,
+                size=obj.size,
+                staged_path=obj.object_name,
+                columns=columns,
+                template_type=template_type,
+            )
+
+        return files
+
+    def _read_header(self, object_name: str, file_name: str, size: int):
+        """Read the header of an uploaded object, downloading CSV files
+        only up to the header"""
+        if ExcelIngestService.is_excel(file_name):
+            file = TemporaryUploadedFile(file_name, None, size, None)
+            length = 0
+        else:
+            file = ContentFile(b"", name=file_name)
+            length = FileFormatValidator.HEADER_SNIFF_BYTES
+
+        with self.storage.open_object(
+            self.BUCKET_NAME, object_name, length=length
+        ) as stream:
+            shutil.copyfileobj(
+                stream, file, settings.USER_DATA_UPLOAD_PART_SIZE
+            )
+
+        try:
+            return FileFormatValidator.read_header(file)
+        finally:
+            file.close()
+
+    def discard(self, files: Dict[str, PresignedUploadedFile]):
+        """Delete uploaded objects that will not be processed"""
+        self.storage.delete_files(
+            self.BUCKET_NAME, [file.staged_path for file in files.values()]
+        )
@@ -0,0 +1,112 @@
+"""
+Trailing window totals of monthly metrics from cumulative sums.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+
+
+class RollingWindowSums:
+    """
+    Monthly totals of a dataset with their cumulative sums, built once.
+    The total of any window of consecutive months is the difference of
+    two cumulative sums, so trailing totals and moving averages for
+    every month cost one subtraction each instead of a filter and sum
+    per month and window. Sums are int64 minor units.
+    """
+
+    def __init__(
+        self,
+        months: pd.PeriodIndex,
+        totals: Dict[str, np.ndarray],
+        money_scale: int = MONEY_SCALE,
+    ):
+        """
+        Args:
+            months: Consecutive months of the history, oldest first
+            totals: Metric name to its minor unit total per month
+            money_scale: Minor units per major unit
+        """
+        self.months = months
+        self.money_scale = money_scale
+        self._first_ordinal = months[0].ordinal if len(months) else 0
+        self._cumulative = {
+            name: np.concatenate([[0], np.cumsum(values, dtype="int64")])
+            for name, values in totals.items()
+        }
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self._cumulative)
+
+    def _get_positions(self, months: pd.PeriodIndex) -> np.ndarray:
+        """Months since the first month of the history"""
+        return np.array(
+            [month.ordinal - self._first_ordinal for month in months],
+            dtype="int64",
+        )
+
+    def _get_cumulative(self, name: str, positions: np.ndarray) -> np.ndarray:
+        """Cumulative totals up to and including each position"""
+        cumulative = self._cumulative[name]
+        return cumulative[np.clip(positions + 1, 0, len(cumulative) - 1)]
+
+    def get_window_totals(
+        self, name: str, months: pd.PeriodIndex, window: int
+    ) -> List[Optional[float]]:
+        """
+        Get the trailing window totals of a metric
+        Args:
+            name: Metric name
+            months: Last month of each window
+            window: Number of months per window
+        Returns:
+            Total per month in major units; None where the window starts
+            before the history, months after it count as 0
+        """
+        positions = self._get_positions(months)
+        totals = (
+            self._get_cumulative(name, positions)
+            - self._get_cumulative(name, positions - window)
+        )
+        complete = positions - window + 1 >= 0
+        return [
+            float(TypedDataset.from_minor_units(total, self.money_scale))
+            if is_complete else None
+            for total, is_complete in zip(totals, complete)
+        ]
+
+    def get_window_averages(
+        self, name: str, months: pd.PeriodIndex, window: int
+    ) -> List[Optional[float]]:
+        """Get the trailing moving averages of a metric per month"""
+        return self._to_averages(
+            self.get_window_totals(name, months, window), window
+        )
+
+    @staticmethod
+    def _to_averages(
+        totals: List[Optional[float]], window: int
+    ) -> List[Optional[float]]:
+        return [
+            round(total / window, 2) if total is not None else None
+            for total in totals
+        ]
+
+    def get_window_metrics(
+        self, months: pd.PeriodIndex, window: int
+    ) -> Dict[str, List[Optional[float]]]:
+        """
+        Get the trailing totals and moving averages of every metric
+        Returns:
+            Dict of <metric> and <metric>_average to their lists
+        """
+        result = {}
+        for name in self.metrics:
+            totals = self.get_window_totals(name, months, window)
+            result[name] = totals
+            result[f"{name}_average"] = self._to_averages(totals, window)
+        return result
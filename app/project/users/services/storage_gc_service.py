@@ -0,0 +1,155 @@
+"""
+Service removing user data objects that nothing references anymore.
+"""
+import datetime
+import logging
+from typing import Dict, Iterator, List, Optional, Set
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from config.instances.storage import STORAGE
+from users.models.user_data_file import UserDataFile
+from users.models.user_data_upload_job import UserDataUploadJob
+
+logger = logging.getLogger(__name__)
+
+
+class UserDataStorageGCService:
+    """
+    Garbage collector of the user data folders in object storage. Uploads
+    and their derived artifacts (columnar snapshots) stay in storage after they are
+    replaced or their user is deleted; this service deletes the dataset
+    versions superseded longer than the retention period, then finds the
+    objects no UserDataFile or running upload job references and
+    bulk-deletes them.
+    """
+
+    BUCKET_NAME = "user-data"
+    # Folders of user_<id>/ managed by the upload pipeline; the rest of the
+    # bucket holds media files and is never touched
+    DATA_FOLDERS = ("data_uploads", "upload_jobs")
+
+    def __init__(self):
+        self.storage = STORAGE
+        self.batch_size = settings.USER_DATA_GC_BATCH_SIZE
+        self.grace_period = datetime.timedelta(
+            seconds=settings.USER_DATA_GC_GRACE_SECONDS
+        )
+        self.version_retention = datetime.timedelta(
+            seconds=settings.USER_DATA_VERSION_RETENTION_SECONDS
+        )
+
+    def collect(self, dry_run: bool = False) -> Dict:
+        """
+        Delete expired dataset versions and unreferenced objects of the
+        user data folders
+        Args:
+            dry_run: Only count the versions and objects that would be deleted
+        Returns:
+            Stats with expired_versions, scanned, deleted and failed object
+            counts and reclaimed_bytes
+        """
+        expired_versions = UserDataFile.objects.filter(
+            is_active=False,
+            superseded_at__lt=timezone.now() - self.version_retention,
+        )
+        expired_count = expired_versions.count()
+        if not dry_run:
+            # Ledger rows of the versions are deleted with them
+            expired_versions.delete()
+
+        referenced = self._get_referenced_object_names(
+            exclude_versions=expired_versions if dry_run else None
+        )
+        # Objects of uploads still in flight are not referenced yet
+        cutoff = timezone.now() - self.grace_period
+
+        stats = {
+            "expired_versions": expired_count,
+            "scanned": 0,
+            "deleted": 0,
+            "failed": 0,
+            "reclaimed_bytes": 0,
+        }
+        batch = []
+        for obj in self._iter_data_objects():
+            stats["scanned"] += 1
+            if obj.object_name in referenced or obj.last_modified > cutoff:
+                continue
+
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self._delete_batch(batch, stats, dry_run)
+                batch = []
+
+        if batch:
+            self._delete_batch(batch, stats, dry_run)
+
+        logger.info(
+            f"User data GC{' (dry run)' if dry_run else ''}: "
+            f"expired {expired_count} dataset versions, "
+            f"scanned {stats['scanned']} objects, deleted {stats['deleted']}, "
+            f"failed {stats['failed']}, "
+            f"reclaimed {stats['reclaimed_bytes']} bytes"
+        )
+        return stats
+
+    @staticmethod
+    def _get_referenced_object_names(
+        exclude_versions: Optional[QuerySet] = None,
+    ) -> Set[str]:
+        """Objects of stored files and of staged files of running jobs"""
+        user_files = UserDataFile.objects.all()
+        if exclude_versions is not None:
+            user_files = user_files.exclude(
+                id__in=exclude_versions.values("id")
+            )
+
+        referenced = set()
+        for file_path, columnar_file_path in user_files.values_list(
+            "file_path", "columnar_file_path"
+        ):
+            referenced.add(file_path)
+            if columnar_file_path:
+                referenced.add(columnar_file_path)
+
+        running_jobs = UserDataUploadJob.objects.filter(
+            status__in=[
+                UserDataUploadJob.Status.PENDING,
+                UserDataUploadJob.Status.PROCESSING,
+            ]
+        ).values_list("files", flat=True)
+        for files in running_jobs:
+            referenced.update(staged_file["staged_path"] for staged_file in files)
+
+        return referenced
+
+    def _iter_data_objects(self) -> Iterator:
+        """List the objects of every user's data folders"""
+        user_folders = self.storage.list_objects(
+            self.BUCKET_NAME, prefix="user_"
+        )
+        for user_folder in user_folders:
+            if not user_folder.is_dir:
+                continue
+            for folder in self.DATA_FOLDERS:
+                yield from self.storage.list_objects(
+                    self.BUCKET_NAME,
+                    prefix=f"{user_folder.object_name}{folder}/",
+                    recursive=True,
+                )
+
+    def _delete_batch(self, batch: List, stats: Dict, dry_run: bool):
+        sizes = {obj.object_name: obj.size or 0 for obj in batch}
+        failed = (
+            [] if dry_run
+            else self.storage.delete_files(self.BUCKET_NAME, list(sizes))
+        )
+        for object_name in failed:
+            sizes.pop(object_name, None)
+
+        stats["deleted"] += len(sizes)
+        stats["failed"] += len(failed)
+        stats["reclaimed_bytes"] += sum(sizes.values())
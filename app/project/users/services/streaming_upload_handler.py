@@ -0,0 +1,227 @@
+"""
+Upload handlers streaming data files from the request into object
+storage and hashing them as they are received.
+"""
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from config.instances.storage import STORAGE
+from config.utils.file_validators import (
+    FileFormatValidator,
+    StreamingCSVValidator,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StagedUploadedFile(UploadedFile):
+    """File streamed into the staging area of an upload job"""
+
+    def __init__(
+        self,
+        name: str,
+        content_type: str,
+        size: int,
+        staged_path: str,
+        sha256: str,
+        validator: StreamingCSVValidator,
+    ):
+        super().__init__(
+            file=None, name=name, content_type=content_type, size=size
+        )
+        self.staged_path = staged_path
+        self.sha256 = sha256
+        self.columns = validator.columns
+        self.template_type = validator.template_type
+        self.row_report = validator.report
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """
+    Computes the SHA-256 of every uploaded file while it is received and
+    passes the data on to the next handler. Digests are collected in
+    `hashes` by file name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hashes: Dict[str, str] = {}
+        self._hash = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.hashes[self.file_name] = self._hash.hexdigest()
+        return None
+
+
+class MinIOMultipartUploadHandler(FileUploadHandler):
+    """
+    Pipes every uploaded file straight into a storage multipart upload with
+    a fixed part size, hashing and validating it on the way. Memory use
+    is bounded by one part per request whatever the size of the file.
+
+    Files that fail validation are not stored; their errors are collected
+    in `errors` by file name.
+    """
+
+    BUCKET_NAME = "user-data"
+    FILE_FIELDS = ("pnl_file", "transactions_file", "invoices_file")
+
+    def __init__(self, request, staging_folder: str):
+        super().__init__(request)
+        self.staging_folder = staging_folder
+        self.part_size = settings.USER_DATA_UPLOAD_PART_SIZE
+        self.max_file_size = settings.USER_DATA_STREAMING_UPLOAD_MAX_BYTES
+        self.storage = STORAGE
+
+        self.errors: Dict[str, str] = {}
+        self.staged_paths: List[str] = []
+        self._reset()
+
+    def _reset(self):
+        self._upload_id: Optional[str] = None
+        self._object_name: Optional[str] = None
+        self._parts = []
+        self._buffer = bytearray()
+        self._hash = None
+        self._validator: Optional[StreamingCSVValidator] = None
+        self._skip = False
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self._reset()
+
+        if field_name not in self.FILE_FIELDS:
+            self._skip = True
+            return
+        if not file_name.lower().endswith(".csv"):
+            self._reject(
+                "Потоковая загрузка поддерживает только CSV файлы. "
+                "Excel файлы загружайте через обычную загрузку."
+            )
+            return
+
+        self._object_name = f"{self.staging_folder}/{file_name}"
+        self._upload_id = self.storage.create_multipart_upload(
+            self.BUCKET_NAME, self._object_name, self.content_type
+        )
+        self._hash = hashlib.sha256()
+        self._validator = StreamingCSVValidator(file_name)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._skip:
+            return None
+
+        if start + len(raw_data) > self.max_file_size:
+            self._reject(
+                f"Файл превышает допустимый размер "
+                f"{self.max_file_size // (1024 * 1024)} МБ"
+            )
+            return None
+
+        self._hash.update(raw_data)
+        self._validator.feed(raw_data)
+
+        # Custom P&L headers are checked against metadata by the view
+        if (self._validator.columns is not None
+                and self._validator.template_type is None
+                and self.field_name != "pnl_file"):
+            self._reject(
+                "Неизвестный формат файла. Файл не соответствует "
+                "ни одному из ожидаемых шаблонов."
+            )
+            return None
+
+        # Invalid rows are still counted, but nothing more is stored
+        if self._validator.report["error_count"] and self._upload_id:
+            self._abort_upload()
+        if self._upload_id:
+            self._buffer.extend(raw_data)
+            while len(self._buffer) >= self.part_size:
+                self._upload_part(bytes(self._buffer[:self.part_size]))
+                del self._buffer[:self.part_size]
+
+        return None
+
+    def file_complete(self, file_size):
+        if self._skip:
+            return None
+
+        report = self._validator.close()
+        if self._validator.columns is None:
+            self._reject("Не удалось прочитать файл. Проверьте формат файла.")
+            return None
+        if report["error_count"]:
+            self._abort_upload()
+            self.errors[self.file_name] = (
+                FileFormatValidator._build_row_errors_response(report)
+            )
+            return None
+
+        # The last part may be smaller than the part size
+        self._upload_part(bytes(self._buffer))
+        self._buffer = bytearray()
+        self.storage.complete_multipart_upload(
+            self.BUCKET_NAME, self._object_name, self._upload_id, self._parts
+        )
+        self.staged_paths.append(self._object_name)
+        logger.info(
+            f"Streamed {self.file_name} ({file_size} bytes, "
+            f"{len(self._parts)} parts) to {self._object_name}"
+        )
+
+        return StagedUploadedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            staged_path=self._object_name,
+            sha256=self._hash.hexdigest(),
+            validator=self._validator,
+        )
+
+    def upload_interrupted(self):
+        # The client went away in the middle of a file
+        if self._upload_id:
+            self._abort_upload()
+
+    def discard(self):
+        """Drop the current multipart upload and every staged file"""
+        if self._upload_id:
+            self._abort_upload()
+        if self.staged_paths:
+            self.storage.delete_files(self.BUCKET_NAME, self.staged_paths)
+        self.staged_paths = []
+
+    def _upload_part(self, data: bytes):
+        part_number = len(self._parts) + 1
+        etag = self.storage.upload_part(
+            self.BUCKET_NAME, self._object_name, self._upload_id,
+            part_number, data
+        )
+        self._parts.append((part_number, etag))
+
+    def _abort_upload(self):
+        self.storage.abort_multipart_upload(
+            self.BUCKET_NAME, self._object_name, self._upload_id
+        )
+        self._upload_id = None
+        self._buffer = bytearray()
+
+    def _reject(self, error: str):
+        """Skip the rest of the current file and record why"""
+        if self._upload_id:
+            self._abort_upload()
+        self.errors[self.file_name] = error
+        self._skip = True
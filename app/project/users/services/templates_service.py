@@ -8,7 +8,7 @@ from urllib.parse import urljoin
 from django.conf import settings
 from django.core.cache import cache
 
-from config.instances.minio_client import MINIO_CLIENT
+from config.instances.storage import STORAGE
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +30,8 @@ class UserTemplatesService:
     }
 
     def __init__(self):
-        """Initialize service with MinIO client."""
-        self.minio_client = MINIO_CLIENT
+        """Initialize service with storage client."""
+        self.storage = STORAGE
 
     def get_template_urls(self) -> Dict[str, str]:
         """
@@ -140,12 +140,9 @@ class UserTemplatesService:
             bool: True if file exists, False otherwise
         """
         try:
-            # Try to get object info to check existence
-            bucket = self.TEMPLATES_BUCKET
-            self.minio_client.client.stat_object(bucket, filename)
-            return True
+            return self.storage.object_exists(self.TEMPLATES_BUCKET, filename)
         except Exception:
-            # File doesn't exist or other error
+            # Storage unavailable or other error
             return False
 
     def refresh_cache(self) -> Dict[str, str]:
@@ -0,0 +1,99 @@
+"""
+Date-sorted view of a dataset for fast date range queries.
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+
+class TimeIndexedDataset:
+    """
+    DataFrame whose date column is parsed and sorted once, so inclusive
+    [start_date, end_date] queries become two binary searches and a
+    positional slice instead of a copy and two boolean masks.
+
+    Slices share memory with the dataset and must not be modified in place.
+    Rows with unparseable dates never match a range and are dropped.
+    Parsed dates that are already sorted, as in the datasets of
+    UserDatasetLoader, are indexed without copying the rows.
+    """
+
+    def __init__(self, df: pd.DataFrame, date_column: Optional[str]):
+        self.date_column = date_column
+
+        if date_column is None:
+            # Undated data matches every range
+            self.frame = df
+            self._index = None
+            return
+
+        dates = df[date_column]
+        dated_rows = int(dates.notna().sum())
+        if self._is_sorted(dates, dated_rows):
+            self.frame = df.iloc[:dated_rows]
+        else:
+            dates = pd.to_datetime(dates, errors="coerce")
+            frame = df.assign(**{date_column: dates})[dates.notna()]
+            self.frame = frame.sort_values(date_column, kind="mergesort")
+        self._index = pd.DatetimeIndex(self.frame[date_column])
+
+    @staticmethod
+    def _is_sorted(dates: pd.Series, dated_rows: int) -> bool:
+        """Whether parsed dates are ascending with the missing ones last"""
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            return False
+        dated = dates.iloc[:dated_rows]
+        return bool(dated.notna().all() and dated.is_monotonic_increasing)
+
+    @classmethod
+    def from_candidates(
+        cls, df: pd.DataFrame, date_columns: List[str]
+    ) -> "TimeIndexedDataset":
+        """Index by the first of the candidate date columns present in df"""
+        date_column = next(
+            (col for col in date_columns if col in df.columns), None
+        )
+        return cls(df, date_column)
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def slice(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> pd.DataFrame:
+        """
+        Get the rows dated within [start_date, end_date]
+        Args:
+            start_date: Inclusive lower bound, None for unbounded
+            end_date: Inclusive upper bound, None for unbounded
+        Returns:
+            View of the matching rows
+        """
+        if self._index is None:
+            return self.frame
+
+        lower, upper = self.get_range_bounds(start_date, end_date)
+        return self.frame.iloc[lower:upper]
+
+    def get_range_bounds(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Tuple[int, int]:
+        """
+        Get the positions of the rows dated within [start_date, end_date]
+        Returns:
+            (lower, upper) positions, the rows are frame.iloc[lower:upper]
+        """
+        if self._index is None:
+            return 0, len(self.frame)
+
+        lower = (
+            self._index.searchsorted(pd.Timestamp(start_date), side="left")
+            if start_date is not None else 0
+        )
+        upper = (
+            self._index.searchsorted(pd.Timestamp(end_date), side="right")
+            if end_date is not None else len(self._index)
+        )
+        return int(lower), int(upper)
@@ -0,0 +1,69 @@
+"""
+Period grouping of datasets for metric time series.
+"""
+from datetime import date
+from typing import List, Optional
+
+import pandas as pd
+
+from users.services.typed_dataset import MONEY_SCALE, TypedDataset
+
+# Pandas period frequency of each series granularity
+GRANULARITY_FREQUENCIES = {"month": "M", "quarter": "Q", "year": "Y"}
+
+
+def get_series_periods(
+    start_date: date, end_date: date, granularity: str
+) -> pd.PeriodIndex:
+    """
+    Get the periods of a time series horizon
+    Args:
+        start_date: First date of the horizon
+        end_date: Last date of the horizon
+        granularity: month, quarter or year
+    Returns:
+        Every period overlapping [start_date, end_date], oldest first
+    """
+    return pd.period_range(
+        start=start_date, end=end_date,
+        freq=GRANULARITY_FREQUENCIES[granularity],
+    )
+
+
+def get_period_labels(periods: pd.PeriodIndex) -> List[str]:
+    """Label each period by the ISO date of its first day"""
+    return [period.start_time.date().isoformat() for period in periods]
+
+
+def sum_by_period(
+    rows: pd.DataFrame,
+    date_column: Optional[str],
+    values: pd.DataFrame,
+    periods: pd.PeriodIndex,
+) -> pd.DataFrame:
+    """
+    Sum values per period with one groupby over the dated rows
+    Args:
+        rows: Rows of the horizon, e.g. a TimeIndexedDataset slice
+        date_column: Parsed date column of rows, None if undated
+        values: Numeric columns, positionally aligned with rows
+        periods: Periods of the series
+    Returns:
+        DataFrame indexed by periods, periods without rows as 0
+    """
+    if date_column is None:
+        # Undated rows cannot be placed in a period
+        return pd.DataFrame(0, index=periods, columns=values.columns)
+
+    labels = pd.DatetimeIndex(rows[date_column]).to_period(periods.freq)
+    return values.groupby(labels).sum().reindex(periods, fill_value=0)
+
+
+def to_money_series(
+    minor_units: pd.Series, scale: int = MONEY_SCALE
+) -> List[float]:
+    """Convert period sums of minor unit amounts to major units"""
+    return [
+        float(TypedDataset.from_minor_units(amount, scale))
+        for amount in minor_units
+    ]
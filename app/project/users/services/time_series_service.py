@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from users.services.cash_analysis_service import UserCashAnalysisService
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import (
+    UserInvoicesAnalysisService,
+)
+from users.services.time_series import get_period_labels, get_series_periods
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+class UserTimeSeriesService:
+    """
+    Service for metric time series of the P&L, invoices and transactions
+    data. Each dataset is loaded once through the shared dataset cache and
+    grouped by period in one pass, and every series is a compact list
+    aligned with the same periods.
+    """
+
+    # Series source to the template type of its dataset
+    SOURCES = {
+        "pnl": "pnl_template",
+        "invoices": "invoices_template",
+        "cash": "transactions_template",
+    }
+    CACHE_TIMEOUT = 3600
+
+    def __init__(self, user):
+        self.user = user
+        self.dataset_loader = UserDatasetLoader(user)
+
+    def get_time_series(
+        self,
+        start_date: date,
+        end_date: date,
+        granularity: str = "month",
+        sources: Optional[List[str]] = None,
+        rolling_windows: Optional[List[int]] = None,
+    ) -> Dict:
+        """
+        Get metric series for a horizon
+        Args:
+            start_date: First date of the horizon
+            end_date: Last date of the horizon
+            granularity: month, quarter or year
+            sources: Series sources to include (pnl, invoices, cash),
+                all by default
+            rolling_windows: Trailing window lengths in months for the
+                P&L rolling metrics, monthly series only
+        Returns:
+            Dict with the period labels and the series of each source,
+            None for sources without data
+        """
+        sources = [
+            source for source in self.SOURCES
+            if sources is None or source in sources
+        ]
+
+        # Keyed by dataset versions, a new upload never hits stale results,
+        # and by money scale, which a currency change changes
+        versions = "_".join(
+            f"{source}{self.dataset_loader.get_active_version(template_type)}"
+            for source, template_type in self.SOURCES.items()
+            if source in sources
+        )
+        windows = "_".join(str(window) for window in rolling_windows or [])
+        cache_key = (
+            f"time_series_{self.user.id}_{versions}_"
+            f"s{self.dataset_loader.money_scale}_{granularity}_"
+            f"w{windows}_{start_date}_{end_date}"
+        )
+        cached_result = cache.get(cache_key)
+
+        if cached_result:
+            logger.info(f"Using cached time series for user {self.user.id}")
+            return cached_result
+
+        periods = get_series_periods(start_date, end_date, granularity)
+        result = {
+            "granularity": granularity,
+            "periods": get_period_labels(periods),
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+            },
+        }
+
+        for source in sources:
+            try:
+                result[source] = self._get_source_series(
+                    source, start_date, end_date, periods
+                )
+            except ValueError as e:
+                logger.info(
+                    f"No {source} series for user {self.user.id}: {str(e)}"
+                )
+                result[source] = None
+
+        if all(result[source] is None for source in sources):
+            raise ValueError("No data found for user")
+
+        if rolling_windows and result.get("pnl") is not None:
+            # Windows reach back before the horizon into the history
+            result["pnl"]["rolling"] = UserPNLAnalysisService(
+                self.user
+            ).get_rolling_metrics(periods, rolling_windows)
+
+        cache.set(cache_key, result, self.CACHE_TIMEOUT)
+        logger.info(f"Calculated and cached time series for user {self.user.id}")
+
+        return result
+
+    def _get_source_series(
+        self, source: str, start_date: date, end_date: date,
+        periods: pd.PeriodIndex,
+    ) -> Dict:
+        """Get the series of one source"""
+        if source == "pnl":
+            return UserPNLAnalysisService(self.user).get_pnl_series(
+                start_date, end_date, periods
+            )
+        if source == "invoices":
+            return UserInvoicesAnalysisService(self.user).get_invoices_series(
+                start_date, end_date, periods
+            )
+        return UserCashAnalysisService(self.user).get_cash_series(
+            start_date, end_date, periods
+        )
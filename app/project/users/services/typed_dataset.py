@@ -0,0 +1,253 @@
+"""
+Compact typed representation of loaded user datasets.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from users.models.user_data_file import UserDataFile
+
+# Minor units (cents) per major unit of money amounts, for currencies
+# with two decimal places
+MONEY_SCALE = 100
+
+
+class TypedDataset:
+    """
+    Normalizes loaded datasets once, before they are cached: enum-like
+    text columns become categoricals of lowercase values, money columns
+    nullable int64 minor units and date columns datetime64. Status and
+    type masks then compare category codes, and a cached dataset takes a
+    fraction of the memory of its object columns.
+
+    Money is summed and compared as integers of the minor unit of the
+    user's currency, and converted to Decimal only to be serialized.
+    The helpers below also accept frames that were not normalized, as
+    read from an upload.
+    """
+
+    ENUM = "enum"
+    MONEY = "money"
+    DATE = "date"
+
+    # Issue date columns of invoices; the first one present in a file
+    # dates its invoices
+    INVOICE_DATE_COLUMNS = ["Date", "Invoice_Date", "Created_Date", "Issue_Date"]
+
+    # Column kinds per template; P&L value columns are configured per
+    # file and marked as money when the file is loaded
+    TEMPLATE_COLUMNS: Dict[str, Dict[str, str]] = {
+        UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE: {
+            "Date": DATE,
+            "Type": ENUM,
+            "Category": ENUM,
+            "Amount": MONEY,
+        },
+        UserDataFile.TemplateType.INVOICES_TEMPLATE: {
+            **dict.fromkeys(INVOICE_DATE_COLUMNS, DATE),
+            "Due_Date": DATE,
+            "Date_Issued": DATE,
+            "Date_Due": DATE,
+            "Date_Paid": DATE,
+            "Status": ENUM,
+            "Amount": MONEY,
+        },
+    }
+
+    @classmethod
+    def get_column_kinds(
+        cls, template_type: str, date_columns: Iterable[str] = ()
+    ) -> Dict[str, str]:
+        """
+        Get the kind of the known columns of a template
+        Args:
+            template_type: Template type of the dataset
+            date_columns: File specific date columns, e.g. the P&L
+                period column
+        Returns:
+            Column name to ENUM, MONEY or DATE
+        """
+        return {
+            **cls.TEMPLATE_COLUMNS.get(template_type, {}),
+            **{column: cls.DATE for column in date_columns},
+        }
+
+    @staticmethod
+    def get_money_scale(currency: Optional[str]) -> int:
+        """Minor units per major unit of a currency, e.g. 100 for USD"""
+        decimal_places = settings.CURRENCY_DECIMAL_PLACES.get(
+            currency or settings.DEFAULT_CURRENCY, 2
+        )
+        return 10 ** decimal_places
+
+    @classmethod
+    def get_user_money_scale(cls, user) -> int:
+        """Money scale of the currency in the user's profile"""
+        profile = getattr(user, "profile", None)
+        return cls.get_money_scale(getattr(profile, "currency", None))
+
+    @classmethod
+    def normalize(
+        cls,
+        df: pd.DataFrame,
+        column_kinds: Dict[str, str],
+        date_formats: Optional[Dict[str, str]] = None,
+        money_scale: int = MONEY_SCALE,
+    ) -> pd.DataFrame:
+        """
+        Convert the known columns of a dataset to compact types
+        Args:
+            df: Dataset as read from storage
+            column_kinds: Column name to ENUM, MONEY or DATE
+            date_formats: strftime format of date columns, parsed
+                without inference; other date columns are inferred
+            money_scale: Minor units per major unit of money columns
+        Returns:
+            New DataFrame, other columns are shared with df
+        """
+        date_formats = date_formats or {}
+
+        converters = {}
+        for column in df.columns:
+            kind = column_kinds.get(column)
+            if kind == cls.ENUM:
+                converters[column] = cls.to_categorical(df[column])
+            elif kind == cls.MONEY:
+                converters[column] = cls.to_minor_units(
+                    df[column], money_scale
+                )
+            elif kind == cls.DATE:
+                converters[column] = pd.to_datetime(
+                    df[column], format=date_formats.get(column),
+                    errors="coerce",
+                )
+        return df.assign(**converters) if converters else df
+
+    @staticmethod
+    def to_categorical(values: pd.Series) -> pd.Series:
+        """Categorical of the lowercase values, blanks stay NaN"""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values
+        text = values.astype(object)
+        text = text.where(text.isna(), text.astype(str))
+        return text.str.lower().astype("category")
+
+    @staticmethod
+    def to_minor_units(
+        values: pd.Series, scale: int = MONEY_SCALE
+    ) -> pd.Series:
+        """Nullable int64 minor units, unparseable amounts become NA"""
+        if isinstance(values.dtype, pd.Int64Dtype):
+            return values
+        amounts = pd.to_numeric(values, errors="coerce")
+        return (amounts * scale).round().astype("Int64")
+
+    @staticmethod
+    def is_minor_units(values: pd.Series) -> bool:
+        return isinstance(values.dtype, pd.Int64Dtype)
+
+    @classmethod
+    def sum_money(
+        cls, values: pd.Series, scale: int = MONEY_SCALE
+    ) -> Decimal:
+        """Sum an amount column, ignoring missing and unparseable values"""
+        return cls.from_minor_units(
+            int(cls.to_minor_units(values, scale).sum()), scale
+        )
+
+    @staticmethod
+    def from_minor_units(amount: int, scale: int = MONEY_SCALE) -> Decimal:
+        """Exact Decimal of an integer amount of minor units"""
+        return Decimal(int(amount)) / scale
+
+    @staticmethod
+    def decimal_to_minor_units(
+        amount: Optional[Decimal], scale: int = MONEY_SCALE
+    ) -> int:
+        """Integer minor units of a Decimal amount, e.g. a SQL sum"""
+        if amount is None:
+            return 0
+        return int((amount * scale).to_integral_value())
+
+    @classmethod
+    def to_major_units(
+        cls, df: pd.DataFrame, scale: int = MONEY_SCALE,
+        integer_columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Convert the minor unit columns of rows to major units
+        Args:
+            df: Rows with Int64 minor unit columns
+            scale: Minor units per major unit
+            integer_columns: Columns uploaded as integers, None to treat
+                every column of whole amounts without missing values as
+                integers like read_csv infers them
+        Returns:
+            DataFrame with int64 integer columns and float64 other amounts
+        """
+        money_columns = [col for col in df.columns if cls.is_minor_units(df[col])]
+        if not money_columns:
+            return df
+        converted = {}
+        for col in money_columns:
+            values = df[col]
+            is_integer = cls._is_whole(values, scale) and (
+                integer_columns is None or col in integer_columns
+            )
+            if is_integer:
+                converted[col] = values.to_numpy(dtype="int64") // scale
+            else:
+                converted[col] = (
+                    values.to_numpy(dtype="float64", na_value=np.nan) / scale
+                )
+        return df.assign(**converted)
+
+    @staticmethod
+    def _is_whole(values: pd.Series, scale: int) -> bool:
+        """Every amount is a whole number of major units"""
+        return not values.isna().any() and bool((values % scale == 0).all())
+
+    @staticmethod
+    def build_change_data(
+        current: Union[int, Decimal], previous: Union[int, Decimal],
+        scale: int = 1,
+    ) -> Dict:
+        """
+        Build the change between the totals of two periods
+        Args:
+            current: Total of the period, in minor units for money
+            previous: Total of the comparison period
+            scale: Minor units per major unit of money, 1 for counts
+        Returns:
+            Dict with the change in major units and percentage_change
+        """
+        change = current - previous
+        if previous > 0:
+            percentage_change = float(Decimal(change) * 100 / Decimal(previous))
+        elif current > 0:
+            percentage_change = 100.0
+        else:
+            percentage_change = 0.0
+
+        return {
+            "change": float(Decimal(change) / scale),
+            "percentage_change": round(percentage_change, 2),
+        }
+
+    @staticmethod
+    def match_values(values: pd.Series, allowed: List[str]) -> pd.Series:
+        """
+        Mask of the rows whose value, lowercased, is one of allowed
+        Args:
+            values: Enum-like column
+            allowed: Lowercase values to match
+        Returns:
+            Boolean Series aligned with values
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Compares integer codes against the matching categories
+            return values.isin(allowed)
+        return values.str.lower().isin(allowed)
@@ -0,0 +1,28 @@
+import logging
+
+from config.celery import celery
+from users.models.user_data_upload_job import UserDataUploadJob
+from users.services.data_upload_job_service import UserDataUploadJobService
+from users.services.storage_gc_service import UserDataStorageGCService
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(ignore_result=True)
+def process_data_upload_job(job_id: str) -> None:
+    job = (
+        UserDataUploadJob.objects.select_related("user")
+        .filter(id=job_id, status=UserDataUploadJob.Status.PENDING)
+        .first()
+    )
+    if job is None:
+        logger.warning(f"Pending upload job {job_id} not found")
+        return
+
+    UserDataUploadJobService(job.user).process_job(job)
+
+
+@celery.task
+def collect_user_data_garbage() -> dict:
+    """Delete expired dataset versions and unreferenced objects, return stats"""
+    return UserDataStorageGCService().collect()
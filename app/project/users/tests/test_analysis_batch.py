@@ -0,0 +1,229 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models.user_data_file import UserDataFile
+from users.serializers.analysis_batch_serializers import (
+    AnalysisBatchRequestSerializer,
+)
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import UserInvoicesAnalysisService
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+class AnalysisBatchAPITest(TestCase):
+    """Test suite for the batch analysis endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='batch@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        self.pnl_data = pd.read_csv(test_data_path)
+        self.invoices_data = pd.DataFrame([
+            {'Date': '2024-01-15', 'Amount': 1000.0, 'Status': 'paid'},
+            {'Date': '2024-01-20', 'Amount': 1500.0, 'Status': 'overdue'},
+            {'Date': '2024-02-01', 'Amount': 2000.0, 'Status': 'paid'},
+            {'Date': '2024-02-10', 'Amount': 800.0, 'Status': 'pending'},
+        ])
+        self.ranges = [
+            {'start_date': '2024-01-01', 'end_date': '2024-01-31'},
+            {'start_date': '2024-02-01', 'end_date': '2024-02-29'},
+        ]
+
+    def _create_pnl_file(self):
+        meta_data = {
+            'date_column': 'Month',
+            'revenue_columns': ['Revenue'],
+            'expense_columns': EXPENSE_COLUMNS,
+        }
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename='pnl.csv',
+            stored_filename='pnl.csv',
+            file_path=f'user_{self.user.id}/data_uploads/pnl.csv',
+            file_size=100,
+            meta_data={
+                **meta_data,
+                # Month rows are dated on the first, as the manifest records
+                UserDataFile.SCHEMA_META_KEY: DatasetSchemaManifest.build(
+                    self.pnl_data, UserDataFile.TemplateType.PNL_TEMPLATE,
+                    meta_data,
+                ),
+            },
+            monthly_rollup=PnLMonthlyRollup.build(
+                self.pnl_data, 'Month'
+            ).to_dict(),
+        )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_pnl_batch_matches_single_range(self, mock_get_df):
+        """Batch metrics equal the single range metrics of each range"""
+        self._create_pnl_file()
+
+        response = self.client.post(
+            reverse('pnl-analysis-batch'), {'ranges': self.ranges},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The rollup answers every range without reading the file
+        mock_get_df.assert_not_called()
+
+        mock_get_df.return_value = self.pnl_data
+        results = response.json()['results']
+        self.assertEqual(
+            list(results), ['2024-01-01_2024-01-31', '2024-02-01_2024-02-29']
+        )
+        for date_range in self.ranges:
+            expected = UserPNLAnalysisService(self.user).get_pnl_metrics(
+                date.fromisoformat(date_range['start_date']),
+                date.fromisoformat(date_range['end_date']),
+            )
+            result = results[
+                f"{date_range['start_date']}_{date_range['end_date']}"
+            ]
+            self.assertEqual(result['total_revenue'], expected['total_revenue'])
+            self.assertEqual(result['net_profit'], expected['net_profit'])
+            self.assertEqual(result['month_change'], expected['month_change'])
+
+    @patch.object(UserInvoicesAnalysisService, '_get_dataframe_from_file')
+    def test_invoices_batch_matches_single_range(self, mock_get_df):
+        mock_get_df.return_value = self.invoices_data
+
+        response = self.client.post(
+            reverse('invoices-analysis-batch'), {'ranges': self.ranges},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        expected = UserInvoicesAnalysisService(self.user).get_invoices_analysis(
+            date(2024, 2, 1), date(2024, 2, 29)
+        )
+        result = results['2024-02-01_2024-02-29']
+        self.assertEqual(result['paid_invoices'], expected['paid_invoices'])
+        self.assertEqual(result['month_change'], expected['month_change'])
+
+    def test_expense_breakdown_batch_without_data(self):
+        response = self.client.post(
+            reverse('expense-breakdown-batch'), {'last_months': 3},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'results': {}})
+
+    def test_expense_breakdown_batch_from_rollup(self):
+        self._create_pnl_file()
+
+        response = self.client.post(
+            reverse('expense-breakdown-batch'),
+            {'ranges': self.ranges + [
+                {'start_date': '2030-01-01', 'end_date': '2030-01-31'}
+            ]},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        # January 2024 rent of the mock data
+        self.assertEqual(
+            results['2024-01-01_2024-01-31']['Rent']['total_amount'], 2200.0
+        )
+        self.assertIsNone(results['2030-01-01_2030-01-31'])
+
+    def test_ranges_and_last_months_are_exclusive(self):
+        response = self.client.post(
+            reverse('pnl-analysis-batch'),
+            {'ranges': self.ranges, 'last_months': 2},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_too_many_ranges(self):
+        ranges = self.ranges * AnalysisBatchRequestSerializer.MAX_RANGES
+
+        response = self.client.post(
+            reverse('pnl-analysis-batch'), {'ranges': ranges}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_last_months(self):
+        serializer = AnalysisBatchRequestSerializer(data={'last_months': 3})
+
+        self.assertTrue(serializer.is_valid())
+        ranges = serializer.validated_data['_ranges']
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[-1][0], date.today().replace(day=1))
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_batch_ranges_within_months_sum_rows(self, mock_get_df):
+        """Ranges that are not month-aligned match their row sums"""
+        weeks = pd.date_range('2023-12-04', periods=12, freq='7D')
+        weekly_data = pd.DataFrame({
+            'Month': weeks.strftime('%Y-%m-%d'),
+            'Revenue': [1000.0 + week for week in range(12)],
+            **{column: [100.0] * 12 for column in EXPENSE_COLUMNS},
+        })
+        self.pnl_data = weekly_data
+        self._create_pnl_file()
+        mock_get_df.return_value = weekly_data
+        ranges = [
+            {'start_date': '2024-01-10', 'end_date': '2024-01-24'},
+            {'start_date': '2024-02-03', 'end_date': '2024-02-17'},
+        ]
+
+        pnl_response = self.client.post(
+            reverse('pnl-analysis-batch'), {'ranges': ranges}, format='json'
+        )
+        breakdown_response = self.client.post(
+            reverse('expense-breakdown-batch'), {'ranges': ranges},
+            format='json',
+        )
+
+        self.assertEqual(pnl_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(breakdown_response.status_code, status.HTTP_200_OK)
+        for date_range in ranges:
+            key = f"{date_range['start_date']}_{date_range['end_date']}"
+            start_date = date.fromisoformat(date_range['start_date'])
+            end_date = date.fromisoformat(date_range['end_date'])
+            rows = weekly_data[
+                (weeks >= pd.Timestamp(start_date))
+                & (weeks <= pd.Timestamp(end_date))
+            ]
+            result = pnl_response.json()['results'][key]
+            expected = UserPNLAnalysisService(self.user).get_pnl_metrics(
+                start_date, end_date
+            )
+            self.assertEqual(result['total_revenue'], rows['Revenue'].sum())
+            self.assertEqual(result['total_revenue'], expected['total_revenue'])
+            self.assertEqual(result['month_change'], expected['month_change'])
+            self.assertEqual(
+                breakdown_response.json()['results'][key]['Rent']['total_amount'],
+                rows['Rent'].sum(),
+            )
@@ -0,0 +1,262 @@
+import os
+from unittest.mock import patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.financial_analysis_service import UserPNLAnalysisService
+
+User = get_user_model()
+
+PNL_META_DATA = {
+    'date_column': 'Month',
+    'revenue_columns': ['Revenue'],
+    'expense_columns': ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses'],
+}
+
+# Responses recorded from the dataframe services before the typed dataset,
+# for the fixtures below
+BASELINE_PNL_ANALYSIS = {
+    'pnl_data': [
+        {'Month': '2024-01-01T00:00:00', 'Revenue': 38000, 'COGS': 13000,
+         'Payroll': 4500, 'Rent': 2200, 'Marketing': 3800,
+         'Other_Expenses': 1600, 'Net_Profit': 12900},
+        {'Month': '2024-02-01T00:00:00', 'Revenue': 42000, 'COGS': 14500,
+         'Payroll': 4500, 'Rent': 2200, 'Marketing': 4200,
+         'Other_Expenses': 1700, 'Net_Profit': 15900},
+        {'Month': '2024-03-01T00:00:00', 'Revenue': 45000, 'COGS': 15500,
+         'Payroll': 4500, 'Rent': 2200, 'Marketing': 4500,
+         'Other_Expenses': 1800, 'Net_Profit': 16500},
+    ],
+    'total_revenue': 125000.0,
+    'total_expenses': 80700.0,
+    'net_profit': 44300.0,
+    'gross_margin': 65.6,
+    'operating_margin': None,
+    'month_change': {
+        'revenue': {'change': 10000.0, 'percentage_change': 8.7},
+        'expenses': {'change': 5500.0, 'percentage_change': 7.31},
+        'net_profit': {'change': 4500.0, 'percentage_change': 11.31},
+    },
+    'year_change': {
+        'revenue': {'change': 70000.0, 'percentage_change': 127.27},
+        'expenses': {'change': 35800.0, 'percentage_change': 79.73},
+        'net_profit': {'change': 34200.0, 'percentage_change': 338.61},
+    },
+    'period': {'start_date': '2024-01-01', 'end_date': '2024-03-31'},
+    'ai_insights': 'insight',
+}
+
+BASELINE_EXPENSE_BREAKDOWN = {
+    'COGS': {'total_amount': 43000.0, 'new': False, 'spike': True},
+    'Payroll': {'total_amount': 13500.0, 'new': False, 'spike': True},
+    'Rent': {'total_amount': 6600.0, 'new': False, 'spike': True},
+    'Marketing': {'total_amount': 12500.0, 'new': False, 'spike': True},
+    'Other_Expenses': {'total_amount': 5100.0, 'new': False, 'spike': True},
+}
+
+BASELINE_INVOICES_ANALYSIS = {
+    'total_count': 4,
+    'paid_invoices': {'total_count': 2, 'total_amount': 1900.0},
+    'overdue_invoices': {'total_count': 1, 'total_amount': 950.75},
+    'month_change': {
+        'total_count': {'change': 2.0, 'percentage_change': 100.0},
+        'paid_invoices': {
+            'count_change': {'change': 1.0, 'percentage_change': 100.0},
+            'amount_change': {'change': 699.5, 'percentage_change': 58.27},
+        },
+        'overdue_invoices': {
+            'count_change': {'change': 0.0, 'percentage_change': 0.0},
+            'amount_change': {'change': 150.5, 'percentage_change': 18.81},
+        },
+    },
+    'year_change': {
+        'total_count': {'change': 2.0, 'percentage_change': 100.0},
+        'paid_invoices': {
+            'count_change': {'change': 1.0, 'percentage_change': 100.0},
+            'amount_change': {'change': 900.0, 'percentage_change': 90.0},
+        },
+        'overdue_invoices': {
+            'count_change': {'change': 0.0, 'percentage_change': 0.0},
+            'amount_change': {'change': 700.75, 'percentage_change': 280.3},
+        },
+    },
+    'period': {'start_date': '2024-02-01', 'end_date': '2024-02-29'},
+}
+
+BASELINE_CASH_ANALYSIS = [
+    ({}, {'total_income': 8000.5, 'total_expense': 3800.5}),
+    (
+        {'start_date': '2024-01-01', 'end_date': '2024-01-31'},
+        {'total_income': 5000.5, 'total_expense': 1200.25},
+    ),
+    ({'start_date': '2024-02-01'}, {'total_income': 3000.0, 'total_expense': 2600.25}),
+]
+
+
+class AnalysisBaselineParityTest(TestCase):
+    """The analysis endpoints answer like the dataframe services did"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='parity@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        self.pnl_data = pd.read_csv(test_data_path)
+        self.invoices_data = pd.DataFrame([
+            {'Date': '2024-01-10', 'Amount': 1200.5, 'Status': 'paid',
+             'Due_Date': '2024-02-10'},
+            {'Date': '2024-01-22', 'Amount': 800.25, 'Status': 'overdue',
+             'Due_Date': '2024-02-22'},
+            {'Date': '2024-02-05', 'Amount': 1500.0, 'Status': 'Paid',
+             'Due_Date': '2024-03-05'},
+            {'Date': '2024-02-12', 'Amount': 950.75, 'Status': 'pending',
+             'Due_Date': '2024-03-12'},
+            {'Date': '2024-02-20', 'Amount': 400.0, 'Status': 'completed',
+             'Due_Date': '2024-03-20'},
+            {'Date': '2024-02-28', 'Amount': 300.5, 'Status': 'draft',
+             'Due_Date': '2024-03-28'},
+            {'Date': '2023-02-15', 'Amount': 1000.0, 'Status': 'paid',
+             'Due_Date': '2023-03-15'},
+            {'Date': '2023-02-16', 'Amount': 250.0, 'Status': 'unpaid',
+             'Due_Date': '2023-03-16'},
+        ])
+        self.transactions_data = pd.DataFrame([
+            {'Date': '2024-01-05', 'Type': 'income', 'Category': 'Sales',
+             'Amount': 5000.5},
+            {'Date': '2024-01-15', 'Type': 'expense', 'Category': 'Rent',
+             'Amount': 1200.25},
+            {'Date': '2024-02-03', 'Type': 'Income', 'Category': 'Sales',
+             'Amount': 3000.0},
+            {'Date': '2024-02-18', 'Type': 'expense', 'Category': 'Payroll',
+             'Amount': 2500.75},
+            {'Date': '2024-03-01', 'Type': 'expense', 'Category': 'Other',
+             'Amount': 99.5},
+        ])
+        self.files = {
+            UserDataFile.TemplateType.PNL_TEMPLATE: self.pnl_data,
+            UserDataFile.TemplateType.INVOICES_TEMPLATE: self.invoices_data,
+            UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE: self.transactions_data,
+        }
+
+        # Rows are read from storage, typed by the loader like an upload
+        read_file = patch.object(
+            UserDatasetLoader, '_read_file', side_effect=self._read_file
+        )
+        read_file.start()
+        self.addCleanup(read_file.stop)
+        for method, value in [
+            ('_generate_ai_insights', 'insight'),
+            ('_get_industry_operating_margin', None),
+        ]:
+            patcher = patch.object(
+                UserPNLAnalysisService, method, return_value=value
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _read_file(self, user_file, columns):
+        df = self.files[user_file.template_type]
+        return df if columns is None else df[columns]
+
+    def _create_file(self, template_type, meta_data=None):
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=template_type,
+            original_filename=f'{template_type}.csv',
+            stored_filename=f'{template_type}.csv',
+            file_path=f'user_{self.user.id}/data_uploads/{template_type}.csv',
+            file_size=100,
+            meta_data=meta_data,
+        )
+
+    def _create_pnl_file(self, with_schema=True):
+        meta_data = dict(PNL_META_DATA)
+        if with_schema:
+            meta_data[UserDataFile.SCHEMA_META_KEY] = DatasetSchemaManifest.build(
+                self.pnl_data, UserDataFile.TemplateType.PNL_TEMPLATE, meta_data
+            )
+        self._create_file(UserDataFile.TemplateType.PNL_TEMPLATE, meta_data)
+
+    def _get_json_types(self, value):
+        if isinstance(value, dict):
+            return {key: self._get_json_types(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._get_json_types(item) for item in value]
+        return type(value).__name__
+
+    def assertMatchesBaseline(self, result, baseline):
+        """Equal values of the same JSON types, 1000 is not 1000.0"""
+        self.assertEqual(result, baseline)
+        self.assertEqual(
+            self._get_json_types(result), self._get_json_types(baseline)
+        )
+
+    def _get(self, url_name, params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_pnl_analysis(self):
+        for with_schema in [True, False]:
+            with self.subTest(with_schema=with_schema):
+                UserDataFile.objects.filter(user=self.user).delete()
+                cache.clear()
+                self._create_pnl_file(with_schema)
+
+                result = self._get('pnl-analysis', {
+                    'start_date': '2024-01-01', 'end_date': '2024-03-31',
+                })
+
+                self.assertMatchesBaseline(result, BASELINE_PNL_ANALYSIS)
+
+    def test_expense_breakdown(self):
+        self._create_pnl_file()
+
+        result = self._get('expense-breakdown', {
+            'start_date': '2024-01-01', 'end_date': '2024-03-31',
+        })
+
+        # monthly_change_percent was added to the documented response since
+        self.assertMatchesBaseline(
+            {
+                category: {key: values[key] for key in ['total_amount', 'new', 'spike']}
+                for category, values in result.items()
+            },
+            BASELINE_EXPENSE_BREAKDOWN,
+        )
+
+    def test_invoices_analysis(self):
+        self._create_file(UserDataFile.TemplateType.INVOICES_TEMPLATE)
+
+        result = self._get('invoices-analysis', {
+            'start_date': '2024-02-01', 'end_date': '2024-02-29',
+        })
+
+        self.assertMatchesBaseline(result, BASELINE_INVOICES_ANALYSIS)
+
+    def test_cash_analysis(self):
+        self._create_file(UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE)
+
+        for params, baseline in BASELINE_CASH_ANALYSIS:
+            with self.subTest(**params):
+                cache.clear()
+                self.assertMatchesBaseline(
+                    self._get('cash-analysis', params), baseline
+                )
@@ -0,0 +1,132 @@
+from datetime import date
+
+import pandas as pd
+
+from django.test import TestCase
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_append_service import UserDatasetAppendService
+
+
+class UserDatasetAppendServiceTest(TestCase):
+    """Test suite for merging appended rows into the current dataset"""
+
+    def setUp(self):
+        self.pnl_data = pd.DataFrame({
+            'Month': ['2024-01', '2024-02'],
+            'Revenue': [100.0, 200.0],
+        })
+        self.invoices_data = pd.DataFrame({
+            'Invoice_ID': ['INV-1', 'INV-2'],
+            'Invoice_Date': ['2024-01-05', '2024-02-05'],
+            'Amount': [1000.0, 2000.0],
+            'Status': ['paid', 'pending'],
+        })
+
+    def _merge_pnl(self, new_df):
+        return UserDatasetAppendService.merge(
+            self.pnl_data, new_df,
+            UserDataFile.TemplateType.PNL_TEMPLATE,
+            {'date_column': 'Month'},
+        )
+
+    def test_pnl_rows_replace_their_period(self):
+        result = self._merge_pnl(pd.DataFrame({
+            'Month': ['2024-02', '2024-03'],
+            'Revenue': [250.0, 300.0],
+        }))
+
+        self.assertFalse(result.is_empty)
+        self.assertEqual(
+            result.merged['Month'].tolist(), ['2024-01', '2024-02', '2024-03']
+        )
+        self.assertEqual(result.merged['Revenue'].tolist(), [100.0, 250.0, 300.0])
+        self.assertEqual(
+            result.get_affected_range(), (date(2024, 2, 1), date(2024, 3, 1))
+        )
+
+    def test_identical_append_is_empty(self):
+        result = self._merge_pnl(self.pnl_data.copy())
+
+        self.assertTrue(result.is_empty)
+        self.assertIsNone(result.get_affected_range())
+
+    def test_only_changed_rows_are_replaced(self):
+        result = self._merge_pnl(pd.DataFrame({
+            'Month': ['2024-01', '2024-02'],
+            'Revenue': [100.0, 210.0],
+        }))
+
+        self.assertEqual(result.added_rows['Month'].tolist(), ['2024-02'])
+        self.assertEqual(result.replaced_rows['Month'].tolist(), ['2024-02'])
+        self.assertEqual(
+            result.get_affected_range(), (date(2024, 2, 1), date(2024, 2, 1))
+        )
+
+    def test_invoices_are_dated_by_the_analysis_date_column(self):
+        result = UserDatasetAppendService.merge(
+            self.invoices_data,
+            pd.DataFrame({
+                'Invoice_ID': ['INV-2'],
+                'Invoice_Date': ['2024-02-05'],
+                'Amount': [2000.0],
+                'Status': ['paid'],
+            }),
+            UserDataFile.TemplateType.INVOICES_TEMPLATE,
+        )
+
+        self.assertEqual(len(result.merged), 2)
+        self.assertEqual(
+            result.get_affected_range(), (date(2024, 2, 5), date(2024, 2, 5))
+        )
+
+    def test_invoices_not_filtered_by_date_have_no_affected_range(self):
+        """Analyses do not filter by Date_Issued, every period changes"""
+        invoices_data = self.invoices_data.rename(
+            columns={'Invoice_Date': 'Date_Issued'}
+        )
+
+        result = UserDatasetAppendService.merge(
+            invoices_data,
+            invoices_data.assign(Status='paid'),
+            UserDataFile.TemplateType.INVOICES_TEMPLATE,
+        )
+
+        self.assertFalse(result.is_empty)
+        self.assertIsNone(result.get_affected_range())
+
+    def test_identical_invoices_append_is_empty(self):
+        result = UserDatasetAppendService.merge(
+            self.invoices_data, self.invoices_data.copy(),
+            UserDataFile.TemplateType.INVOICES_TEMPLATE,
+        )
+
+        self.assertTrue(result.is_empty)
+
+    def test_transactions_skip_existing_rows(self):
+        transactions_data = pd.DataFrame({
+            'Date': ['2024-01-01'],
+            'Type': ['income'],
+            'Category': ['Sales'],
+            'Amount': [500.0],
+        })
+        new_df = pd.DataFrame({
+            'Date': ['2024-01-01', '2024-01-02'],
+            'Type': ['income', 'expense'],
+            'Category': ['Sales', 'Rent'],
+            'Amount': [500.0, 300.0],
+        })
+
+        result = UserDatasetAppendService.merge(
+            transactions_data, new_df,
+            UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE,
+        )
+
+        self.assertEqual(len(result.merged), 2)
+        self.assertEqual(
+            result.get_affected_range(), (date(2024, 1, 2), date(2024, 1, 2))
+        )
+
+    def test_columns_must_match(self):
+        with self.assertRaises(ValueError):
+            self._merge_pnl(pd.DataFrame({'Month': ['2024-03']}))
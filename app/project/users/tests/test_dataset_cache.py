@@ -0,0 +1,140 @@
+from datetime import date
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+
+from django.test import TestCase
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_loader import DataFrameCache, UserDatasetLoader
+from users.services.time_indexed_dataset import TimeIndexedDataset
+
+
+def build_frame(rows):
+    return pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=rows, freq='D'),
+        'Amount': np.arange(rows, dtype='int64'),
+    })
+
+
+class DataFrameCacheTest(TestCase):
+    """Test suite for the process-local dataset cache"""
+
+    def setUp(self):
+        self.frame = build_frame(100)
+        self.frame_size = int(
+            self.frame.memory_usage(index=True, deep=True).sum()
+        )
+
+    def test_hit_returns_the_cached_frame(self):
+        cache = DataFrameCache(max_bytes=10 * self.frame_size)
+        load = Mock(return_value=self.frame)
+
+        first = cache.get_or_load('a', None, load)
+        second = cache.get_or_load('a', ['Date', 'Amount'], load)
+
+        load.assert_called_once_with(None)
+        # Hits hand out the cached rows, never a copy
+        self.assertIs(first, self.frame)
+        self.assertIs(second, self.frame)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_projection_is_widened(self):
+        cache = DataFrameCache(max_bytes=10 * self.frame_size)
+        load = Mock(side_effect=lambda columns: self.frame[columns])
+
+        cache.get_or_load('a', ['Date'], load)
+        projected = cache.get_or_load('a', ['Amount'], load)
+        cache.get_or_load('a', ['Date'], load)
+
+        self.assertEqual(list(projected.columns), ['Amount'])
+        self.assertEqual(load.call_args_list[-1].args, (['Amount', 'Date'],))
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['entries'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = DataFrameCache(max_bytes=2 * self.frame_size)
+        load = Mock(return_value=self.frame)
+
+        cache.get_or_load('a', None, load)
+        cache.get_or_load('b', None, load)
+        cache.get_or_load('a', None, load)
+        cache.get_or_load('c', None, load)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 2)
+        self.assertLessEqual(stats['bytes'], stats['max_bytes'])
+        # 'b' was the least recently used
+        cache.get_or_load('b', None, load)
+        self.assertEqual(cache.get_stats()['misses'], 4)
+
+    def test_frame_over_budget_is_not_cached(self):
+        cache = DataFrameCache(max_bytes=self.frame_size - 1)
+        load = Mock(return_value=self.frame)
+
+        cache.get_or_load('a', None, load)
+        cache.get_or_load('a', None, load)
+
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+    def test_invalidate(self):
+        cache = DataFrameCache(max_bytes=10 * self.frame_size)
+        load = Mock(return_value=self.frame)
+        cache.get_or_load(('user', 1), None, load)
+        cache.get_or_load(('user', 2), None, load)
+
+        cache.invalidate(lambda key: key[1] < 2)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], self.frame_size)
+
+
+class SortedDatasetTest(TestCase):
+    """Cached datasets are sorted once and indexed without copies"""
+
+    def test_loader_sorts_by_date_with_undated_rows_last(self):
+        user_file = Mock(
+            template_type=UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE
+        )
+        df = pd.DataFrame({
+            'Date': pd.to_datetime(['2024-03-01', None, '2024-01-01']),
+            'Amount': [3, 0, 1],
+        })
+
+        sorted_df = UserDatasetLoader._sort_by_date(
+            df, UserDatasetLoader._get_date_column(user_file, df)
+        )
+
+        self.assertEqual(sorted_df['Amount'].tolist(), [1, 3, 0])
+
+    def test_sorted_dates_are_indexed_without_copy(self):
+        df = build_frame(10)
+        df.loc[9, 'Date'] = pd.NaT
+
+        dataset = TimeIndexedDataset(df, 'Date')
+
+        self.assertEqual(len(dataset.frame), 9)
+        self.assertTrue(np.shares_memory(
+            dataset.frame['Amount'].to_numpy(), df['Amount'].to_numpy()
+        ))
+        rows = dataset.slice(date(2024, 1, 3), date(2024, 1, 4))
+        self.assertEqual(rows['Amount'].tolist(), [2, 3])
+
+    def test_unsorted_dates_are_sorted(self):
+        df = pd.DataFrame({
+            'Date': ['2024-01-03', 'n/a', '2024-01-01', '2024-01-02'],
+            'Amount': [3, 0, 1, 2],
+        })
+
+        dataset = TimeIndexedDataset(df, 'Date')
+
+        self.assertEqual(dataset.frame['Amount'].tolist(), [1, 2, 3])
+        self.assertEqual(
+            dataset.slice(date(2024, 1, 2), None)['Amount'].tolist(), [2, 3]
+        )
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from django.test import TestCase
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.typed_dataset import TypedDataset
+
+
+class DatasetSchemaDateFormatTest(TestCase):
+    """Test suite for the date formats recorded in the schema manifest"""
+
+    def test_iso_dates(self):
+        self.assertEqual(
+            DatasetSchemaManifest.detect_date_format(
+                pd.Series(['2024-01-01', '2024-02-01'])
+            ),
+            '%Y-%m-%d',
+        )
+
+    def test_day_above_twelve_decides_the_order(self):
+        self.assertEqual(
+            DatasetSchemaManifest.detect_date_format(
+                pd.Series(['01/02/2024', '25/02/2024'])
+            ),
+            '%d/%m/%Y',
+        )
+        self.assertEqual(
+            DatasetSchemaManifest.detect_date_format(
+                pd.Series(['02/01/2024', '02/25/2024'])
+            ),
+            '%m/%d/%Y',
+        )
+
+    def test_ambiguous_slash_dates_have_no_format(self):
+        months = pd.Series([f'{month:02d}/01/2024' for month in range(1, 13)])
+
+        self.assertIsNone(DatasetSchemaManifest.detect_date_format(months))
+
+    def test_ambiguous_month_start_dates_stay_in_their_months(self):
+        """US month-start P&L dates are read as one row per month"""
+        pnl_data = pd.DataFrame({
+            'Month': [f'{month:02d}/01/2024' for month in range(1, 13)],
+            'Revenue': [1000.0] * 12,
+        })
+        schema = DatasetSchemaManifest.build(
+            pnl_data, UserDataFile.TemplateType.PNL_TEMPLATE,
+            {'date_column': 'Month'},
+        )
+
+        typed_data = TypedDataset.normalize(
+            pnl_data,
+            DatasetSchemaManifest.get_column_kinds(schema),
+            DatasetSchemaManifest.get_date_formats(schema),
+        )
+
+        self.assertEqual(
+            typed_data['Month'].dt.month.tolist(), list(range(1, 13))
+        )
+        self.assertTrue((typed_data['Month'].dt.day == 1).all())
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from users.services.pnl_metrics_engine import PnLMetricsEngine
+
+
+class ExpenseBreakdownSpikeTest(TestCase):
+    """Test suite for the spike rules of the expense breakdown"""
+
+    def setUp(self):
+        self.engine = PnLMetricsEngine(['Revenue'], ['Payroll', 'Software'])
+
+    def test_share_of_total_expenses_is_a_spike(self):
+        result = self.engine.get_expense_breakdown(
+            {'Payroll': 980000, 'Software': 20000},
+            {'Payroll': 980000, 'Software': 20000},
+        )
+
+        self.assertTrue(result['Payroll']['spike'])
+        # 2% of total expenses without growth
+        self.assertFalse(result['Software']['spike'])
+
+    def test_month_over_month_growth_is_a_spike(self):
+        result = self.engine.get_expense_breakdown(
+            {'Payroll': 980000, 'Software': 20000},
+            {'Payroll': 980000, 'Software': 10000},
+        )
+
+        self.assertTrue(result['Software']['spike'])
+        self.assertEqual(result['Software']['monthly_change_percent'], 100.0)
+        self.assertEqual(result['Software']['total_amount'], 200.0)
+
+    def test_no_spending_the_month_before_is_not_a_spike(self):
+        result = self.engine.get_expense_breakdown(
+            {'Payroll': 980000, 'Software': 20000},
+            {'Payroll': 980000, 'Software': 0},
+        )
+
+        self.assertFalse(result['Software']['spike'])
+        self.assertEqual(result['Software']['monthly_change_percent'], 0.0)
+
+    def test_without_previous_month(self):
+        result = self.engine.get_expense_breakdown(
+            {'Payroll': 980000, 'Software': 20000}, None
+        )
+
+        self.assertFalse(result['Software']['spike'])
+        self.assertEqual(result['Software']['monthly_change_percent'], 0.0)
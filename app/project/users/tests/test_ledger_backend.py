@@ -0,0 +1,172 @@
+import os
+from datetime import date
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from users.models.ledger_entries import (
+    InvoiceLedgerEntry,
+    PnLLedgerEntry,
+    TransactionLedgerEntry,
+)
+from users.models.user_data_file import UserDataFile
+from users.services.cash_analysis_service import UserCashAnalysisService
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import UserInvoicesAnalysisService
+from users.services.ledger_ingestion_service import UserLedgerIngestionService
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Ledger ingestion uses Postgres COPY'
+)
+class LedgerBackendParityTest(TestCase):
+    """The SQL ledger backend answers like the dataframe path"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='ledger@example.com',
+            password='testpass123'
+        )
+        cache.clear()
+
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        self.pnl_data = pd.read_csv(test_data_path)
+        # Amounts with cents, summed exactly by both backends
+        self.invoices_data = pd.DataFrame([
+            {'Date': '2024-01-15', 'Amount': 1000.1, 'Status': 'Paid',
+             'Due_Date': '2024-02-15'},
+            {'Date': '2024-01-20', 'Amount': 1500.2, 'Status': 'overdue',
+             'Due_Date': '2024-02-20'},
+            {'Date': '2024-02-01', 'Amount': 2000.3, 'Status': 'paid',
+             'Due_Date': '2024-03-01'},
+            {'Date': '2024-02-10', 'Amount': 800.4, 'Status': 'pending',
+             'Due_Date': '2024-03-10'},
+            {'Date': 'n/a', 'Amount': 50.0, 'Status': 'paid',
+             'Due_Date': None},
+        ])
+        self.transactions_data = pd.DataFrame([
+            {'Date': '2024-01-05', 'Type': 'Income', 'Category': 'Sales',
+             'Amount': 5000.55},
+            {'Date': '2024-01-10', 'Type': 'expense', 'Category': 'Rent',
+             'Amount': 1200.1},
+            {'Date': '2024-02-03', 'Type': 'income', 'Category': 'Sales',
+             'Amount': 3000.0},
+            {'Date': '2024-02-15', 'Type': 'expense', 'Category': 'Payroll',
+             'Amount': 2500.25},
+        ])
+
+        self._ingest(
+            UserDataFile.TemplateType.PNL_TEMPLATE, self.pnl_data,
+            meta_data={
+                'date_column': 'Month',
+                'revenue_columns': ['Revenue'],
+                'expense_columns': EXPENSE_COLUMNS,
+            },
+        )
+        self._ingest(
+            UserDataFile.TemplateType.INVOICES_TEMPLATE, self.invoices_data
+        )
+        self._ingest(
+            UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE,
+            self.transactions_data,
+        )
+
+    def _ingest(self, template_type, df, meta_data=None):
+        user_file = UserDataFile.objects.create(
+            user=self.user,
+            template_type=template_type,
+            original_filename=f'{template_type}.csv',
+            stored_filename=f'{template_type}.csv',
+            file_path=f'user_{self.user.id}/data_uploads/{template_type}.csv',
+            file_size=100,
+            meta_data=meta_data,
+        )
+        UserLedgerIngestionService(self.user).ingest(user_file, df)
+
+    def _compare_backends(self, service_class, df, analyse):
+        """Run an analysis on both backends, the SQL one without the file"""
+        with override_settings(USER_DATA_ANALYSIS_BACKEND='dataframe'), \
+                patch.object(
+                    service_class, '_get_dataframe_from_file', return_value=df
+                ):
+            expected = analyse(service_class(self.user))
+        cache.clear()
+
+        with override_settings(USER_DATA_ANALYSIS_BACKEND='sql'), \
+                patch.object(
+                    service_class, '_get_dataframe_from_file'
+                ) as mock_get_df:
+            result = analyse(service_class(self.user))
+            mock_get_df.assert_not_called()
+
+        self.assertEqual(result, expected)
+
+    def test_ingestion_writes_ledger_rows(self):
+        numeric_columns = self.pnl_data.drop(columns=['Month']).columns
+        self.assertEqual(
+            PnLLedgerEntry.objects.filter(user=self.user).count(),
+            len(self.pnl_data) * len(numeric_columns),
+        )
+        self.assertEqual(
+            InvoiceLedgerEntry.objects.filter(user=self.user).count(),
+            len(self.invoices_data),
+        )
+        self.assertEqual(
+            TransactionLedgerEntry.objects.filter(user=self.user).count(),
+            len(self.transactions_data),
+        )
+        # Unparseable dates are stored as NULL
+        self.assertTrue(
+            InvoiceLedgerEntry.objects.filter(
+                user=self.user, date__isnull=True
+            ).exists()
+        )
+
+    def test_pnl_metrics_parity(self):
+        self._compare_backends(
+            UserPNLAnalysisService, self.pnl_data,
+            lambda service: service.get_pnl_metrics(
+                date(2024, 2, 1), date(2024, 3, 31)
+            ),
+        )
+
+    def test_pnl_metrics_batch_parity(self):
+        self._compare_backends(
+            UserPNLAnalysisService, self.pnl_data,
+            lambda service: service.get_pnl_metrics_batch([
+                (date(2024, 1, 1), date(2024, 12, 31)),
+                (date(2025, 6, 1), date(2025, 6, 30)),
+            ]),
+        )
+
+    def test_invoices_analysis_parity(self):
+        self._compare_backends(
+            UserInvoicesAnalysisService, self.invoices_data,
+            lambda service: service.get_invoices_analysis(
+                date(2024, 2, 1), date(2024, 2, 29)
+            ),
+        )
+
+    def test_cash_analysis_parity(self):
+        for start_date, end_date in [
+            (None, None), ('2024-01-01', '2024-01-31'), ('2024-02-01', None),
+        ]:
+            with self.subTest(start_date=start_date, end_date=end_date):
+                self._compare_backends(
+                    UserCashAnalysisService, self.transactions_data,
+                    lambda service: service.get_cash_analysis(
+                        start_date, end_date
+                    ),
+                )
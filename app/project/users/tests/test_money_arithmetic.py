@@ -0,0 +1,194 @@
+import os
+from datetime import date
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from users.services.dataset_loader import UserDatasetLoader
+from users.services.invoices_analysis_service import UserInvoicesAnalysisService
+from users.services.pnl_metrics_engine import PnLMetricsEngine
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+from users.services.time_indexed_dataset import TimeIndexedDataset
+from users.services.typed_dataset import TypedDataset
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+class MoneyArithmeticTest(TestCase):
+    """Integer minor unit sums match exact decimal arithmetic"""
+
+    def setUp(self):
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        pnl_data = pd.read_csv(test_data_path)
+        # Amounts with cents, which float sums do not add up exactly
+        for column in ['Revenue'] + EXPENSE_COLUMNS:
+            pnl_data[column] = pnl_data[column] + 0.1
+        self.pnl_data = pnl_data
+        self.engine = PnLMetricsEngine(['Revenue'], EXPENSE_COLUMNS)
+
+    def _decimal_sum(self, df, column):
+        return sum((Decimal(str(value)) for value in df[column]), Decimal('0'))
+
+    def _get_range_metrics(self, start_date, end_date):
+        typed_data = TypedDataset.normalize(
+            self.pnl_data,
+            {
+                column: TypedDataset.MONEY
+                for column in ['Revenue'] + EXPENSE_COLUMNS
+            },
+        )
+        dataset = TimeIndexedDataset(typed_data, 'Month')
+        totals = self.engine.get_range_totals(dataset, [(start_date, end_date)])
+        return self.engine.get_period_metrics(totals[0])
+
+    def test_money_scale_of_currency(self):
+        self.assertEqual(TypedDataset.get_money_scale('USD'), 100)
+        self.assertEqual(TypedDataset.get_money_scale('JPY'), 1)
+        self.assertEqual(TypedDataset.get_money_scale(None), 100)
+
+    def test_user_money_scale_from_profile(self):
+        user = Mock(profile=Mock(currency='JPY'))
+        self.assertEqual(TypedDataset.get_user_money_scale(user), 1)
+
+        user = Mock(profile=None)
+        self.assertEqual(TypedDataset.get_user_money_scale(user), 100)
+
+    def test_loader_with_given_scale_skips_the_profile(self):
+        """Upload worker threads pass the scale and do not query"""
+        user = User.objects.create_user(
+            email='scale@example.com',
+            password='testpass123'
+        )
+        user = User.objects.get(id=user.id)
+
+        with self.assertNumQueries(0):
+            loader = UserDatasetLoader(user, money_scale=1)
+
+        self.assertEqual(loader.money_scale, 1)
+
+    def test_sum_money_is_exact(self):
+        values = pd.Series([0.1] * 10 + [None, 'n/a'])
+
+        self.assertEqual(TypedDataset.sum_money(values), Decimal('1'))
+        self.assertEqual(
+            TypedDataset.sum_money(pd.Series([1500, 250.4]), 1), Decimal('1750')
+        )
+
+    def test_engine_totals_match_decimal_sums(self):
+        start_date, end_date = date(2024, 1, 1), date(2024, 12, 31)
+        year_data = self.pnl_data[
+            self.pnl_data['Month'].str.startswith('2024')
+        ]
+
+        metrics = self._get_range_metrics(start_date, end_date)
+
+        total_revenue = self._decimal_sum(year_data, 'Revenue')
+        total_expenses = sum(
+            (self._decimal_sum(year_data, column) for column in EXPENSE_COLUMNS),
+            Decimal('0'),
+        )
+        self.assertEqual(
+            self.engine.to_money(metrics['total_revenue']), float(total_revenue)
+        )
+        self.assertEqual(
+            self.engine.to_money(metrics['total_expenses']),
+            float(total_expenses),
+        )
+        self.assertEqual(
+            self.engine.to_money(metrics['net_profit']),
+            float(total_revenue - total_expenses),
+        )
+
+    def test_rollup_totals_match_engine(self):
+        start_date, end_date = date(2023, 4, 1), date(2025, 3, 31)
+        rollup = PnLMonthlyRollup.from_dict(
+            PnLMonthlyRollup.build(self.pnl_data, 'Month').to_dict()
+        )
+
+        rollup_metrics = self.engine.get_period_metrics(
+            rollup.get_totals(start_date, end_date)
+        )
+
+        self.assertEqual(
+            rollup_metrics, self._get_range_metrics(start_date, end_date)
+        )
+
+    def test_change_data_matches_decimal_arithmetic(self):
+        result = TypedDataset.build_change_data(1234510, 1000000, 100)
+
+        self.assertEqual(result['change'], 2345.1)
+        self.assertEqual(result['percentage_change'], 23.45)
+
+    def test_change_data_of_counts(self):
+        result = TypedDataset.build_change_data(5, 0)
+
+        self.assertEqual(result['change'], 5.0)
+        self.assertEqual(result['percentage_change'], 100.0)
+
+    def test_whole_unit_currency(self):
+        typed_data = TypedDataset.normalize(
+            pd.DataFrame({'Amount': [1500.0, 2500.0]}),
+            {'Amount': TypedDataset.MONEY},
+            money_scale=1,
+        )
+
+        self.assertEqual(typed_data['Amount'].tolist(), [1500, 2500])
+        self.assertEqual(
+            TypedDataset.sum_money(typed_data['Amount'], 1), Decimal('4000')
+        )
+
+
+class InvoicesMoneyArithmeticTest(TestCase):
+    """Invoice amounts with cents are summed exactly"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='money@example.com',
+            password='testpass123'
+        )
+        self.service = UserInvoicesAnalysisService(self.user)
+        cache.clear()
+
+        self.mock_invoices_data = pd.DataFrame([
+            {'Date': '2024-01-15', 'Amount': 0.1, 'Status': 'paid'},
+            {'Date': '2024-01-20', 'Amount': 0.2, 'Status': 'paid'},
+            {'Date': '2024-01-25', 'Amount': 1000.35, 'Status': 'overdue'},
+            {'Date': '2024-02-01', 'Amount': 0.7, 'Status': 'paid'},
+        ])
+
+    @patch.object(UserInvoicesAnalysisService, '_get_dataframe_from_file')
+    def test_invoices_amounts_are_exact(self, mock_get_df):
+        mock_get_df.return_value = self.mock_invoices_data
+
+        result = self.service.get_invoices_analysis(
+            date(2024, 1, 1), date(2024, 1, 31)
+        )
+
+        self.assertEqual(result['paid_invoices']['total_count'], 2)
+        self.assertEqual(result['paid_invoices']['total_amount'], 0.3)
+        self.assertEqual(result['overdue_invoices']['total_amount'], 1000.35)
+
+    @patch.object(UserInvoicesAnalysisService, '_get_dataframe_from_file')
+    def test_cached_analysis_is_not_reused_for_another_currency(
+        self, mock_get_df
+    ):
+        mock_get_df.return_value = self.mock_invoices_data
+        self.service.get_invoices_analysis(date(2024, 1, 1), date(2024, 1, 31))
+
+        # The currency changed to one without minor units
+        service = UserInvoicesAnalysisService(self.user)
+        service.dataset_loader.money_scale = 1
+        result = service.get_invoices_analysis(
+            date(2024, 1, 1), date(2024, 1, 31)
+        )
+
+        self.assertEqual(result['overdue_invoices']['total_amount'], 1000.0)
@@ -0,0 +1,233 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from users.models.user_data_file import UserDataFile
+from users.services.dataset_schema import DatasetSchemaManifest
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+from users.services.time_indexed_dataset import TimeIndexedDataset
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+def load_mock_pnl_data():
+    test_data_path = os.path.join(
+        os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+    )
+    return pd.read_csv(test_data_path)
+
+
+class PnLMonthlyRollupTest(TestCase):
+    """Test suite for the monthly P&L rollup"""
+
+    def test_build_groups_rows_by_month(self):
+        pnl_data = pd.DataFrame({
+            'Month': ['2024-01-01', '2024-01-15', '2024-02-29', 'n/a'],
+            'Revenue': [100.0, 50.25, 70.0, 10.0],
+        })
+
+        rollup = PnLMonthlyRollup.build(pnl_data, 'Month')
+
+        self.assertEqual(rollup.periods, ['2024-01-01', '2024-02-01'])
+        self.assertEqual(rollup.totals['Revenue'], [150.25, 70.0])
+
+    def test_range_totals_from_prefix_sums(self):
+        rollup = PnLMonthlyRollup.build(load_mock_pnl_data(), 'Month')
+
+        totals = rollup.get_range_totals([
+            (date(2024, 1, 1), date(2024, 3, 31)),
+            (date(2030, 1, 1), date(2030, 12, 31)),
+        ])
+
+        # 2024-01 to 2024-03 revenue of the mock data, in cents
+        pnl_data = load_mock_pnl_data()
+        expected = pnl_data[
+            pnl_data['Month'].isin(['2024-01', '2024-02', '2024-03'])
+        ]['Revenue'].sum() * 100
+        self.assertEqual(totals[0]['Revenue'], expected)
+        self.assertIsNone(totals[1])
+
+    def test_replace_periods(self):
+        rollup = PnLMonthlyRollup(
+            ['2024-01-01', '2024-02-01'], {'Revenue': [100.0, 200.0]}
+        )
+        appended = PnLMonthlyRollup(
+            ['2024-02-01', '2024-03-01'], {'Revenue': [250.0, 300.0]}
+        )
+
+        merged = rollup.replace_periods(appended)
+
+        self.assertEqual(
+            merged.periods, ['2024-01-01', '2024-02-01', '2024-03-01']
+        )
+        self.assertEqual(merged.totals['Revenue'], [100.0, 250.0, 300.0])
+
+
+class PnLColumnTotalsTest(TestCase):
+    """Range totals are answered from the rollup without the file rows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='rollup@example.com',
+            password='testpass123'
+        )
+        cache.clear()
+        self.pnl_data = load_mock_pnl_data()
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename='pnl.csv',
+            stored_filename='pnl.csv',
+            file_path=f'user_{self.user.id}/data_uploads/pnl.csv',
+            file_size=100,
+            meta_data={
+                'date_column': 'Month',
+                'revenue_columns': ['Revenue'],
+                'expense_columns': EXPENSE_COLUMNS,
+            },
+            monthly_rollup=PnLMonthlyRollup.build(
+                self.pnl_data, 'Month'
+            ).to_dict(),
+        )
+        self.service = UserPNLAnalysisService(self.user)
+        self.ranges = [
+            (date(2024, 1, 1), date(2024, 6, 30)),
+            (date(2023, 1, 1), date(2023, 12, 31)),
+        ]
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_totals_without_rows_skip_the_file(self, mock_get_df):
+        engine = self.service._get_metrics_engine()
+
+        pnl_data, totals = self.service._get_pnl_column_totals(
+            engine, self.ranges
+        )
+
+        mock_get_df.assert_not_called()
+        self.assertIsNone(pnl_data)
+        row_totals = engine.get_range_totals(
+            TimeIndexedDataset(self.pnl_data, 'Month'), self.ranges
+        )
+        self.assertEqual(
+            [engine.get_period_metrics(range_totals) for range_totals in totals],
+            [
+                engine.get_period_metrics(range_totals)
+                for range_totals in row_totals
+            ],
+        )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_rows_are_read_for_rows_range(self, mock_get_df):
+        mock_get_df.return_value = self.pnl_data
+        engine = self.service._get_metrics_engine()
+
+        pnl_data, _ = self.service._get_pnl_column_totals(
+            engine, self.ranges, rows_range=self.ranges[0]
+        )
+
+        mock_get_df.assert_called_once()
+        self.assertEqual(len(pnl_data), 6)
+
+
+class PnLWithinMonthRangesTest(TestCase):
+    """Ranges within months are summed over the rows, not the rollup"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='weekly@example.com',
+            password='testpass123'
+        )
+        cache.clear()
+        self.meta_data = {
+            'date_column': 'Week',
+            'revenue_columns': ['Revenue'],
+            'expense_columns': ['Payroll'],
+        }
+
+    def _create_pnl_file(self, pnl_data):
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename='pnl.csv',
+            stored_filename='pnl.csv',
+            file_path=f'user_{self.user.id}/data_uploads/pnl.csv',
+            file_size=100,
+            meta_data={
+                **self.meta_data,
+                UserDataFile.SCHEMA_META_KEY: DatasetSchemaManifest.build(
+                    pnl_data, UserDataFile.TemplateType.PNL_TEMPLATE,
+                    self.meta_data,
+                ),
+            },
+            monthly_rollup=PnLMonthlyRollup.build(pnl_data, 'Week').to_dict(),
+        )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_weekly_rows_in_a_mid_month_range(self, mock_get_df):
+        weeks = pd.date_range('2024-01-01', periods=10, freq='7D')
+        pnl_data = pd.DataFrame({
+            'Week': weeks.strftime('%Y-%m-%d'),
+            'Revenue': [1000.0 + week for week in range(10)],
+            'Payroll': [400.0] * 10,
+        })
+        self._create_pnl_file(pnl_data)
+        mock_get_df.return_value = pnl_data
+
+        result = UserPNLAnalysisService(self.user).get_pnl_metrics(
+            date(2024, 1, 15), date(2024, 2, 10)
+        )
+
+        in_range = pnl_data[
+            (weeks >= '2024-01-15') & (weeks <= '2024-02-10')
+        ]
+        self.assertEqual(result['total_revenue'], in_range['Revenue'].sum())
+        self.assertEqual(
+            result['net_profit'],
+            in_range['Revenue'].sum() - in_range['Payroll'].sum(),
+        )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_weekly_rows_in_whole_months_use_the_rollup(self, mock_get_df):
+        weeks = pd.date_range('2024-01-01', periods=10, freq='7D')
+        pnl_data = pd.DataFrame({
+            'Week': weeks.strftime('%Y-%m-%d'),
+            'Revenue': [1000.0 + week for week in range(10)],
+            'Payroll': [400.0] * 10,
+        })
+        self._create_pnl_file(pnl_data)
+
+        result = UserPNLAnalysisService(self.user).get_pnl_metrics_batch(
+            [(date(2024, 1, 1), date(2024, 1, 31))]
+        )
+
+        mock_get_df.assert_not_called()
+        self.assertEqual(
+            result['2024-01-01_2024-01-31']['total_revenue'],
+            pnl_data[weeks.month == 1]['Revenue'].sum(),
+        )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_month_start_rows_use_the_rollup_for_any_range(self, mock_get_df):
+        pnl_data = load_mock_pnl_data().rename(columns={'Month': 'Week'})
+        self._create_pnl_file(pnl_data)
+
+        result = UserPNLAnalysisService(self.user).get_pnl_metrics_batch(
+            [(date(2024, 1, 15), date(2024, 3, 10))]
+        )
+
+        mock_get_df.assert_not_called()
+        self.assertEqual(
+            result['2024-01-15_2024-03-10']['total_revenue'],
+            pnl_data[
+                pnl_data['Week'].isin(['2024-02', '2024-03'])
+            ]['Revenue'].sum(),
+        )
@@ -0,0 +1,174 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models.user_data_file import UserDataFile
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+from users.services.rolling_metrics import RollingWindowSums
+from users.services.time_series import get_series_periods
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+class RollingWindowSumsTest(TestCase):
+    """Test suite for trailing window totals from cumulative sums"""
+
+    def setUp(self):
+        self.months = pd.period_range('2024-01', '2024-06', freq='M')
+        self.revenue = np.array([100, 200, 300, 400, 500, 600], dtype='int64')
+        self.sums = RollingWindowSums(
+            self.months, {'revenue': self.revenue}, money_scale=1
+        )
+
+    def test_window_totals(self):
+        totals = self.sums.get_window_totals('revenue', self.months, 3)
+
+        self.assertEqual(totals, [None, None, 600.0, 900.0, 1200.0, 1500.0])
+
+    def test_months_after_the_history_count_as_zero(self):
+        months = pd.period_range('2024-06', '2024-08', freq='M')
+
+        totals = self.sums.get_window_totals('revenue', months, 2)
+
+        self.assertEqual(totals, [1100.0, 600.0, 0.0])
+
+    def test_window_metrics_include_averages(self):
+        metrics = self.sums.get_window_metrics(self.months[-1:], 4)
+
+        self.assertEqual(metrics['revenue'], [1800.0])
+        self.assertEqual(metrics['revenue_average'], [450.0])
+
+
+class PnLRollingMetricsTest(TestCase):
+    """Rolling P&L metrics equal sums over each trailing window"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='rolling@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        self.pnl_data = pd.read_csv(test_data_path)
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename='pnl.csv',
+            stored_filename='pnl.csv',
+            file_path=f'user_{self.user.id}/data_uploads/pnl.csv',
+            file_size=100,
+            meta_data={
+                'date_column': 'Month',
+                'revenue_columns': ['Revenue'],
+                'expense_columns': EXPENSE_COLUMNS,
+            },
+            monthly_rollup=PnLMonthlyRollup.build(
+                self.pnl_data, 'Month'
+            ).to_dict(),
+        )
+
+    def _get_window_totals(self, months, window):
+        """Sum the mock data of each trailing window month by month"""
+        monthly = self.pnl_data.assign(
+            period=pd.PeriodIndex(self.pnl_data['Month'], freq='M'),
+            expenses=self.pnl_data[EXPENSE_COLUMNS].sum(axis=1),
+        ).set_index('period')
+        first_month = monthly.index.min()
+
+        totals = {'revenue': [], 'expenses': [], 'net_profit': []}
+        for month in months:
+            if month - window + 1 < first_month:
+                for values in totals.values():
+                    values.append(None)
+                continue
+            rows = monthly[
+                (monthly.index > month - window) & (monthly.index <= month)
+            ]
+            revenue = float(rows['Revenue'].sum())
+            expenses = float(rows['expenses'].sum())
+            totals['revenue'].append(revenue)
+            totals['expenses'].append(expenses)
+            totals['net_profit'].append(revenue - expenses)
+        return totals
+
+    def test_rolling_metrics_match_window_sums(self):
+        # From before the history to after its last month
+        periods = get_series_periods(
+            date(2022, 12, 1), date(2025, 11, 30), 'month'
+        )
+
+        rolling = UserPNLAnalysisService(self.user).get_rolling_metrics(
+            periods, [3, 12]
+        )
+
+        for window in [3, 12]:
+            expected = self._get_window_totals(periods, window)
+            for metric, totals in expected.items():
+                with self.subTest(window=window, metric=metric):
+                    self.assertEqual(rolling[str(window)][metric], totals)
+                    self.assertEqual(
+                        rolling[str(window)][f'{metric}_average'],
+                        [
+                            round(total / window, 2)
+                            if total is not None else None
+                            for total in totals
+                        ],
+                    )
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_time_series_rolling_windows(self, mock_get_df):
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-06-30',
+            'sources': ['pnl'],
+            'rolling_windows': [3, 12],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_get_df.assert_not_called()
+        rolling = response.json()['pnl']['rolling']
+        self.assertEqual(set(rolling), {'3', '12'})
+        periods = get_series_periods(
+            date(2024, 1, 1), date(2024, 6, 30), 'month'
+        )
+        self.assertEqual(
+            rolling['12']['revenue'],
+            self._get_window_totals(periods, 12)['revenue'],
+        )
+
+    def test_rolling_windows_require_monthly_series(self):
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+            'granularity': 'quarter',
+            'rolling_windows': [3],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_window_length_is_bounded(self):
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+            'rolling_windows': [1],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,95 @@
+import datetime
+from unittest.mock import Mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from users.models.user_data_file import UserDataFile
+from users.services.storage_gc_service import UserDataStorageGCService
+
+User = get_user_model()
+
+
+class UserDataStorageGCServiceTest(TestCase):
+    """Test suite for the dataset version selection of the storage GC"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='gc@example.com',
+            password='testpass123'
+        )
+        self.service = UserDataStorageGCService()
+        # Only the dataset versions are under test, storage is empty
+        self.service.storage = Mock()
+        self.service.storage.list_objects.return_value = []
+        self.retention = datetime.timedelta(
+            seconds=settings.USER_DATA_VERSION_RETENTION_SECONDS
+        )
+
+    def _create_version(self, name, upload_time):
+        UserDataFile.deactivate_existing(
+            self.user, UserDataFile.TemplateType.PNL_TEMPLATE
+        )
+        user_file = UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename=name,
+            stored_filename=name,
+            file_path=f'user_{self.user.id}/data_uploads/{name}',
+            file_size=100,
+        )
+        UserDataFile.objects.filter(id=user_file.id).update(
+            upload_time=upload_time
+        )
+        return user_file
+
+    def test_deactivate_existing_sets_superseded_at(self):
+        old_version = self._create_version('v1.csv', timezone.now())
+        self._create_version('v2.csv', timezone.now())
+
+        old_version.refresh_from_db()
+        self.assertFalse(old_version.is_active)
+        self.assertIsNotNone(old_version.superseded_at)
+
+    def test_recently_superseded_old_upload_is_kept(self):
+        """Retention is measured from the replacement, not the upload"""
+        old_upload = timezone.now() - 2 * self.retention
+        old_version = self._create_version('v1.csv', old_upload)
+        self._create_version('v2.csv', timezone.now())
+
+        stats = self.service.collect()
+
+        self.assertEqual(stats['expired_versions'], 0)
+        self.assertTrue(UserDataFile.objects.filter(id=old_version.id).exists())
+
+    def test_expired_version_is_deleted(self):
+        old_upload = timezone.now() - 2 * self.retention
+        old_version = self._create_version('v1.csv', old_upload)
+        active_version = self._create_version('v2.csv', old_upload)
+        UserDataFile.objects.filter(id=old_version.id).update(
+            superseded_at=timezone.now() - self.retention
+            - datetime.timedelta(days=1)
+        )
+
+        stats = self.service.collect()
+
+        self.assertEqual(stats['expired_versions'], 1)
+        self.assertFalse(UserDataFile.objects.filter(id=old_version.id).exists())
+        # The active version is never collected, however old
+        self.assertTrue(
+            UserDataFile.objects.filter(id=active_version.id).exists()
+        )
+
+    def test_dry_run_keeps_expired_version(self):
+        old_version = self._create_version('v1.csv', timezone.now())
+        self._create_version('v2.csv', timezone.now())
+        UserDataFile.objects.filter(id=old_version.id).update(
+            superseded_at=timezone.now() - 2 * self.retention
+        )
+
+        stats = self.service.collect(dry_run=True)
+
+        self.assertEqual(stats['expired_versions'], 1)
+        self.assertTrue(UserDataFile.objects.filter(id=old_version.id).exists())
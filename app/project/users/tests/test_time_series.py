@@ -0,0 +1,167 @@
+import os
+from unittest.mock import patch
+
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models.user_data_file import UserDataFile
+from users.services.cash_analysis_service import UserCashAnalysisService
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import UserInvoicesAnalysisService
+from users.services.pnl_rollup_service import PnLMonthlyRollup
+
+User = get_user_model()
+
+EXPENSE_COLUMNS = ['COGS', 'Payroll', 'Rent', 'Marketing', 'Other_Expenses']
+
+
+class TimeSeriesAPITest(TestCase):
+    """Test suite for the metric time series endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='series@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        test_data_path = os.path.join(
+            os.path.dirname(__file__), 'test_data', 'mock_pnl_data.csv'
+        )
+        self.pnl_data = pd.read_csv(test_data_path)
+        self.invoices_data = pd.DataFrame([
+            {'Date': '2024-01-15', 'Amount': 1000.1, 'Status': 'paid'},
+            {'Date': '2024-01-20', 'Amount': 1500.0, 'Status': 'overdue'},
+            {'Date': '2024-03-01', 'Amount': 2000.0, 'Status': 'paid'},
+            {'Date': '2023-12-31', 'Amount': 700.0, 'Status': 'paid'},
+        ])
+        self.transactions_data = pd.DataFrame([
+            {'Date': '2024-01-05', 'Type': 'income', 'Amount': 5000.55},
+            {'Date': '2024-02-10', 'Type': 'expense', 'Amount': 1200.0},
+            {'Date': '2024-02-11', 'Type': 'Income', 'Amount': 300.0},
+        ])
+
+    def _create_pnl_file(self):
+        UserDataFile.objects.create(
+            user=self.user,
+            template_type=UserDataFile.TemplateType.PNL_TEMPLATE,
+            original_filename='pnl.csv',
+            stored_filename='pnl.csv',
+            file_path=f'user_{self.user.id}/data_uploads/pnl.csv',
+            file_size=100,
+            meta_data={
+                'date_column': 'Month',
+                'revenue_columns': ['Revenue'],
+                'expense_columns': EXPENSE_COLUMNS,
+            },
+            monthly_rollup=PnLMonthlyRollup.build(
+                self.pnl_data, 'Month'
+            ).to_dict(),
+        )
+
+    def _get_month_revenue(self, months):
+        return [
+            float(
+                self.pnl_data[self.pnl_data['Month'] == month]['Revenue'].sum()
+            )
+            for month in months
+        ]
+
+    @patch.object(UserPNLAnalysisService, '_get_dataframe_from_file')
+    def test_monthly_pnl_series(self, mock_get_df):
+        self._create_pnl_file()
+
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-03-31',
+            'sources': ['pnl'],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Series of a file with a rollup never read the rows
+        mock_get_df.assert_not_called()
+        result = response.json()
+        self.assertEqual(
+            result['periods'], ['2024-01-01', '2024-02-01', '2024-03-01']
+        )
+        self.assertNotIn('invoices', result)
+        self.assertEqual(
+            result['pnl']['revenue'],
+            self._get_month_revenue(['2024-01', '2024-02', '2024-03']),
+        )
+        self.assertEqual(
+            len(result['pnl']['expenses_by_category']['Rent']), 3
+        )
+
+    def test_quarterly_series_sums_the_months(self):
+        self._create_pnl_file()
+
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+            'granularity': 'quarter',
+            'sources': ['pnl'],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.json()
+        self.assertEqual(len(result['periods']), 4)
+        self.assertEqual(
+            result['pnl']['revenue'][0],
+            sum(self._get_month_revenue(['2024-01', '2024-02', '2024-03'])),
+        )
+
+    @patch.object(UserCashAnalysisService, '_get_dataframe_from_file')
+    @patch.object(UserInvoicesAnalysisService, '_get_dataframe_from_file')
+    def test_invoices_and_cash_series(self, mock_invoices_df, mock_cash_df):
+        mock_invoices_df.return_value = self.invoices_data
+        mock_cash_df.return_value = self.transactions_data
+
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-03-31',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.json()
+        # Without an uploaded P&L file its series is null
+        self.assertIsNone(result['pnl'])
+        self.assertEqual(result['invoices']['paid_count'], [1, 0, 1])
+        self.assertEqual(result['invoices']['paid_amount'], [1000.1, 0.0, 2000.0])
+        self.assertEqual(result['invoices']['overdue_amount'], [1500.0, 0.0, 0.0])
+        self.assertEqual(result['cash']['income'], [5000.55, 300.0, 0.0])
+        self.assertEqual(result['cash']['expense'], [0.0, 1200.0, 0.0])
+
+    def test_no_data(self):
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-03-31',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_too_many_periods(self):
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2010-01-01',
+            'end_date': '2024-12-31',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(reverse('time-series'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-03-31',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
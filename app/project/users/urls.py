@@ -5,7 +5,14 @@ from users.views.admin import (
     UpdateUserView,
 )
 from users.views import CheckIsUserAdminView
-from users.views.file_upload_views import UploadUserDataAPIView
+from users.views.file_upload_views import (
+    UploadUserDataAPIView,
+    StreamUploadUserDataAPIView,
+    PresignedUploadUserDataAPIView,
+    FinalizePresignedUploadAPIView,
+    DataFileVersionsAPIView,
+    UploadJobStatusAPIView,
+)
 from users.views.pnl_analysis_view import PNLAnalysisAPIView
 from users.views.invoices_analysis_view import InvoicesAnalysisView
 from users.views.cash_analysis_view import CashAnalysisView
@@ -17,6 +24,12 @@ from users.views.industry_norms_view import (
     IndustryDetailsView,
 )
 from users.views.documents_view import DocumentsView
+from users.views.time_series_view import TimeSeriesView
+from users.views.analysis_batch_view import (
+    PNLAnalysisBatchAPIView,
+    InvoicesAnalysisBatchView,
+    ExpenseBreakdownBatchView,
+)
 
 urlpatterns = [
     path("admin/users", UsersListView.as_view(), name="users-list"),
@@ -32,16 +45,51 @@ urlpatterns = [
         UploadUserDataAPIView.as_view(),
         name="upload-data-files"
     ),
+    path(
+        "upload/data-files/stream",
+        StreamUploadUserDataAPIView.as_view(),
+        name="upload-data-files-stream"
+    ),
+    path(
+        "upload/data-files/presigned",
+        PresignedUploadUserDataAPIView.as_view(),
+        name="upload-data-files-presigned"
+    ),
+    path(
+        "upload/data-files/presigned/<uuid:upload_id>/finalize",
+        FinalizePresignedUploadAPIView.as_view(),
+        name="upload-data-files-presigned-finalize"
+    ),
+    path(
+        "upload/data-files/versions",
+        DataFileVersionsAPIView.as_view(),
+        name="data-file-versions"
+    ),
+    path(
+        "upload/jobs/<uuid:job_id>",
+        UploadJobStatusAPIView.as_view(),
+        name="upload-job-status"
+    ),
     path(
         "pnl-analysis",
         PNLAnalysisAPIView.as_view(),
         name="pnl-analysis"
     ),
+    path(
+        "pnl-analysis/batch",
+        PNLAnalysisBatchAPIView.as_view(),
+        name="pnl-analysis-batch"
+    ),
     path(
         "invoices-analysis",
         InvoicesAnalysisView.as_view(),
         name="invoices-analysis"
     ),
+    path(
+        "invoices-analysis/batch",
+        InvoicesAnalysisBatchView.as_view(),
+        name="invoices-analysis-batch"
+    ),
     path(
         "cash-analysis",
         CashAnalysisView.as_view(),
@@ -52,11 +100,21 @@ urlpatterns = [
         ExpenseBreakdownView.as_view(),
         name="expense-breakdown"
     ),
+    path(
+        "expense-breakdown/batch",
+        ExpenseBreakdownBatchView.as_view(),
+        name="expense-breakdown-batch"
+    ),
     path(
         "ai-insights",
         AIInsightsView.as_view(),
         name="ai-insights"
     ),
+    path(
+        "time-series",
+        TimeSeriesView.as_view(),
+        name="time-series"
+    ),
     path(
         "templates",
         UserTemplatesView.as_view(),
@@ -0,0 +1,171 @@
+import logging
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from drf_yasg.utils import swagger_auto_schema
+
+from users.serializers.analysis_batch_serializers import (
+    AnalysisBatchRequestSerializer,
+    AnalysisBatchResponseSerializer,
+)
+from users.services.financial_analysis_service import UserPNLAnalysisService
+from users.services.invoices_analysis_service import (
+    UserInvoicesAnalysisService,
+)
+from config.utils.error_handlers import (
+    create_not_found_error_response,
+    create_server_error_response,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_DESCRIPTION = """
+        Periods are given either as a list of ranges or as last_months,
+        each calendar month of the last N months with the current month
+        included. The data is loaded once and every period, with its
+        comparison periods, is aggregated in one pass.
+
+        Results are keyed by <start_date>_<end_date>.
+        """
+
+
+class AnalysisBatchAPIView(APIView):
+    """
+    Base API view for analyses of several date ranges in one request
+    """
+
+    permission_classes = [IsAuthenticated]
+    resource_name = None
+    not_found_message = None
+
+    def get_results(self, user, ranges):
+        """Get the analysis of each range, keyed by range"""
+        raise NotImplementedError
+
+    def handle_no_data(self, error: ValueError):
+        """Response for users without data"""
+        return create_not_found_error_response(
+            self.resource_name, message=self.not_found_message or str(error)
+        )
+
+    def post(self, request):
+        serializer = AnalysisBatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ranges = serializer.validated_data["_ranges"]
+
+        try:
+            results = self.get_results(request.user, ranges)
+            return Response({"results": results}, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            logger.error(
+                f"No {self.resource_name} for batch analysis "
+                f"of user {request.user.id}: {str(e)}"
+            )
+            return self.handle_no_data(e)
+        except Exception as e:
+            logger.error(
+                f"Unexpected error during batch analysis of "
+                f"{self.resource_name} for user {request.user.id}: {str(e)}"
+            )
+            return create_server_error_response("Internal server error")
+
+
+class PNLAnalysisBatchAPIView(AnalysisBatchAPIView):
+    """
+    API view for P&L metrics of several date ranges
+    """
+
+    resource_name = "pnl_data"
+    not_found_message = "Please upload P&L data before requesting analysis"
+
+    def get_results(self, user, ranges):
+        return UserPNLAnalysisService(user).get_pnl_metrics_batch(ranges)
+
+    @swagger_auto_schema(
+        operation_id="get_pnl_analysis_batch",
+        operation_description="""
+        Get P&L metrics for several date ranges.
+
+        Each result has the metrics of the single range analysis
+        (totals, margins, month_change and year_change) without the
+        pnl_data rows and the AI insight.
+        """ + BATCH_DESCRIPTION,
+        request_body=AnalysisBatchRequestSerializer,
+        tags=["P&L Analysis"],
+        responses={
+            200: AnalysisBatchResponseSerializer,
+            400: "Invalid parameters",
+            401: "Authentication required",
+            404: "No P&L data found for user",
+        },
+    )
+    def post(self, request):
+        """Get P&L metrics for several date ranges"""
+        return super().post(request)
+
+
+class InvoicesAnalysisBatchView(AnalysisBatchAPIView):
+    """
+    API view for invoices analyses of several date ranges
+    """
+
+    resource_name = "invoices_data"
+
+    def get_results(self, user, ranges):
+        return UserInvoicesAnalysisService(user).get_invoices_analysis_batch(
+            ranges
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Get invoices analysis for several periods",
+        operation_description="""
+        Get invoices analyses for several date ranges, each in the shape
+        of the single range analysis.
+        """ + BATCH_DESCRIPTION,
+        request_body=AnalysisBatchRequestSerializer,
+        tags=["Invoices Analysis"],
+        responses={
+            200: AnalysisBatchResponseSerializer,
+            400: "Invalid parameters",
+            401: "Authentication required",
+            404: "No invoices data found for user",
+        },
+    )
+    def post(self, request):
+        """Get invoices analyses for several date ranges"""
+        return super().post(request)
+
+
+class ExpenseBreakdownBatchView(AnalysisBatchAPIView):
+    """
+    API view for expense breakdowns of several date ranges
+    """
+
+    resource_name = "pnl_data"
+
+    def get_results(self, user, ranges):
+        return UserPNLAnalysisService(user).get_expense_breakdown_batch(ranges)
+
+    def handle_no_data(self, error: ValueError):
+        # Like the single range breakdown, no data is an empty result
+        return Response({"results": {}}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Get expense breakdown for several periods",
+        operation_description="""
+        Get expense breakdowns for several date ranges, each in the shape
+        of the single range breakdown; ranges without data are null.
+        """ + BATCH_DESCRIPTION,
+        request_body=AnalysisBatchRequestSerializer,
+        tags=["Expense Analysis"],
+        responses={
+            200: AnalysisBatchResponseSerializer,
+            400: "Invalid parameters",
+            401: "Authentication required",
+        },
+    )
+    def post(self, request):
+        """Get expense breakdowns for several date ranges"""
+        return super().post(request)
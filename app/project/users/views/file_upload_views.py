@@ -1,26 +1,35 @@
-import datetime
+import uuid
+
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.serializers import ValidationError
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
 
+from config.utils.error_handlers import create_not_found_error_response
+from config.utils.file_validators import FileFormatValidator
 from users.serializers.file_upload_serializers import (
+    PresignedUploadRequestSerializer,
+    PresignedUploadResponseSerializer,
+    StreamUploadUserDataSerializer,
+    UploadOptionsSerializer,
     UploadUserDataSerializer,
+    UserDataFileSerializer,
     UploadUserDataResponseSerializer,
+    UserDataUploadJobSerializer,
 )
-from users.models import UserDataFile, UserModel
-from config.instances.minio_client import MINIO_CLIENT
-from users.services.financial_analysis_service import UserPNLAnalysisService
-from users.services.expense_breakdown_service import (
-    UserExpenseBreakdownService
-)
-from users.services.cash_analysis_service import UserCashAnalysisService
-from users.services.invoices_analysis_service import (
-    UserInvoicesAnalysisService
+from users.models import UserDataFile, UserDataUploadJob
+from users.services.data_file_upload_service import UserDataFileUploadService
+from users.services.data_upload_job_service import UserDataUploadJobService
+from users.services.presigned_upload_service import UserPresignedUploadService
+from users.services.streaming_upload_handler import (
+    ContentHashUploadHandler,
+    MinIOMultipartUploadHandler,
 )
+from users.tasks import process_data_upload_job
 
 
 class UploadUserDataAPIView(APIView):
@@ -29,39 +38,6 @@ class UploadUserDataAPIView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser]
 
-    def _invalidate_cache_by_template_type(self, user, template_type):
-        """
-        Invalidate cache based on the template type of uploaded file.
-        
-        Args:
-            user: User instance
-            template_type: Type of template (pnl_template, etc.)
-        """
-        try:
-            if template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
-                # Invalidate PnL analysis cache
-                pnl_service = UserPNLAnalysisService(user)
-                pnl_service.invalidate_cache()
-                
-                # Invalidate expense breakdown cache (depends on PnL data)
-                expense_service = UserExpenseBreakdownService(user)
-                expense_service.invalidate_cache()
-                
-            elif (template_type ==
-                  UserDataFile.TemplateType.TRANSACTIONS_TEMPLATE):
-                # Invalidate cash analysis cache
-                cash_service = UserCashAnalysisService(user)
-                cash_service.invalidate_cache()
-                
-            elif template_type == UserDataFile.TemplateType.INVOICES_TEMPLATE:
-                # Invalidate invoices analysis cache
-                invoices_service = UserInvoicesAnalysisService(user)
-                invoices_service.invalidate_cache()
-                
-        except Exception as e:
-            # Log error but don't fail the upload
-            print(f"Failed to invalidate cache for {template_type}: {str(e)}")
-
     def _prepare_pnl_metadata(self, validated_data):
         """
         Prepare metadata for PnL files from request data.
@@ -95,6 +71,7 @@ class UploadUserDataAPIView(APIView):
         request_body=UploadUserDataSerializer,
         responses={
             200: UploadUserDataResponseSerializer,
+            202: UploadUserDataResponseSerializer,
             400: "Bad Request",
             401: "Unauthorized",
         },
@@ -111,90 +88,70 @@ class UploadUserDataAPIView(APIView):
         - invoices_template: Invoice data
 
         Files are validated before upload and stored in user's private bucket.
+        With upload_mode=append the rows are merged into the current data
+        of the template instead of replacing it.
+        With async_processing the files are staged and processed by a
+        background job; the response is 202 with the job id, progress is
+        published to the user's WebSocket group.
         """
 
+        # Hash files while they are received, before they are parsed
+        hash_handler = ContentHashUploadHandler(request._request)
+        request._request.upload_handlers = [
+            hash_handler, *request._request.upload_handlers
+        ]
+
         serializer = UploadUserDataSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         try:
-            uploaded_files_info = []
-            user_id = request.user.id
-
             # Get validated data
             file_template_mapping = serializer.validated_data["_file_template_mapping"]
             uploaded_files = serializer.validated_data["_uploaded_files"]
+            meta_data = self._prepare_pnl_metadata(serializer.validated_data)
 
-            # Upload each file to MinIO
-            for file in uploaded_files:
-                template_type = file_template_mapping[file.name]
-
-                # Delete existing files of the same template type
-                deleted = MINIO_CLIENT.delete_user_files_by_template(
-                    user_id, template_type
-                )
-                if deleted:
-                    print(
-                        f"Deleted existing {template_type} files " f"for user {user_id}"
-                    )
-
-                # Generate unique filename with timestamp
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                file_extension = file.name.split(".")[-1]
-                unique_filename = f"{template_type}_{timestamp}.{file_extension}"
-
-                # Get user folder path
-                user_folder = MINIO_CLIENT.get_user_folder_path(user_id, "data_uploads")
-                object_name = f"{user_folder}/{unique_filename}"
-
-                # Upload file to MinIO
-                file.seek(0)  # Reset file pointer
-                MINIO_CLIENT.upload_file(
-                    bucket_name='user-data',
-                    object_name=object_name,
-                    file_data=file,
-                    file_size=file.size,
-                    content_type=file.content_type,
+            if serializer.validated_data.get("async_processing"):
+                # Stage raw files, validate and convert them in a worker
+                job = UserDataUploadJobService(request.user).create_job(
+                    uploaded_files, file_template_mapping, meta_data,
+                    content_hashes=hash_handler.hashes,
+                    upload_mode=serializer.validated_data["upload_mode"],
                 )
+                process_data_upload_job.delay(str(job.id))
 
-                # Prepare metadata for PnL files
-                meta_data = None
-                if template_type == UserDataFile.TemplateType.PNL_TEMPLATE:
-                    meta_data = self._prepare_pnl_metadata(
-                        serializer.validated_data
-                    )
-
-                # Create or update database record
-                user_data_file, created = UserDataFile.objects.update_or_create(
-                    user=request.user,
-                    template_type=template_type,
-                    is_active=True,
-                    defaults={
-                        "original_filename": file.name,
-                        "stored_filename": unique_filename,
-                        "file_path": object_name,
-                        "file_size": file.size,
-                        "upload_time": datetime.datetime.now(),
-                        "meta_data": meta_data,
+                return Response(
+                    {
+                        "success": True,
+                        "message": (
+                            f"Принято {len(uploaded_files)} файл(ов) "
+                            f"на обработку"
+                        ),
+                        "job_id": str(job.id),
                     },
+                    status=status.HTTP_202_ACCEPTED,
                 )
 
-                # Invalidate relevant caches based on template type
-                self._invalidate_cache_by_template_type(
-                    request.user, template_type
-                )
-
-                uploaded_files_info.append(
-                    {
-                        "original_name": file.name,
-                        "stored_name": unique_filename,
-                        "template_type": template_type,
-                        "file_path": object_name,
-                        "upload_time": datetime.datetime.now().isoformat(),
-                        "created_new": created,
-                        "replaced_existing": deleted,
-                        "meta_data": meta_data,
-                    }
-                )
+            # Upload and convert files concurrently, records are
+            # committed together
+            uploaded_files_info = UserDataFileUploadService(
+                request.user
+            ).store_files([
+                {
+                    "file": file,
+                    "template_type": file_template_mapping[file.name],
+                    # Metadata applies to PnL files only
+                    "meta_data": (
+                        meta_data
+                        if file_template_mapping[file.name]
+                        == UserDataFile.TemplateType.PNL_TEMPLATE
+                        else None
+                    ),
+                    "content_type": file.content_type,
+                    "content_hash": hash_handler.hashes.get(file.name),
+                    "upload_mode": serializer.validated_data["upload_mode"],
+                }
+                for file in uploaded_files
+            ])
 
             return Response(
                 {
@@ -219,3 +176,282 @@ class UploadUserDataAPIView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class StreamUploadUserDataAPIView(UploadUserDataAPIView):
+    """API View for streaming large CSV data files into MinIO"""
+
+    @swagger_auto_schema(
+        request_body=StreamUploadUserDataSerializer,
+        responses={
+            202: UploadUserDataResponseSerializer,
+            400: "Bad Request",
+            401: "Unauthorized",
+        },
+        operation_description=(
+            "Stream large CSV data files (P&L, Transactions, Invoices) "
+            "to storage and process them in the background"
+        ),
+        tags=["File Upload"],
+    )
+    def post(self, request):
+        """
+        Upload user data files without buffering them in the worker
+
+        Request chunks are piped into MinIO multipart uploads while the
+        files are hashed and their rows validated, so files far above the
+        regular upload limit are accepted with constant memory. Valid files
+        are processed by a background job; the response is 202 with the
+        job id, progress is published to the user's WebSocket group.
+        """
+        job_id = uuid.uuid4()
+        job_service = UserDataUploadJobService(request.user)
+        handler = MinIOMultipartUploadHandler(
+            request._request, job_service.get_staging_folder(job_id)
+        )
+        # Must be set before the request body is parsed
+        request._request.upload_handlers = [handler]
+
+        try:
+            serializer = StreamUploadUserDataSerializer(data=request.data)
+            if handler.errors:
+                raise ValidationError(self._build_stream_errors(handler.errors))
+            serializer.is_valid(raise_exception=True)
+
+            uploaded_files = serializer.validated_data["_uploaded_files"]
+            job = job_service.create_job_from_staged(
+                job_id,
+                uploaded_files,
+                serializer.validated_data["_file_template_mapping"],
+                self._prepare_pnl_metadata(serializer.validated_data),
+                upload_mode=serializer.validated_data["upload_mode"],
+            )
+            process_data_upload_job.delay(str(job.id))
+
+        except ValidationError as e:
+            handler.discard()
+            raise e
+        except Exception as e:
+            handler.discard()
+            return Response(
+                {
+                    "success": False,
+                    "message": f"Ошибка при загрузке файлов: {str(e)}",
+                    "errors": [str(e)],
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return Response(
+            {
+                "success": True,
+                "message": (
+                    f"Принято {len(uploaded_files)} файл(ов) на обработку"
+                ),
+                "job_id": str(job.id),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @staticmethod
+    def _build_stream_errors(errors):
+        """Combine per-file errors of the upload handler"""
+        messages = []
+        row_errors = {}
+        for file_name, error in errors.items():
+            if isinstance(error, dict):
+                row_errors[file_name] = error["row_errors"]
+                error = error["message"]
+            messages.append(f"{file_name}: {error}")
+
+        if row_errors:
+            return {
+                "code": FileFormatValidator.INVALID_ROWS_ERROR_CODE,
+                "message": "; ".join(messages),
+                "row_errors": row_errors,
+            }
+        return "; ".join(messages)
+
+
+class PresignedUploadUserDataAPIView(APIView):
+    """API View issuing URLs for direct-to-storage data file uploads"""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=PresignedUploadRequestSerializer,
+        responses={
+            200: PresignedUploadResponseSerializer,
+            400: "Bad Request",
+            401: "Unauthorized",
+        },
+        operation_description=(
+            "Get presigned PUT URLs to upload data files (P&L, "
+            "Transactions, Invoices) straight to storage"
+        ),
+        tags=["File Upload"],
+    )
+    def post(self, request):
+        """
+        Issue one presigned PUT URL per file
+
+        The client PUTs every file to its URL, then calls the finalize
+        endpoint with the upload_id and the upload options. File bytes
+        never pass through the API server.
+        """
+        serializer = PresignedUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = UserPresignedUploadService(request.user).create_upload(
+            serializer.validated_data["_file_names"]
+        )
+        return Response(upload, status=status.HTTP_200_OK)
+
+
+class FinalizePresignedUploadAPIView(UploadUserDataAPIView):
+    """API View processing files uploaded through presigned URLs"""
+
+    parser_classes = [JSONParser]
+
+    @swagger_auto_schema(
+        request_body=UploadOptionsSerializer,
+        responses={
+            202: UploadUserDataResponseSerializer,
+            400: "Bad Request",
+            401: "Unauthorized",
+            404: "Not Found",
+        },
+        operation_description=(
+            "Validate files uploaded through presigned URLs and process "
+            "them in the background"
+        ),
+        tags=["File Upload"],
+    )
+    def post(self, request, upload_id):
+        """
+        Check the headers of the uploaded files and start a background
+        job that validates their rows and stores them as new dataset
+        versions; the response is 202 with the job id, progress is
+        published to the user's WebSocket group.
+        """
+        if UserDataUploadJob.objects.filter(
+            id=upload_id, user=request.user
+        ).exists():
+            raise ValidationError("Загрузка уже обработана")
+
+        upload_service = UserPresignedUploadService(request.user)
+        try:
+            files = upload_service.get_uploaded_files(upload_id)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        if not files:
+            return create_not_found_error_response("Upload")
+
+        try:
+            serializer = StreamUploadUserDataSerializer(
+                data={**request.data, **files}
+            )
+            serializer.is_valid(raise_exception=True)
+
+            uploaded_files = serializer.validated_data["_uploaded_files"]
+            job = UserDataUploadJobService(
+                request.user
+            ).create_job_from_staged(
+                upload_id,
+                uploaded_files,
+                serializer.validated_data["_file_template_mapping"],
+                self._prepare_pnl_metadata(serializer.validated_data),
+                upload_mode=serializer.validated_data["upload_mode"],
+                rows_validated=False,
+            )
+            process_data_upload_job.delay(str(job.id))
+
+        except ValidationError as e:
+            upload_service.discard(files)
+            raise e
+        except Exception as e:
+            return Response(
+                {
+                    "success": False,
+                    "message": f"Ошибка при загрузке файлов: {str(e)}",
+                    "errors": [str(e)],
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return Response(
+            {
+                "success": True,
+                "message": (
+                    f"Принято {len(uploaded_files)} файл(ов) на обработку"
+                ),
+                "job_id": str(job.id),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class DataFileVersionsAPIView(APIView):
+    """API View for the dataset versions of user data files"""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "template_type",
+                openapi.IN_QUERY,
+                description="Only list versions of this template type",
+                type=openapi.TYPE_STRING,
+                enum=UserDataFile.TemplateType.values,
+                required=False,
+            ),
+        ],
+        responses={
+            200: UserDataFileSerializer(many=True),
+            401: "Unauthorized",
+        },
+        operation_description=(
+            "List dataset versions of uploaded data files, newest first. "
+            "Superseded versions are kept until garbage collection."
+        ),
+        tags=["File Upload"],
+    )
+    def get(self, request):
+        """List the active and superseded dataset versions of the user"""
+        versions = UserDataFile.objects.filter(user=request.user).order_by("-id")
+        template_type = request.query_params.get("template_type")
+        if template_type:
+            versions = versions.filter(template_type=template_type)
+
+        return Response(
+            UserDataFileSerializer(versions, many=True).data,
+            status=status.HTTP_200_OK,
+        )
+
+
+class UploadJobStatusAPIView(APIView):
+    """API View for background upload job status"""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        responses={
+            200: UserDataUploadJobSerializer,
+            401: "Unauthorized",
+            404: "Not Found",
+        },
+        operation_description="Get status of a background data upload job",
+        tags=["File Upload"],
+    )
+    def get(self, request, job_id):
+        """Get status, progress and result of an upload job"""
+        job = UserDataUploadJob.objects.filter(
+            id=job_id, user=request.user
+        ).first()
+        if job is None:
+            return create_not_found_error_response("Upload job")
+
+        return Response(
+            UserDataUploadJobSerializer(job).data, status=status.HTTP_200_OK
+        )
@@ -0,0 +1,88 @@
+import logging
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from drf_yasg.utils import swagger_auto_schema
+
+from users.services.time_series_service import UserTimeSeriesService
+from users.serializers.time_series_serializers import (
+    TimeSeriesParamsSerializer,
+    TimeSeriesResponseSerializer,
+)
+from config.utils.error_handlers import (
+    create_not_found_error_response,
+    create_server_error_response,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TimeSeriesView(APIView):
+    """
+    API endpoint for metric time series
+
+    Provides per-period series of:
+    - P&L revenue, expenses, net profit and expenses by category
+    - Paid and overdue invoice counts and amounts
+    - Transaction income and expense
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Get metric time series",
+        operation_description=(
+            "Get P&L, invoices and cash metrics per month, quarter or year "
+            "over a date range. Each dataset is grouped by period in one "
+            "pass; every series is a list aligned with periods, and sources "
+            "without uploaded data are null. With rolling_windows, monthly "
+            "P&L series include trailing window totals and moving averages, "
+            "derived from cumulative sums over the whole history."
+        ),
+        query_serializer=TimeSeriesParamsSerializer,
+        responses={
+            200: TimeSeriesResponseSerializer,
+            400: "Invalid parameters",
+            401: "Authentication required",
+            404: "No data found for user",
+        },
+        tags=["Time Series"],
+    )
+    def get(self, request):
+        """
+        Get metric time series for specified date range
+
+        Query Parameters:
+        - start_date (required): Start date of the horizon (YYYY-MM-DD)
+        - end_date (required): End date of the horizon (YYYY-MM-DD)
+        - granularity: month, quarter or year (default month)
+        - sources: pnl, invoices, cash (repeatable, default all)
+        - rolling_windows: trailing window months (repeatable, e.g. 3, 12)
+        """
+        serializer = TimeSeriesParamsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        sources = params.get("sources")
+
+        try:
+            service = UserTimeSeriesService(request.user)
+            result = service.get_time_series(
+                params["start_date"],
+                params["end_date"],
+                params["granularity"],
+                list(sources) if sources else None,
+                params.get("rolling_windows"),
+            )
+            return Response(result, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return create_not_found_error_response(
+                "analysis_data", message=str(e)
+            )
+        except Exception as e:
+            logger.error(
+                f"Unexpected error during time series calculation "
+                f"for user {request.user.id}: {str(e)}"
+            )
+            return create_server_error_response("Internal server error")